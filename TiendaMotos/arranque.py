@@ -0,0 +1,46 @@
+"""
+Inicialización en el master de gunicorn antes de crear los workers (preload_app, ver
+gunicorn.conf.py).
+
+Lo que se importa o se compila aquí lo heredan los workers por copy-on-write, en lugar
+de hacerlo cada uno en su primera petición y con su propia copia en memoria.
+"""
+import gc
+import os
+
+
+def precargar():
+    from django.core.files.storage import storages
+    from django.db import connections
+    from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+    from django.urls import get_resolver
+
+    # Todas las vistas (y lo que importan) se cargan al resolver la primera URL
+    get_resolver().url_patterns
+
+    # Motor de plantillas (importa las librerías de templatetags) y plantillas del
+    # proyecto compiladas en el loader con caché
+    for motor in engines.all():
+        for directorio in motor.engine.dirs:
+            for raiz, _, archivos in os.walk(directorio):
+                for nombre in archivos:
+                    if not nombre.endswith('.html'):
+                        continue
+                    try:
+                        motor.get_template(os.path.relpath(os.path.join(raiz, nombre), directorio))
+                    except (TemplateDoesNotExist, TemplateSyntaxError):
+                        # El error aparecerá en la petición que la use
+                        pass
+
+    # Backend de media (con Cloudinary importa su SDK) y Pillow para las subidas; en el
+    # código se importan al primer uso para no cargarlos en comandos y tests
+    storages['default']
+    import PIL.Image  # noqa: F401
+
+    # Las conexiones abiertas no pueden compartirse entre procesos
+    connections.close_all()
+
+    # Lo creado hasta aquí pasa a la generación permanente: el recolector de los
+    # workers no lo recorre ni modifica sus cabeceras, así sus páginas siguen compartidas
+    gc.collect()
+    gc.freeze()
@@ -12,7 +12,6 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
-import cloudinary
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -43,18 +42,19 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-    "cloudinary_storage",
-    "cloudinary",
+    # "cloudinary_storage" se añade abajo solo si hay credenciales de Cloudinary
     'productos',
 ]
 
 MIDDLEWARE = [
+    'productos.middleware.MedicionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'productos.middleware.PerfiladoMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -63,7 +63,8 @@ ROOT_URLCONF = 'TiendaMotos.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates que además mide el tiempo de renderizado (Server-Timing)
+        'BACKEND': 'productos.instrumentacion.DjangoTemplatesMedidas',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -137,6 +138,7 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
+STATICFILES_DIRS = [BASE_DIR / 'static']
 
 # Media files
 MEDIA_URL = '/media/'
@@ -148,12 +150,13 @@ _cl_cloud = os.environ.get("CLOUDINARY_CLOUD_NAME")
 _cl_key = os.environ.get("CLOUDINARY_API_KEY")
 _cl_secret = os.environ.get("CLOUDINARY_API_SECRET")
 
+# Sin importar el SDK aquí: django-cloudinary-storage lo configura al cargar el storage
 if _cl_cloud and _cl_key and _cl_secret:
-    cloudinary.config(
-        cloud_name=_cl_cloud,
-        api_key=_cl_key,
-        api_secret=_cl_secret,
-    )
+    CLOUDINARY_STORAGE = {
+        'CLOUD_NAME': _cl_cloud,
+        'API_KEY': _cl_key,
+        'API_SECRET': _cl_secret,
+    }
 # If individual vars aren't set, cloudinary SDK auto-reads CLOUDINARY_URL env var
 
 # Activate Cloudinary storage whenever credentials are present (CLOUDINARY_URL or individual vars)
@@ -164,18 +167,29 @@ _use_cloudinary = bool(
 
 # Django 5.2 requires STORAGES dict
 if _use_cloudinary:
+    # Sus templatetags importan el SDK al crear el motor de plantillas: solo si se usa
+    INSTALLED_APPS.insert(INSTALLED_APPS.index('productos'), 'cloudinary_storage')
     STORAGES = {
+        # Envuelto para medir el tiempo de las llamadas a Cloudinary (Server-Timing)
         "default": {
-            "BACKEND": "cloudinary_storage.storage.MediaCloudinaryStorage",
+            "BACKEND": "productos.instrumentacion.AlmacenamientoMedido",
+            "OPTIONS": {"backend": "cloudinary_storage.storage.MediaCloudinaryStorage"},
         },
         "staticfiles": {
             "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
         },
     }
 else:
+    # CLOUDINARY_LOCAL_LATENCIA_MS: imitación local de Cloudinary con esa latencia por
+    # llamada (productos/cloudinary_local.py), para probar y medir sin credenciales
+    _cl_local = os.environ.get('CLOUDINARY_LOCAL_LATENCIA_MS')
     STORAGES = {
         "default": {
-            "BACKEND": "django.core.files.storage.FileSystemStorage",
+            "BACKEND": "productos.instrumentacion.AlmacenamientoMedido",
+            "OPTIONS": (
+                {"backend": "productos.cloudinary_local.CloudinaryLocal", "latencia_ms": float(_cl_local)}
+                if _cl_local else {"backend": "django.core.files.storage.FileSystemStorage"}
+            ),
         },
         "staticfiles": {
             "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
@@ -199,6 +213,122 @@ if os.environ.get('ENVIRONMENT') == 'production':
     SECURE_HSTS_INCLUDE_SUBDOMAINS = True
     SECURE_HSTS_PRELOAD = True
 
+# Tendencias: vida media (en horas) del decaimiento de vistas/ventas y peso de cada venta
+TENDENCIA_VIDA_MEDIA_HORAS = float(os.environ.get('TENDENCIA_VIDA_MEDIA_HORAS', 72))
+TENDENCIA_PESO_VENTA = float(os.environ.get('TENDENCIA_PESO_VENTA', 5))
+
+# Número de productos relacionados precalculados por producto
+PRODUCTOS_RELACIONADOS_K = int(os.environ.get('PRODUCTOS_RELACIONADOS_K', 6))
+
+# Segundos que se conserva en caché el esquema de atributos por categoría (admin); se
+# invalida antes en todos los workers al cambiar (ver productos/versiones.py)
+ESQUEMA_ATRIBUTOS_TTL = int(os.environ.get('ESQUEMA_ATRIBUTOS_TTL', 300))
+
+# Segundos que se conserva en caché el árbol de categorías del sidebar; se invalida
+# antes en todos los workers al cambiar (ver productos/versiones.py)
+CATEGORIAS_ARBOL_TTL = int(os.environ.get('CATEGORIAS_ARBOL_TTL', 600))
+
+# Segundos que se conservan en caché los rangos de los atributos numéricos del sidebar
+# (se invalidan antes en todos los workers al recalcular los conteos de facetas o al
+# cambiar un valor; ver productos/versiones.py)
+FACETAS_RANGOS_TTL = int(os.environ.get('FACETAS_RANGOS_TTL', 600))
+
+# Estrategia de redimensionado de imágenes subidas: calidad, progresiva, equilibrada o rapida
+# (ver productos/imagenes.py y manage.py benchmark_imagenes)
+IMAGEN_ESTRATEGIA = os.environ.get('IMAGEN_ESTRATEGIA', 'equilibrada')
+
+# Perfilado bajo demanda para staff (?_perfil=1 / ?_perfil=guardar): segundos que se
+# conservan los informes guardados, cuántos se listan y cuánto detalle incluyen
+PERFILADO_TTL = int(os.environ.get('PERFILADO_TTL', 3600))
+PERFILADO_MAX_GUARDADOS = int(os.environ.get('PERFILADO_MAX_GUARDADOS', 20))
+PERFILADO_MAX_CONSULTAS = int(os.environ.get('PERFILADO_MAX_CONSULTAS', 50))
+PERFILADO_MAX_FUNCIONES = int(os.environ.get('PERFILADO_MAX_FUNCIONES', 40))
+
+# Caché local por proceso, con conteo de aciertos y fallos por petición
+CACHES = {
+    'default': {
+        'BACKEND': 'productos.instrumentacion.LocMemCacheMedida',
+    }
+}
+
+# Métricas por petición: cabecera Server-Timing y una línea JSON por petición en el
+# logger "tiendamotos.rendimiento" (LOG_RENDIMIENTO=WARNING para desactivarla)
+METRICAS_SERVER_TIMING = os.environ.get('METRICAS_SERVER_TIMING', 'True') == 'True'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'mensaje': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'rendimiento': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'mensaje',
+        },
+    },
+    'loggers': {
+        'tiendamotos.rendimiento': {
+            'handlers': ['rendimiento'],
+            'level': os.environ.get('LOG_RENDIMIENTO', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
+# Importación masiva de productos (productos/importacion.py): filas por lote, procesos
+# que procesan imágenes y tamaño máximo de cada imagen del zip o carpeta
+IMPORTACION_TAMANO_LOTE = int(os.environ.get('IMPORTACION_TAMANO_LOTE', '500'))
+IMPORTACION_PROCESOS = int(os.environ.get('IMPORTACION_PROCESOS', '2'))
+IMPORTACION_MAX_BYTES_IMAGEN = int(os.environ.get('IMPORTACION_MAX_BYTES_IMAGEN', str(20 * 1024 * 1024)))
+
+# Exportación del catálogo en streaming (productos/exportacion.py): productos leídos por
+# bloque; también es el chunk_size del cursor
+EXPORTACION_TAMANO_BLOQUE = int(os.environ.get('EXPORTACION_TAMANO_BLOQUE', '2000'))
+
+# Recálculo de datos derivados tras cambios en el panel (productos/recalculos.py): en un
+# hilo en segundo plano tras confirmar la transacción (False: en la propia petición), por
+# lotes; con más de RELACIONADOS_MAX_INCREMENTAL productos en un lote se recalculan los
+# relacionados de todo el catálogo de una vez
+RECALCULOS_EN_SEGUNDO_PLANO = os.environ.get('RECALCULOS_EN_SEGUNDO_PLANO', 'True') == 'True'
+RECALCULOS_TAMANO_LOTE = int(os.environ.get('RECALCULOS_TAMANO_LOTE', '200'))
+RECALCULOS_REINTENTO_SEGUNDOS = int(os.environ.get('RECALCULOS_REINTENTO_SEGUNDOS', '300'))
+RELACIONADOS_MAX_INCREMENTAL = int(os.environ.get('RELACIONADOS_MAX_INCREMENTAL', '50'))
+
+# Borrado de archivos del almacenamiento (productos/almacenamiento.py): en un hilo en
+# segundo plano tras confirmar la transacción (False: en la propia petición), por lotes,
+# con reintentos; el barrido de huérfanos ignora los archivos más recientes
+BORRADO_EN_SEGUNDO_PLANO = os.environ.get('BORRADO_EN_SEGUNDO_PLANO', 'True') == 'True'
+BORRADO_TAMANO_LOTE = int(os.environ.get('BORRADO_TAMANO_LOTE', '100'))
+BORRADO_MAX_INTENTOS = int(os.environ.get('BORRADO_MAX_INTENTOS', '5'))
+BORRADO_REINTENTO_SEGUNDOS = int(os.environ.get('BORRADO_REINTENTO_SEGUNDOS', '300'))
+BORRADO_ANTIGUEDAD_HUERFANOS_HORAS = float(os.environ.get('BORRADO_ANTIGUEDAD_HUERFANOS_HORAS', '24'))
+
+# Miniaturas bajo demanda (productos/miniaturas.py): carpeta local de la caché, tamaño
+# máximo antes de expulsar las menos usadas, lado máximo que se puede firmar y calidad
+MINIATURAS_DIRECTORIO = os.environ.get('MINIATURAS_DIRECTORIO', str(BASE_DIR / 'cache_miniaturas'))
+MINIATURAS_MAX_MB = int(os.environ.get('MINIATURAS_MAX_MB', 500))
+MINIATURAS_LADO_MAXIMO = int(os.environ.get('MINIATURAS_LADO_MAXIMO', 1600))
+MINIATURAS_CALIDAD = int(os.environ.get('MINIATURAS_CALIDAD', 80))
+
+# Punto de control de "manage.py reprocesar_imagenes" para retomar si se interrumpe
+REPROCESO_ARCHIVO_ESTADO = os.environ.get('REPROCESO_ARCHIVO_ESTADO', str(BASE_DIR / '.reproceso_imagenes.json'))
+
+# Galería al crear productos: hilos que procesan y suben las imágenes a la vez y segundos
+# máximos de espera por petición (por debajo del timeout de los workers de gunicorn)
+GALERIA_HILOS = int(os.environ.get('GALERIA_HILOS', 4))
+GALERIA_PRESUPUESTO_SEGUNDOS = float(os.environ.get('GALERIA_PRESUPUESTO_SEGUNDOS', 20))
+
+# Métricas de Prometheus en /metrics (productos/metricas.py). Acceso con
+# "Authorization: Bearer <METRICAS_TOKEN>" o desde la red interna sin pasar por el
+# proxy público; METRICAS_IPS_PERMITIDAS restringe esa red (IPs o redes separadas por comas)
+METRICAS_TOKEN = os.environ.get('METRICAS_TOKEN', '')
+METRICAS_IPS_PERMITIDAS = [
+    red.strip() for red in os.environ.get('METRICAS_IPS_PERMITIDAS', '').split(',') if red.strip()
+]
+# Segundos que se reutilizan las métricas de tendencias (agregan toda la tabla)
+METRICAS_TENDENCIAS_TTL = int(os.environ.get('METRICAS_TENDENCIAS_TTL', '60'))
+
 # Login settings
 LOGIN_URL = '/productos/admin-custom/login/'
 LOGIN_REDIRECT_URL = '/productos/admin-custom/'
@@ -24,6 +24,7 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('', views.home, name='home'),
     path('contacto/', views.contacto, name='contacto'),
+    path('metrics', views.metrics, name='metrics'),
     path('productos/', include('productos.urls')),
 ]
 
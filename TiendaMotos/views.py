@@ -1,13 +1,16 @@
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
+from django.views.decorators.cache import never_cache
 from productos.models import Producto, ConfiguracionHome
+from productos import metricas
 
 # Create your views here.
 
 def home(request):
-    # Obtener los 3 productos más recientes que estén activos
+    # Obtener los 3 productos activos con mayor tendencia (los más recientes en caso de empate)
     productos_destacados = Producto.objects.filter(
         es_activo=True
-    ).select_related('categoria').order_by('-fecha_creacion')[:3]
+    ).select_related('categoria').order_by('-puntuacion_tendencia', '-fecha_creacion')[:3]
 
     # Obtener configuración del hero
     config_home = ConfiguracionHome.get_config()
@@ -23,3 +26,12 @@ def contacto(request):
     """Vista de la página de contacto"""
     return render(request, 'contacto.html')
 
+
+
+@never_cache
+def metrics(request):
+    """Métricas de Prometheus para el scraper interno (404 para el resto)"""
+    if not metricas.acceso_permitido(request):
+        raise Http404
+    contenido, content_type = metricas.exportar()
+    return HttpResponse(contenido, content_type=content_type)
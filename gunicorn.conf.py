@@ -0,0 +1,41 @@
+"""
+Configuración de gunicorn (se carga sola al arrancar desde la raíz del proyecto).
+
+- preload_app: Django se carga una vez en el master y los workers lo heredan por
+  copy-on-write (ver TiendaMotos/arranque.py). GUNICORN_PRELOAD=False lo desactiva.
+- Prepara el directorio compartido en el que cada worker escribe sus métricas de
+  Prometheus para que /metrics agregue las de todos (ver productos/metricas.py).
+"""
+import glob
+import os
+import tempfile
+
+
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'True') == 'True'
+
+os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'tiendamotos-metricas')
+)
+# Antes de cargar la aplicación (con preload_app se carga en el master y ya crea
+# métricas). Los ficheros de una ejecución anterior sumarían procesos que ya no existen.
+# Solo se borran los *.db de prometheus_client: el directorio puede ser del operador
+# y contener otras cosas.
+os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+for ruta in glob.glob(os.path.join(glob.escape(os.environ['PROMETHEUS_MULTIPROC_DIR']), '*.db')):
+    try:
+        os.remove(ruta)
+    except FileNotFoundError:
+        pass
+
+
+def when_ready(server):
+    # Justo antes de crear los workers
+    if server.cfg.preload_app:
+        from TiendaMotos.arranque import precargar
+        precargar()
+
+
+def child_exit(server, worker):
+    # Saca de los gauges "livesum" los valores del worker que termina
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,166 @@
+"""
+Acciones masivas del panel sobre varios productos a la vez.
+
+Cada acción es una sola sentencia (UPDATE, o DELETE/INSERT en la tabla de colores)
+dentro de una transacción, en lugar de cargar y guardar producto por producto.
+update() y bulk_create() no disparan señales, así que los datos derivados (árbol de
+categorías, conteos de facetas y productos relacionados) se recalculan una vez por
+acción al confirmar la transacción, y solo los que la acción afecta; los relacionados,
+en segundo plano.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Min, Value, When
+from django.db.models.functions import Greatest, Round
+from django.utils import timezone
+
+from . import recalculos
+from .categorias import invalidar_arbol
+from .models import Categoria, Color, Producto, TasaCambio
+
+
+ACCIONES = {
+    'activar': 'Activar',
+    'desactivar': 'Desactivar',
+    'precio': 'Cambiar precio',
+    'categoria': 'Cambiar categoría',
+    'stock': 'Ajustar stock',
+    'colores': 'Asignar colores',
+}
+PRECIO_MINIMO = Decimal('0.01')
+
+
+def _decimal(valor, nombre):
+    try:
+        numero = Decimal(str(valor).replace(',', '.'))
+    except InvalidOperation:
+        raise ValueError(f'{nombre} no válido: "{valor}"')
+    if not numero.is_finite():
+        raise ValueError(f'{nombre} no válido: "{valor}"')
+    return numero
+
+
+def _precio_normalizado(precio):
+    """Expresión SQL del precio en USD a partir de `precio`, con la tasa de cada moneda."""
+    tasas = dict(TasaCambio.objects.values_list('moneda', 'tasa_usd'))
+    casos = [
+        When(moneda=moneda, then=Round(precio * Value(tasa), 2))
+        for moneda, tasa in tasas.items() if moneda != 'USD'
+    ]
+    if not casos:
+        return precio
+    return Case(*casos, default=precio, output_field=DecimalField(max_digits=14, decimal_places=2))
+
+
+def ejecutar_accion(producto_ids, accion, valor=None, modo=None, color_ids=None):
+    """
+    Aplica `accion` (una de ACCIONES) a los productos indicados. Retorna el número de
+    productos modificados. Lanza ValueError si los parámetros no son válidos.
+
+    - activar / desactivar
+    - precio: modo 'porcentaje' (valor = % de subida, negativo para bajar) o 'absoluto'
+      (valor = importe a sumar o restar en la moneda de cada producto)
+    - categoria: valor = id de la categoría destino
+    - stock: modo 'fijar' o 'sumar' (valor entero, negativo para restar; nunca baja de 0)
+    - colores: modo 'agregar', 'quitar' o 'reemplazar' con color_ids
+    """
+    if accion not in ACCIONES:
+        raise ValueError(f'Acción desconocida: {accion}')
+    producto_ids = sorted({int(pid) for pid in producto_ids})
+    if not producto_ids:
+        raise ValueError('No hay productos seleccionados')
+
+    productos = Producto.objects.filter(pk__in=producto_ids)
+    ahora = timezone.now()
+    # Datos derivados que hay que recalcular tras la acción
+    conteos = relacionados = False
+
+    with transaction.atomic():
+        categoria_ids = set(productos.order_by().values_list('categoria_id', flat=True).distinct())
+
+        if accion in ('activar', 'desactivar'):
+            activo = accion == 'activar'
+            afectados = productos.exclude(es_activo=activo).update(es_activo=activo, fecha_actualizacion=ahora)
+            conteos = relacionados = True
+
+        elif accion == 'precio':
+            valor = _decimal(valor, 'Valor del precio')
+            if modo == 'porcentaje':
+                if valor <= -100:
+                    raise ValueError('El porcentaje debe ser mayor que -100')
+                nuevo = Round(F('precio_venta') * Value(1 + valor / 100), 2)
+            elif modo == 'absoluto':
+                nuevo = F('precio_venta') + Value(valor.quantize(PRECIO_MINIMO))
+            else:
+                raise ValueError(f'Modo de precio desconocido: {modo}')
+
+            # Se comprueba antes de escribir: ningún precio puede quedar por debajo del mínimo
+            minimo = productos.aggregate(minimo=Min(nuevo, output_field=DecimalField()))['minimo']
+            if minimo is not None and Decimal(str(minimo)) < PRECIO_MINIMO:
+                raise ValueError(f'Algún precio quedaría por debajo de {PRECIO_MINIMO}')
+            # En un UPDATE las columnas de la derecha tienen el valor anterior: el precio
+            # normalizado se calcula con la misma expresión que el nuevo precio
+            afectados = productos.update(
+                precio_venta=nuevo,
+                precio_normalizado=_precio_normalizado(nuevo),
+                fecha_actualizacion=ahora,
+            )
+            relacionados = True
+
+        elif accion == 'categoria':
+            try:
+                destino = Categoria.objects.get(pk=valor)
+            except (Categoria.DoesNotExist, ValueError, TypeError):
+                raise ValueError('La categoría destino no existe')
+            afectados = productos.exclude(categoria=destino).update(categoria=destino, fecha_actualizacion=ahora)
+            categoria_ids.add(destino.pk)
+            conteos = relacionados = True
+
+        elif accion == 'stock':
+            try:
+                cantidad = int(valor)
+            except (ValueError, TypeError):
+                raise ValueError(f'Cantidad de stock no válida: "{valor}"')
+            if modo == 'fijar':
+                if cantidad < 0:
+                    raise ValueError('El stock no puede ser negativo')
+                nuevo = Value(cantidad)
+            elif modo == 'sumar':
+                nuevo = Greatest(F('stock_actual') + Value(cantidad), Value(0))
+            else:
+                raise ValueError(f'Modo de stock desconocido: {modo}')
+            afectados = productos.update(stock_actual=nuevo, fecha_actualizacion=ahora)
+
+        else:
+            color_ids = {int(cid) for cid in color_ids or []}
+            if Color.objects.filter(pk__in=color_ids).count() != len(color_ids):
+                raise ValueError('Algún color no existe')
+            if modo not in ('agregar', 'quitar', 'reemplazar'):
+                raise ValueError(f'Modo de colores desconocido: {modo}')
+            if not color_ids and modo != 'reemplazar':
+                raise ValueError('No hay colores seleccionados')
+
+            intermedia = Producto.colores.through
+            if modo in ('quitar', 'reemplazar'):
+                filas = intermedia.objects.filter(producto_id__in=producto_ids)
+                if modo == 'quitar':
+                    filas = filas.filter(color_id__in=color_ids)
+                filas.delete()
+            if modo in ('agregar', 'reemplazar'):
+                intermedia.objects.bulk_create([
+                    intermedia(producto_id=pid, color_id=cid) for pid in producto_ids for cid in color_ids
+                ], batch_size=2000, ignore_conflicts=True)
+            afectados = productos.update(fecha_actualizacion=ahora)
+            relacionados = True
+
+        if conteos:
+            # La versión se confirma junto con el cambio (productos/versiones.py)
+            invalidar_arbol()
+        # Relacionados y facetas se encolan y se recalculan en segundo plano (productos/recalculos.py)
+        recalculos.marcar(
+            producto_ids if relacionados and afectados else (),
+            categoria_ids if conteos else (),
+        )
+
+    return afectados
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Categoria, Producto, ImagenProducto, AtributoDinamico, ValorProducto, Color
+from .models import Categoria, Producto, ImagenProducto, AtributoDinamico, ValorProducto, Color, TasaCambio, ArchivoPorBorrar, ImagenProcesada
 
 
 @admin.register(Color)
@@ -269,7 +269,53 @@ class ValorProductoAdmin(admin.ModelAdmin):
     valor_con_unidad.short_description = 'Valor Formateado'
 
 
+@admin.register(TasaCambio)
+class TasaCambioAdmin(admin.ModelAdmin):
+    """
+    Administración de tasas de cambio. Al guardar o eliminar una tasa se recalcula el
+    precio normalizado de los productos en esa moneda.
+    """
+    list_display = ['moneda', 'tasa_usd', 'fecha_actualizacion']
+    list_editable = ['tasa_usd']
+    ordering = ['moneda']
+
+    def delete_queryset(self, request, queryset):
+        # "Eliminar seleccionados" borra con queryset.delete(), que no llama a delete()
+        for tasa in queryset:
+            tasa.delete()
+
+
+@admin.register(ArchivoPorBorrar)
+class ArchivoPorBorrarAdmin(admin.ModelAdmin):
+    """
+    Cola de borrado del almacenamiento (solo lectura). Los que fallan quedan aquí con su
+    error; "limpiar_almacenamiento --reintentar" los vuelve a intentar.
+    """
+    list_display = ['nombre', 'intentos', 'error', 'fecha_creacion']
+    search_fields = ['nombre']
+    readonly_fields = ['nombre', 'intentos', 'error', 'fecha_creacion']
+
+    def has_add_permission(self, request):
+        return False
+
+
 # Personalización del sitio de administración
 admin.site.site_header = "Administración MotoLuxe"
 admin.site.site_title = "Panel de Control MotoLuxe"
-admin.site.index_title = "Gestión de Productos y Categorías"
\ No newline at end of file
+admin.site.index_title = "Gestión de Productos y Categorías"
+
+
+@admin.register(ImagenProcesada)
+class ImagenProcesadaAdmin(admin.ModelAdmin):
+    """
+    Imágenes procesadas por hash de contenido (solo lectura). Varias pueden compartir
+    archivo; "reutilizaciones" cuenta las subidas que se evitaron con cada una.
+    """
+    list_display = ['nombre', 'estrategia', 'bytes', 'reutilizaciones', 'fecha_creacion']
+    list_filter = ['estrategia']
+    search_fields = ['nombre', 'hash_original', 'hash_procesado']
+    readonly_fields = ['hash_original', 'estrategia', 'hash_procesado', 'nombre', 'bytes',
+                       'reutilizaciones', 'fecha_creacion']
+
+    def has_add_permission(self, request):
+        return False
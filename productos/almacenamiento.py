@@ -0,0 +1,260 @@
+"""
+Limpieza del almacenamiento de imágenes (sistema de archivos o Cloudinary).
+
+Al eliminar un producto o una imagen de galería sus archivos se añaden a la cola
+ArchivoPorBorrar en la misma transacción y, al confirmarse, un hilo en segundo plano la
+procesa por lotes: en Cloudinary, un delete_resources por cada 100 archivos en lugar de
+un destroy por archivo. Antes de borrar se comprueba que ningún registro siga usando el
+archivo. Los fallos se reintentan hasta BORRADO_MAX_INTENTOS veces.
+
+El barrido de huérfanos (limpiar_almacenamiento --huerfanos) recorre por páginas las
+carpetas de subida de los FileField del proyecto y encola los archivos que ningún
+registro usa, así recupera también los que quedaron sueltos antes de existir la cola.
+"""
+import logging
+import os
+from datetime import datetime, timedelta, timezone as dt_timezone
+from itertools import islice
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.db.models import FileField
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import ArchivoPorBorrar, ImagenProcesada, ImagenProducto, Producto
+from .trabajador import Trabajador
+
+
+logger = logging.getLogger('tiendamotos.almacenamiento')
+
+# Máximo de public_ids por llamada a delete_resources de Cloudinary
+LOTE_CLOUDINARY = 100
+
+
+def _backend():
+    """El almacenamiento real, sin el envoltorio que mide las llamadas."""
+    return getattr(default_storage, 'interno', default_storage)
+
+
+def _es_cloudinary(backend):
+    return type(backend).__module__.startswith('cloudinary_storage')
+
+
+def _campos_archivo():
+    """(modelo, nombre del campo) de todos los FileField/ImageField del proyecto."""
+    return [
+        (modelo, campo.name)
+        for modelo in apps.get_models()
+        for campo in modelo._meta.get_fields()
+        if isinstance(campo, FileField)
+    ]
+
+
+def referenciados(nombres):
+    """Subconjunto de `nombres` que algún registro sigue usando (una consulta por campo)."""
+    nombres = list(nombres)
+    en_uso = set()
+    if nombres:
+        for modelo, campo in _campos_archivo():
+            en_uso.update(modelo._default_manager.filter(**{f'{campo}__in': nombres}).values_list(campo, flat=True))
+    return en_uso
+
+
+def borrar_archivos(nombres):
+    """Borra los archivos del almacenamiento. Retorna {nombre: error} de los que fallaron."""
+    backend = _backend()
+    errores = {}
+    if _es_cloudinary(backend):
+        import cloudinary.api
+        for inicio in range(0, len(nombres), LOTE_CLOUDINARY):
+            trozo = nombres[inicio:inicio + LOTE_CLOUDINARY]
+            try:
+                respuesta = cloudinary.api.delete_resources(
+                    trozo, invalidate=True, resource_type=backend.RESOURCE_TYPE
+                )
+            except Exception as e:
+                errores.update(dict.fromkeys(trozo, str(e)))
+                continue
+            for nombre in trozo:
+                estado = respuesta.get('deleted', {}).get(nombre)
+                if estado not in ('deleted', 'not_found'):
+                    errores[nombre] = f'Cloudinary respondió "{estado}"'
+    else:
+        for nombre in nombres:
+            try:
+                default_storage.delete(nombre)
+            except OSError as e:
+                errores[nombre] = str(e)
+    return errores
+
+
+def encolar(nombres):
+    """Añade archivos a la cola; se procesan al confirmarse la transacción en curso."""
+    nombres = [nombre for nombre in nombres if nombre]
+    if not nombres:
+        return
+    ArchivoPorBorrar.objects.bulk_create(
+        [ArchivoPorBorrar(nombre=nombre) for nombre in nombres], ignore_conflicts=True
+    )
+    transaction.on_commit(_al_confirmar)
+
+
+def procesar_pendientes(tamano_lote=None):
+    """
+    Procesa la cola una vez, por lotes. Retorna (borrados, en_uso, fallidos); los que
+    siguen en uso salen de la cola sin borrarse.
+
+    Cada lote va en dos transacciones. En la primera se eliminan los registros de
+    ImagenProcesada de los archivos por borrar y se confirma, así ninguna subida nueva
+    los encuentra para reutilizarlos. En la segunda se vuelven a bloquear las filas de
+    la cola y solo se borran los archivos cuya fila sigue ahí. Una subida que ya los
+    había encontrado se los queda quitando su fila antes (deduplicacion.reclamar).
+    """
+    tamano_lote = tamano_lote or settings.BORRADO_TAMANO_LOTE
+    borrados = en_uso_total = fallidos = 0
+    ultimo_id = 0
+    while True:
+        with transaction.atomic():
+            pendientes = ArchivoPorBorrar.objects.filter(
+                id__gt=ultimo_id, intentos__lt=settings.BORRADO_MAX_INTENTOS
+            ).order_by('id')
+            if connection.features.has_select_for_update_skip_locked:
+                # Varios workers pueden vaciar la cola a la vez sin repartirse los mismos archivos
+                pendientes = pendientes.select_for_update(skip_locked=True)
+            lote = list(pendientes[:tamano_lote])
+            if not lote:
+                break
+            ultimo_id = lote[-1].id
+
+            en_uso = referenciados(archivo.nombre for archivo in lote)
+            ArchivoPorBorrar.objects.filter(id__in=[a.id for a in lote if a.nombre in en_uso]).delete()
+            # Los archivos que se van a borrar ya no sirven para deduplicar subidas
+            ImagenProcesada.objects.filter(nombre__in=[a.nombre for a in lote if a.nombre not in en_uso]).delete()
+
+        with transaction.atomic():
+            # Sin skip_locked: si una subida está reclamando un archivo, se espera a que termine
+            lote = list(ArchivoPorBorrar.objects.select_for_update().filter(
+                id__in=[a.id for a in lote if a.nombre not in en_uso]
+            ).order_by('id'))
+            recuperados = referenciados(archivo.nombre for archivo in lote)
+            por_borrar = [archivo.nombre for archivo in lote if archivo.nombre not in recuperados]
+            errores = borrar_archivos(por_borrar)
+
+            reintentar = []
+            for archivo in lote:
+                if archivo.nombre in errores:
+                    archivo.intentos += 1
+                    archivo.error = errores[archivo.nombre][:1000]
+                    reintentar.append(archivo)
+            ArchivoPorBorrar.objects.filter(
+                id__in=[archivo.id for archivo in lote if archivo.nombre not in errores]
+            ).delete()
+            ArchivoPorBorrar.objects.bulk_update(reintentar, ['intentos', 'error'])
+
+        borrados += len(por_borrar) - len(errores)
+        en_uso_total += len(en_uso) + len(recuperados)
+        fallidos += len(errores)
+        for nombre, error in errores.items():
+            logger.warning('No se pudo borrar %s: %s', nombre, error)
+    return borrados, en_uso_total, fallidos
+
+
+def _tarea():
+    _, _, fallidos = procesar_pendientes()
+    return fallidos > 0
+
+
+_trabajador = Trabajador('borrado-almacenamiento', _tarea, 'BORRADO_REINTENTO_SEGUNDOS', logger)
+
+
+def _al_confirmar():
+    if settings.BORRADO_EN_SEGUNDO_PLANO:
+        _trabajador.despertar()
+    else:
+        procesar_pendientes()
+
+
+# ===== BARRIDO DE HUÉRFANOS =====
+
+def carpetas_subida():
+    """Carpetas donde suben los FileField del proyecto (las únicas que se barren)."""
+    carpetas = set()
+    for modelo, campo in _campos_archivo():
+        subida = modelo._meta.get_field(campo).upload_to
+        if isinstance(subida, str) and subida:
+            carpetas.add(subida if subida.endswith('/') else subida + '/')
+    return sorted(carpetas)
+
+
+def listar_archivos(carpeta):
+    """Genera (nombre, fecha, bytes) de los archivos de una carpeta, página a página."""
+    backend = _backend()
+    if _es_cloudinary(backend):
+        import cloudinary.api
+        cursor = None
+        while True:
+            opciones = {'type': 'upload', 'prefix': backend._prepend_prefix(carpeta),
+                        'max_results': 500, 'resource_type': backend.RESOURCE_TYPE}
+            if cursor:
+                opciones['next_cursor'] = cursor
+            respuesta = cloudinary.api.resources(**opciones)
+            for recurso in respuesta['resources']:
+                fecha = datetime.fromisoformat(recurso['created_at'].replace('Z', '+00:00'))
+                yield recurso['public_id'], fecha, recurso.get('bytes', 0)
+            cursor = respuesta.get('next_cursor')
+            if not cursor:
+                return
+
+    raiz = backend.path('')
+    for directorio, _, archivos in os.walk(backend.path(carpeta)):
+        for archivo in archivos:
+            ruta = os.path.join(directorio, archivo)
+            estado = os.stat(ruta)
+            nombre = os.path.relpath(ruta, raiz).replace(os.sep, '/')
+            yield nombre, datetime.fromtimestamp(estado.st_mtime, dt_timezone.utc), estado.st_size
+
+
+def barrer_huerfanos(antiguedad_horas=None, simular=False, tamano_pagina=1000):
+    """
+    Encola (y borra) los archivos sin ningún registro que los use. Solo se consideran los
+    de más de `antiguedad_horas`: un archivo recién subido aún puede estar esperando a
+    que se confirme la transacción que lo guarda. Retorna el resumen del barrido.
+    """
+    if antiguedad_horas is None:
+        antiguedad_horas = settings.BORRADO_ANTIGUEDAD_HUERFANOS_HORAS
+    limite = timezone.now() - timedelta(hours=antiguedad_horas)
+    resumen = {'revisados': 0, 'huerfanos': 0, 'bytes': 0, 'borrados': 0, 'fallidos': 0}
+
+    for carpeta in carpetas_subida():
+        archivos = listar_archivos(carpeta)
+        while True:
+            pagina = list(islice(archivos, tamano_pagina))
+            if not pagina:
+                break
+            en_uso = referenciados(nombre for nombre, _, _ in pagina)
+            huerfanos = [(nombre, tamano) for nombre, fecha, tamano in pagina
+                         if nombre not in en_uso and fecha < limite]
+            resumen['revisados'] += len(pagina)
+            resumen['huerfanos'] += len(huerfanos)
+            resumen['bytes'] += sum(tamano for _, tamano in huerfanos)
+            if huerfanos and not simular:
+                ArchivoPorBorrar.objects.bulk_create(
+                    [ArchivoPorBorrar(nombre=nombre) for nombre, _ in huerfanos], ignore_conflicts=True
+                )
+
+    if not simular:
+        resumen['borrados'], _, resumen['fallidos'] = procesar_pendientes()
+    return resumen
+
+
+@receiver(post_delete, sender=Producto)
+@receiver(post_delete, sender=ImagenProducto)
+def _encolar_al_eliminar(sender, instance, **kwargs):
+    encolar([
+        getattr(instance, campo.name).name
+        for campo in instance._meta.get_fields() if isinstance(campo, FileField)
+    ])
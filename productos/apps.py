@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class ProductosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'productos'
+
+    def ready(self):
+        # Registra los receptores que invalidan las cachés (esquema de atributos, árbol de
+        # categorías, rangos de atributos) y el que encola el borrado de los archivos de lo
+        # eliminado
+        from . import esquema_atributos, categorias, facetas, almacenamiento  # noqa: F401
@@ -0,0 +1,96 @@
+"""
+Interpretación de los valores de atributos dinámicos.
+
+ValorProducto.valor es texto libre ("60 km", "1,5 kW", "125cc"). Aquí se extrae el
+número y se convierte a la unidad de medida del atributo cuando el valor viene
+escrito en otra unidad compatible, para poder filtrar y ordenar por rangos.
+"""
+import re
+
+
+# Unidad -> (magnitud, factor respecto a la unidad base de la magnitud)
+UNIDADES = {
+    'w': ('potencia', 1),
+    'kw': ('potencia', 1000),
+    'hp': ('potencia', 745.7),
+    'cv': ('potencia', 735.5),
+    'v': ('voltaje', 1),
+    'mah': ('carga', 0.001),
+    'ah': ('carga', 1),
+    'mm': ('longitud', 0.001),
+    'cm': ('longitud', 0.01),
+    'm': ('longitud', 1),
+    'km': ('longitud', 1000),
+    'ml': ('volumen', 0.001),
+    'cc': ('volumen', 0.001),
+    'cm3': ('volumen', 0.001),
+    'l': ('volumen', 1),
+    'km/h': ('velocidad', 1),
+    'kmh': ('velocidad', 1),
+    'min': ('tiempo', 1 / 60),
+    'h': ('tiempo', 1),
+    'hora': ('tiempo', 1),
+    'horas': ('tiempo', 1),
+    'g': ('masa', 0.001),
+    'kg': ('masa', 1),
+    't': ('masa', 1000),
+    'km/l': ('rendimiento', 1),
+}
+
+# El valor entero tiene que ser un número con unidad opcional: "Litio 48V" o "Euro 5" son texto
+_VALOR_RE = re.compile(r'\s*(-?\d+(?:[.,]\d+)?)\s*([a-zA-Z/³°]+\d?)?\s*')
+
+
+def _normalizar_unidad(unidad):
+    return (unidad or '').strip().lower().replace(' ', '').replace('³', '3')
+
+
+def parsear_valor_numerico(valor, unidad_medida=None):
+    """
+    Retorna el valor numérico expresado en la unidad del atributo, o None si el valor no
+    es un número seguido como mucho de una unidad conocida o de la del atributo.
+
+    Ej: parsear_valor_numerico('1,5 kW', 'W') -> 1500.0
+    """
+    match = _VALOR_RE.fullmatch(valor or '')
+    if not match:
+        return None
+    if match.group(2) and _normalizar_unidad(match.group(2)) not in UNIDADES \
+            and _normalizar_unidad(match.group(2)) != _normalizar_unidad(unidad_medida):
+        # "5 velocidades", "2 puertas": un número con palabra no es una medida
+        return None
+
+    numero = float(match.group(1).replace(',', '.'))
+    unidad_escrita = UNIDADES.get(_normalizar_unidad(match.group(2)))
+    unidad_atributo = UNIDADES.get(_normalizar_unidad(unidad_medida))
+
+    if unidad_escrita and unidad_atributo and unidad_escrita[0] == unidad_atributo[0]:
+        numero = numero * unidad_escrita[1] / unidad_atributo[1]
+    return numero
+
+
+def recalcular_valores_numericos(valores, tamano_lote=1000):
+    """
+    Recalcula valor_numerico de un queryset de ValorProducto por lotes de clave primaria,
+    guardando solo las filas que cambian. Genera (revisados, actualizados) tras cada lote.
+    """
+    ultimo_id = 0
+    while True:
+        lote = list(
+            valores.filter(pk__gt=ultimo_id)
+            .select_related('atributo')
+            .order_by('pk')[:tamano_lote]
+        )
+        if not lote:
+            return
+
+        cambiados = []
+        for valor in lote:
+            numero = parsear_valor_numerico(valor.valor, valor.atributo.unidad_medida)
+            if numero != valor.valor_numerico:
+                valor.valor_numerico = numero
+                cambiados.append(valor)
+        valores.model.objects.bulk_update(cambiados, ['valor_numerico'])
+
+        ultimo_id = lote[-1].pk
+        yield len(lote), len(cambiados)
@@ -0,0 +1,228 @@
+"""
+Benchmark de las vistas públicas y del panel de administración.
+
+Recorre con el cliente de pruebas de Django un conjunto fijo de escenarios (home, lista
+con cada combinación de filtro y ordenamiento, detalle, buscar y el panel) sobre catálogos
+sintéticos de varios tamaños, y registra por escenario los percentiles de latencia, el
+número de consultas y los bytes renderizados. El informe es JSON para poder guardarlo
+como referencia y compararlo con ejecuciones posteriores.
+"""
+import math
+import platform
+import re
+import time
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .catalogo_sintetico import preparar_metadatos, generar_lote
+from .facetas import recalcular_conteos
+from .models import Producto, Categoria, Color, ValorProducto
+from .similitud import recalcular_relacionados
+
+
+ORDENAMIENTOS = ['', 'precio_asc', 'precio_desc', 'nombre', 'popular', 'mas_vendido']
+
+
+def _percentil(tiempos, p):
+    """Percentil por rango más cercano sobre una lista ordenada."""
+    return tiempos[max(math.ceil(p / 100 * len(tiempos)) - 1, 0)]
+
+
+def escenarios():
+    """
+    Retorna [(nombre, url, requiere_staff)] construidos a partir del catálogo actual:
+    cada filtro de lista se combina con cada ordenamiento.
+    """
+    raiz = Categoria.objects.filter(padre__isnull=True, subcategorias__isnull=False).order_by('id').first()
+    hoja = Categoria.objects.filter(subcategorias__isnull=True, productos__isnull=False).order_by('id').first()
+    colores = list(Color.objects.filter(es_activo=True).order_by('orden', 'id').values_list('id', flat=True)[:2])
+    numerico = ValorProducto.objects.filter(valor_numerico__isnull=False).order_by('atributo_id').values('atributo_id').first()
+    texto = ValorProducto.objects.filter(valor_numerico__isnull=True).order_by('atributo_id').values('atributo_id', 'valor').first()
+
+    filtros = {'todos': ''}
+    if raiz:
+        filtros['categoria_raiz'] = f'categoria={raiz.id}'
+    if hoja:
+        filtros['categoria_hoja'] = f'categoria={hoja.id}'
+    if colores:
+        filtros['colores'] = '&'.join(f'color={c}' for c in colores)
+    filtros['precio'] = 'precio_min=500&precio_max=2500'
+    filtros['en_stock'] = 'en_stock=1'
+    if numerico:
+        rango = ValorProducto.objects.filter(atributo_id=numerico['atributo_id'])
+        valores = sorted(rango.values_list('valor_numerico', flat=True).distinct()[:50])
+        if valores:
+            filtros['atributo_rango'] = (
+                f"atributo_{numerico['atributo_id']}_min={valores[0]:g}"
+                f"&atributo_{numerico['atributo_id']}_max={valores[len(valores) // 2]:g}"
+            )
+    if texto:
+        filtros['atributo_valor'] = f"atributo_{texto['atributo_id']}={texto['valor']}"
+    filtros['busqueda'] = 'q=Pro'
+
+    lista = reverse('productos:lista')
+    resultado = [('home', reverse('home'), False)]
+    for nombre_filtro, filtro in filtros.items():
+        for ordenar in ORDENAMIENTOS:
+            query = '&'.join(p for p in [filtro, f'ordenar={ordenar}' if ordenar else ''] if p)
+            nombre = f"lista:{nombre_filtro}:{ordenar or 'recientes'}"
+            resultado.append((nombre, f'{lista}?{query}' if query else lista, False))
+
+    # Detalle: el producto más popular y uno cualquiera del medio del catálogo
+    activos = Producto.objects.filter(es_activo=True)
+    popular = activos.order_by('-puntuacion_tendencia').values_list('id', flat=True).first()
+    medio = activos.order_by('id').values_list('id', flat=True)[activos.count() // 2:][:1]
+    for nombre, producto_id in [('detalle:popular', popular), ('detalle:medio', next(iter(medio), None))]:
+        if producto_id:
+            resultado.append((nombre, reverse('productos:detalle', kwargs={'producto_id': producto_id}), False))
+
+    buscar = reverse('productos:buscar')
+    resultado += [
+        ('buscar:corto', f'{buscar}?q=Pr', False),
+        ('buscar:palabra', f'{buscar}?q=Volta', False),
+        ('buscar:sin_resultados', f'{buscar}?q=zzzz', False),
+        ('admin:dashboard', reverse('productos:admin_dashboard'), True),
+        ('admin:productos', reverse('productos:admin_productos_lista'), True),
+        ('admin:productos_pagina', f"{reverse('productos:admin_productos_lista')}?page=5", True),
+        ('admin:productos_busqueda', f"{reverse('productos:admin_productos_lista')}?q=Pro&estado=activo", True),
+    ]
+    if hoja:
+        resultado.append((
+            'admin:productos_categoria',
+            f"{reverse('productos:admin_productos_lista')}?categoria={hoja.id}", True,
+        ))
+    return resultado
+
+
+def medir(client, url, repeticiones=10, calentamiento=2, cache_fria=False):
+    """Ejecuta la petición varias veces y retorna latencias (ms), consultas y bytes."""
+    for _ in range(calentamiento):
+        client.get(url)
+
+    tiempos = []
+    consultas = 0
+    for _ in range(repeticiones):
+        if cache_fria:
+            cache.clear()
+        with CaptureQueriesContext(connection) as capturadas:
+            inicio = time.perf_counter()
+            response = client.get(url)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        consultas = max(consultas, len(capturadas))
+
+    tiempos.sort()
+    return {
+        'url': url,
+        'estado': response.status_code,
+        'p50_ms': round(_percentil(tiempos, 50), 2),
+        'p90_ms': round(_percentil(tiempos, 90), 2),
+        'p99_ms': round(_percentil(tiempos, 99), 2),
+        'media_ms': round(sum(tiempos) / len(tiempos), 2),
+        'min_ms': round(tiempos[0], 2),
+        'consultas': consultas,
+        'bytes': len(response.content),
+    }
+
+
+def ampliar_catalogo(hasta, contexto, semilla=1, tamano_lote=1000, relacionados=True):
+    """
+    Genera productos sintéticos hasta llegar a `hasta`, continuando la numeración de los
+    productos ya generados: para una misma semilla y secuencia de tamaños el catálogo
+    medido es siempre el mismo.
+    """
+    existentes = Producto.objects.count()
+    for desde in range(existentes, hasta, tamano_lote):
+        generar_lote(desde // tamano_lote, desde, min(tamano_lote, hasta - desde), semilla, contexto, 2)
+
+    Producto.actualizar_tendencias()
+    recalcular_conteos()
+    if relacionados:
+        recalcular_relacionados()
+    cache.clear()
+
+
+def ejecutar_benchmark(tamanos, repeticiones=10, calentamiento=2, semilla=1, cache_fria=False,
+                       patron=None, relacionados=True, progreso=None):
+    """
+    Genera catálogos crecientes en la base de datos actual (debe estar vacía o ser de
+    pruebas) y mide todos los escenarios en cada tamaño. Retorna el informe.
+    """
+    staff = get_user_model().objects.create_superuser('benchmark', 'benchmark@example.com', None)
+    client = Client()
+    client_staff = Client()
+    client_staff.force_login(staff)
+
+    contexto = preparar_metadatos(imagenes_distintas=4, semilla=semilla)
+    informe = {'meta': metadatos(repeticiones, calentamiento, semilla, cache_fria), 'resultados': {}}
+
+    for tamano in sorted(tamanos):
+        ampliar_catalogo(tamano, contexto, semilla, relacionados=relacionados)
+        resultados = {}
+        for nombre, url, requiere_staff in escenarios():
+            if patron and not re.search(patron, nombre):
+                continue
+            resultados[nombre] = medir(
+                client_staff if requiere_staff else client, url, repeticiones, calentamiento, cache_fria,
+            )
+            if progreso:
+                progreso(tamano, nombre, resultados[nombre])
+        informe['resultados'][str(tamano)] = resultados
+    return informe
+
+
+def metadatos(repeticiones, calentamiento, semilla, cache_fria):
+    return {
+        'fecha': timezone.now().isoformat(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'base_datos': connection.vendor,
+        'maquina': platform.node(),
+        'repeticiones': repeticiones,
+        'calentamiento': calentamiento,
+        'semilla': semilla,
+        'cache_fria': cache_fria,
+    }
+
+
+def comparar(informe, referencia, tolerancia=0.25, margen_ms=2.0):
+    """
+    Compara un informe con uno de referencia. Retorna las regresiones como dicts
+    (tamano, escenario, metrica, antes, despues):
+
+    - latencia p50/p90: más de `tolerancia` (fracción) y más de `margen_ms` por encima,
+      para no marcar el ruido de escenarios de pocos milisegundos;
+    - consultas: cualquier aumento (es determinista);
+    - bytes: más de `tolerancia` por encima.
+    """
+    regresiones = []
+    for tamano, resultados in informe['resultados'].items():
+        base_tamano = referencia.get('resultados', {}).get(tamano, {})
+        for escenario, actual in resultados.items():
+            base = base_tamano.get(escenario)
+            if not base:
+                continue
+            for metrica in ('p50_ms', 'p90_ms'):
+                if actual[metrica] > base[metrica] * (1 + tolerancia) and actual[metrica] - base[metrica] > margen_ms:
+                    regresiones.append(_regresion(tamano, escenario, metrica, base, actual))
+            if actual['consultas'] > base['consultas']:
+                regresiones.append(_regresion(tamano, escenario, 'consultas', base, actual))
+            if actual['bytes'] > base['bytes'] * (1 + tolerancia):
+                regresiones.append(_regresion(tamano, escenario, 'bytes', base, actual))
+    return regresiones
+
+
+def _regresion(tamano, escenario, metrica, base, actual):
+    return {
+        'tamano': tamano,
+        'escenario': escenario,
+        'metrica': metrica,
+        'antes': base[metrica],
+        'despues': actual[metrica],
+    }
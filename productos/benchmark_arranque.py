@@ -0,0 +1,194 @@
+"""
+Benchmark del arranque de la aplicación.
+
+- Desglose de importaciones: `python -X importtime` al cargar TiendaMotos.wsgi, con los
+  módulos más costosos y el tiempo propio sumado por paquete.
+- Primera petición en un proceso nuevo: tiempo de carga de la aplicación, de la primera
+  petición y de la segunda (ya en caliente), y qué dependencias pesadas quedaron cargadas.
+- Gunicorn real con la configuración del proyecto, con y sin preload_app: tiempo desde
+  lanzar el proceso hasta la primera respuesta y memoria proporcional (PSS) de master y
+  workers, que muestra cuánto comparten por copy-on-write.
+
+Cada medición usa un proceso nuevo; el benchmark se ejecuta con el entorno actual
+(DATABASE_URL, DEBUG, credenciales de Cloudinary...).
+"""
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+
+from django.conf import settings
+
+
+MODULO_WSGI = 'TiendaMotos.wsgi'
+PESADOS = ['PIL.Image', 'cloudinary', 'numpy', 'prometheus_client']
+
+_SCRIPT_PRIMERA_PETICION = '''
+import json, sys, time
+inicio = time.perf_counter()
+from TiendaMotos.wsgi import application
+cargada = time.perf_counter()
+from wsgiref.util import setup_testing_defaults
+
+def peticion():
+    entorno = {'PATH_INFO': sys.argv[1], 'HTTP_HOST': 'localhost'}
+    setup_testing_defaults(entorno)
+    estado = []
+    inicio = time.perf_counter()
+    respuesta = application(entorno, lambda s, h, e=None: estado.append(s))
+    b''.join(respuesta)
+    respuesta.close()
+    return estado[0], (time.perf_counter() - inicio) * 1000
+
+estado, primera_ms = peticion()
+_, segunda_ms = peticion()
+print(json.dumps({
+    'estado': estado,
+    'carga_ms': (cargada - inicio) * 1000,
+    'primera_ms': primera_ms,
+    'segunda_ms': segunda_ms,
+    'pesados': [m for m in json.loads(sys.argv[2]) if m in sys.modules],
+}))
+'''
+
+
+def _entorno(**extra):
+    entorno = dict(os.environ, LOG_RENDIMIENTO='WARNING', **extra)
+    entorno.setdefault('DJANGO_SETTINGS_MODULE', 'TiendaMotos.settings')
+    return entorno
+
+
+def _mediana(valores):
+    valores = sorted(valores)
+    return round(valores[len(valores) // 2], 1)
+
+
+def desglose_importaciones(top=15):
+    """Importa la aplicación con -X importtime. Retorna total, módulos más costosos y paquetes."""
+    proceso = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {MODULO_WSGI}'],
+        cwd=settings.BASE_DIR, env=_entorno(), capture_output=True, text=True, check=True,
+    )
+    modulos = []
+    for linea in proceso.stderr.splitlines():
+        if not linea.startswith('import time:') or 'self [us]' in linea:
+            continue
+        propio, acumulado, nombre = linea[len('import time:'):].split('|')
+        modulos.append((nombre.strip(), int(propio) / 1000, int(acumulado) / 1000))
+
+    paquetes = defaultdict(float)
+    for nombre, propio, _ in modulos:
+        paquetes[nombre.split('.')[0]] += propio
+
+    return {
+        'total_ms': round(sum(propio for _, propio, _ in modulos), 1),
+        'modulos': [
+            {'modulo': nombre, 'acumulado_ms': round(acumulado, 1), 'propio_ms': round(propio, 1)}
+            for nombre, propio, acumulado in sorted(modulos, key=lambda m: -m[2])[:top]
+        ],
+        'paquetes': {
+            paquete: round(ms, 1)
+            for paquete, ms in sorted(paquetes.items(), key=lambda p: -p[1])[:top]
+        },
+    }
+
+
+def primera_peticion(ruta='/', repeticiones=5):
+    """Carga la aplicación y atiende dos peticiones en procesos nuevos. Retorna medianas."""
+    mediciones = []
+    for _ in range(repeticiones):
+        proceso = subprocess.run(
+            [sys.executable, '-c', _SCRIPT_PRIMERA_PETICION, ruta, json.dumps(PESADOS)],
+            cwd=settings.BASE_DIR, env=_entorno(), capture_output=True, text=True, check=True,
+        )
+        mediciones.append(json.loads(proceso.stdout.strip().splitlines()[-1]))
+
+    return {
+        'estado': mediciones[-1]['estado'],
+        'carga_ms': _mediana(m['carga_ms'] for m in mediciones),
+        'primera_ms': _mediana(m['primera_ms'] for m in mediciones),
+        'segunda_ms': _mediana(m['segunda_ms'] for m in mediciones),
+        'hasta_primera_respuesta_ms': _mediana(m['carga_ms'] + m['primera_ms'] for m in mediciones),
+        'pesados_cargados': mediciones[-1]['pesados'],
+    }
+
+
+def _puerto_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _pss_kb(pid):
+    """Memoria proporcional (PSS) del proceso y sus hijos según /proc; None fuera de Linux."""
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as archivo:
+            hijos = [int(p) for p in archivo.read().split()]
+        total = 0
+        for proceso in [pid] + hijos:
+            with open(f'/proc/{proceso}/smaps_rollup') as archivo:
+                total += next(int(l.split()[1]) for l in archivo if l.startswith('Pss:'))
+        return total
+    except (OSError, StopIteration):
+        return None
+
+
+def arranque_gunicorn(ruta='/', repeticiones=3, trabajadores=2, preload=True, limite_s=60):
+    """
+    Lanza gunicorn con gunicorn.conf.py y espera a la primera respuesta. Retorna medianas
+    del tiempo hasta la primera respuesta y de la PSS total tras servir a todos los workers.
+    """
+    tiempos, memorias = [], []
+    for _ in range(repeticiones):
+        puerto = _puerto_libre()
+        url = f'http://127.0.0.1:{puerto}{ruta}'
+        with tempfile.TemporaryDirectory() as metricas:
+            entorno = _entorno(
+                GUNICORN_PRELOAD=str(preload),
+                # Un directorio propio para no vaciar el de un gunicorn que esté en marcha
+                PROMETHEUS_MULTIPROC_DIR=metricas,
+            )
+            inicio = time.perf_counter()
+            proceso = subprocess.Popen(
+                [sys.executable, '-m', 'gunicorn', MODULO_WSGI,
+                 '-b', f'127.0.0.1:{puerto}', '-w', str(trabajadores)],
+                cwd=settings.BASE_DIR, env=entorno,
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            try:
+                while True:
+                    if time.perf_counter() - inicio > limite_s or proceso.poll() is not None:
+                        raise RuntimeError(f'gunicorn no respondió en {url}')
+                    try:
+                        with urllib.request.urlopen(url, timeout=limite_s) as respuesta:
+                            respuesta.read()
+                        break
+                    except urllib.error.HTTPError:
+                        break
+                    except OSError:
+                        time.sleep(0.01)
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+
+                # Que cada worker atienda alguna petición antes de medir la memoria
+                for _ in range(trabajadores * 4):
+                    try:
+                        urllib.request.urlopen(url, timeout=limite_s).read()
+                    except urllib.error.HTTPError:
+                        pass
+                memorias.append(_pss_kb(proceso.pid))
+            finally:
+                proceso.terminate()
+                proceso.wait()
+
+    return {
+        'preload': preload,
+        'trabajadores': trabajadores,
+        'hasta_primera_respuesta_ms': _mediana(tiempos),
+        'pss_total_mb': round(_mediana(memorias) / 1024, 1) if None not in memorias else None,
+    }
@@ -0,0 +1,166 @@
+"""
+Micro-benchmark del pipeline de imágenes (productos/imagenes.py).
+
+Procesa un corpus de entradas representativas (JPEG grandes de cámara, PNG con alfa,
+imágenes de paleta, WebP) con cada estrategia de redimensionado y mide el tiempo, el
+pico de memoria y el tamaño del JPEG resultante, además de cuánto se aparta su resultado
+del de la estrategia de referencia ("calidad").
+
+Cada medición se ejecuta en un proceso hijo nuevo: el pico de memoria residente
+(ru_maxrss) solo crece, así que medirlo en el mismo proceso mezclaría unas entradas con
+otras. tracemalloc no sirve por sí solo porque Pillow reserva los píxeles fuera del
+asignador de Python.
+"""
+import os
+import sys
+import time
+import tracemalloc
+from io import BytesIO
+from multiprocessing import get_context
+
+from PIL import Image, ImageChops, ImageDraw, ImageStat
+
+from .imagenes import ESTRATEGIAS, procesar_imagen
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+REFERENCIA = 'calidad'
+
+
+def _foto_sintetica(ancho, alto):
+    """Imagen con degradados, formas y ruido: se comprime como una foto, no como un dibujo plano."""
+    canales = [
+        Image.linear_gradient('L').resize((ancho, alto)),
+        Image.radial_gradient('L').resize((ancho, alto)),
+        Image.effect_noise((ancho, alto), 48),
+    ]
+    img = Image.merge('RGB', canales)
+    dibujo = ImageDraw.Draw(img)
+    for n in range(12):
+        x, y = ancho * n // 12, alto * ((n * 7) % 12) // 12
+        dibujo.ellipse((x, y, x + ancho // 6, y + alto // 5), fill=(40 * n % 255, 90, 200 - 10 * n))
+    return img
+
+
+def _codificar(img, formato, **opciones):
+    salida = BytesIO()
+    img.save(salida, format=formato, **opciones)
+    return salida.getvalue()
+
+
+def corpus():
+    """Entradas representativas en memoria: [(nombre, bytes)]."""
+    foto = _foto_sintetica(4032, 3024)
+
+    con_alfa = _foto_sintetica(2000, 2000).convert('RGBA')
+    mascara = Image.new('L', con_alfa.size, 0)
+    ImageDraw.Draw(mascara).ellipse((100, 100, 1900, 1900), fill=255)
+    con_alfa.putalpha(mascara)
+
+    paleta = _foto_sintetica(1200, 900).quantize(64)
+    paleta.info['transparency'] = 0
+
+    return [
+        ('jpeg_camara_12mp', _codificar(foto, 'JPEG', quality=92)),
+        ('jpeg_vertical_12mp', _codificar(foto.transpose(Image.Transpose.ROTATE_90), 'JPEG', quality=92)),
+        ('jpeg_1600', _codificar(foto.resize((1600, 1200)), 'JPEG', quality=85)),
+        ('png_alfa_2000', _codificar(con_alfa, 'PNG')),
+        ('png_paleta_1200', _codificar(paleta, 'PNG')),
+        ('webp_2400', _codificar(foto.resize((2400, 1800)), 'WEBP', quality=85)),
+    ]
+
+
+def corpus_directorio(directorio):
+    """Imágenes reales de un directorio como corpus: [(nombre, bytes)]."""
+    entradas = []
+    for nombre in sorted(os.listdir(directorio)):
+        ruta = os.path.join(directorio, nombre)
+        if os.path.isfile(ruta) and nombre.lower().endswith(('.jpg', '.jpeg', '.png', '.webp', '.gif')):
+            with open(ruta, 'rb') as archivo:
+                entradas.append((nombre, archivo.read()))
+    return entradas
+
+
+def _rss_maximo_kb():
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maximo // 1024 if sys.platform == 'darwin' else maximo
+
+
+def _medir(argumentos):
+    """Se ejecuta en un proceso hijo: procesa la entrada `repeticiones` veces."""
+    datos, estrategia, repeticiones = argumentos
+    rss_inicial = _rss_maximo_kb() if resource else None
+
+    tracemalloc.start()
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        salida = procesar_imagen(BytesIO(datos), estrategia)
+        tiempos.append(time.perf_counter() - inicio)
+    pico_python = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        'tiempos': tiempos,
+        'pico_rss_kb': _rss_maximo_kb() - rss_inicial if resource else None,
+        'pico_python_kb': pico_python // 1024,
+        'salida': salida,
+    }
+
+
+def _diferencia(jpeg_a, jpeg_b):
+    """Diferencia media absoluta por canal (0-255) entre dos resultados."""
+    a = Image.open(BytesIO(jpeg_a)).convert('RGB')
+    b = Image.open(BytesIO(jpeg_b)).convert('RGB')
+    return round(sum(ImageStat.Stat(ImageChops.difference(a, b)).mean) / 3, 2)
+
+
+def ejecutar_benchmark(entradas, estrategias=None, repeticiones=5, progreso=None):
+    """
+    Mide cada estrategia sobre cada entrada. Retorna {entrada: {estrategia: resultado}}
+    con tiempos (ms), megapíxeles por segundo, picos de memoria, bytes de salida y
+    diferencia respecto a la estrategia de referencia.
+    """
+    estrategias = list(estrategias or ESTRATEGIAS)
+    # La referencia se mide siempre para poder calcular la diferencia
+    orden = [REFERENCIA] + [e for e in estrategias if e != REFERENCIA]
+    contexto = get_context('fork') if hasattr(os, 'fork') else get_context('spawn')
+
+    resultados = {}
+    for nombre, datos in entradas:
+        with Image.open(BytesIO(datos)) as img:
+            megapixeles = img.width * img.height / 1e6
+            descripcion = f'{img.format} {img.mode} {img.width}x{img.height}'
+
+        resultados[nombre] = {}
+        salida_referencia = None
+        for estrategia in orden:
+            with contexto.Pool(1) as pool:
+                medicion = pool.apply(_medir, ((datos, estrategia, repeticiones),))
+
+            tiempos = sorted(medicion['tiempos'])
+            mediana = tiempos[len(tiempos) // 2]
+            if estrategia == REFERENCIA:
+                salida_referencia = medicion['salida']
+
+            if estrategia not in estrategias:
+                continue
+            resultados[nombre][estrategia] = {
+                'entrada': descripcion,
+                'bytes_entrada': len(datos),
+                'p50_ms': round(mediana * 1000, 1),
+                'min_ms': round(tiempos[0] * 1000, 1),
+                'megapixeles_s': round(megapixeles / mediana, 1),
+                'pico_rss_kb': medicion['pico_rss_kb'],
+                'pico_python_kb': medicion['pico_python_kb'],
+                'bytes_salida': len(medicion['salida']),
+                'diferencia': _diferencia(medicion['salida'], salida_referencia),
+            }
+            if progreso:
+                progreso(nombre, estrategia, resultados[nombre][estrategia])
+    return resultados
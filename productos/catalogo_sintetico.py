@@ -0,0 +1,254 @@
+"""
+Catálogo sintético para pruebas de carga y de escala.
+
+Genera de forma determinista (a partir de una semilla) categorías, colores, atributos
+dinámicos y productos con sus colores, valores de atributos e imágenes. Los productos
+se insertan con bulk_create por lotes; cada lote usa su propio generador aleatorio
+derivado de la semilla, así que el resultado no depende de cuántos procesos lo generen.
+
+Las imágenes son un conjunto pequeño de marcadores de posición generados en memoria
+con PIL y compartidos entre productos, para no llenar el almacenamiento.
+"""
+import random
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, ImageDraw, ImageOps
+
+from .atributos import parsear_valor_numerico
+from .models import (
+    Producto, Categoria, Color, AtributoDinamico, ValorProducto, ImagenProducto, TasaCambio,
+)
+
+
+PREFIJO_SKU = 'SIN-'
+
+# Categoría raíz -> (tipo de atributos, rango de precios en USD)
+CATEGORIAS_RAIZ = {
+    'Motos Eléctricas': ('electrica', (600, 4500)),
+    'Motos de Combustión': ('combustion', (900, 6000)),
+    'Triciclos': ('electrica', (1200, 5500)),
+    'Accesorios': (None, (10, 400)),
+}
+SUBCATEGORIAS = ['Urbanas', 'Deportivas', 'Clásicas', 'Cargo', 'Off-road', 'Plegables', 'Infantiles', 'Premium']
+
+COLORES = [
+    ('Negro', '#000000'), ('Blanco', '#FFFFFF'), ('Rojo', '#DC2626'), ('Azul', '#2563EB'),
+    ('Gris', '#6B7280'), ('Verde', '#16A34A'), ('Amarillo', '#EAB308'), ('Naranja', '#EA580C'),
+]
+
+# (nombre, unidad, tipo de categoría o None para todos, valores): los valores son un
+# rango numérico (mínimo, máximo, paso) o una lista de opciones de texto
+ATRIBUTOS = [
+    ('Potencia del Motor', 'W', 'electrica', (250, 3000, 50)),
+    ('Voltaje de Batería', 'V', 'electrica', ['48', '60', '72']),
+    ('Autonomía', 'km', 'electrica', (30, 150, 5)),
+    ('Tipo de Batería', '', 'electrica', ['Litio', 'Plomo-ácido', 'LiFePO4']),
+    ('Cilindraje', 'cc', 'combustion', (50, 250, 25)),
+    ('Capacidad del Tanque', 'L', 'combustion', (3, 15, 1)),
+    ('Tipo de Motor', '', 'combustion', ['2 tiempos', '4 tiempos']),
+    ('Velocidad Máxima', 'km/h', None, (25, 120, 5)),
+    ('Garantía', '', None, ['3 meses', '6 meses', '1 año']),
+]
+
+MARCAS = ['Volta', 'Ryder', 'Kaiyo', 'Moviq', 'Tornado', 'Lince', 'Brisa', 'Centella']
+MODELOS = ['City', 'Sport', 'Max', 'Pro', 'Lite', 'GT', 'Cargo', 'Neo', 'X']
+
+MONEDAS = [('USD', 85), ('EUR', 10), ('CUP', 5)]
+
+
+def preparar_metadatos(total_categorias=16, imagenes_distintas=24, semilla=1):
+    """
+    Crea (o reutiliza por nombre) categorías, colores y atributos, y genera las imágenes.
+    Retorna el contexto que necesita generar_lote: solo tipos simples, para poder
+    enviarlo a otros procesos.
+    """
+    raices = {}
+    for nombre in CATEGORIAS_RAIZ:
+        raices[nombre], _ = Categoria.objects.get_or_create(nombre=nombre)
+
+    # Subcategorías repartidas entre las raíces; los productos van solo a las hojas
+    hojas = []
+    nombres_raiz = list(CATEGORIAS_RAIZ)
+    for n in range(total_categorias):
+        raiz = nombres_raiz[n % len(nombres_raiz)]
+        sub = SUBCATEGORIAS[(n // len(nombres_raiz)) % len(SUBCATEGORIAS)]
+        vuelta = n // (len(nombres_raiz) * len(SUBCATEGORIAS))
+        nombre = f'{sub} ({raiz})' + (f' {vuelta + 1}' if vuelta else '')
+        categoria, _ = Categoria.objects.get_or_create(nombre=nombre, defaults={'padre': raices[raiz]})
+        hojas.append((categoria.id, raiz))
+
+    colores = []
+    for orden, (nombre, codigo_hex) in enumerate(COLORES):
+        color, _ = Color.objects.get_or_create(nombre=nombre, defaults={'codigo_hex': codigo_hex, 'orden': orden})
+        if color.es_activo:
+            colores.append(color.id)
+
+    atributos = []
+    for orden, (nombre, unidad, tipo, valores) in enumerate(ATRIBUTOS):
+        atributo, creado = AtributoDinamico.objects.get_or_create(
+            nombre=nombre, defaults={'unidad_medida': unidad, 'orden': orden},
+        )
+        if creado and tipo:
+            atributo.categorias.set([
+                categoria for nombre_raiz, categoria in raices.items()
+                if CATEGORIAS_RAIZ[nombre_raiz][0] == tipo
+            ])
+        atributos.append((atributo, valores))
+
+    # Atributos que aplican a cada hoja: generales, de la hoja o de su raíz
+    aplicables = {}
+    for hoja_id, raiz in hojas:
+        aplicables[hoja_id] = []
+        for atributo, valores in atributos:
+            categorias = set(atributo.categorias.values_list('id', flat=True))
+            if not categorias or hoja_id in categorias or raices[raiz].id in categorias:
+                aplicables[hoja_id].append((atributo.id, atributo.unidad_medida or '', valores))
+
+    tasas = {
+        moneda: str(tasa)
+        for moneda, tasa in TasaCambio.objects.values_list('moneda', 'tasa_usd')
+    }
+
+    return {
+        'hojas': hojas,
+        'rangos_precio': {raiz: rango for raiz, (_, rango) in CATEGORIAS_RAIZ.items()},
+        'colores': colores,
+        'atributos': aplicables,
+        'tasas': tasas,
+        'imagenes': generar_imagenes(imagenes_distintas, semilla),
+    }
+
+
+def _imagen_marcador(rng, n):
+    """Imagen 800x600 con un degradado y una silueta simple, comprimida en JPEG."""
+    color_a = tuple(rng.randrange(40, 220) for _ in range(3))
+    color_b = tuple(rng.randrange(40, 220) for _ in range(3))
+    img = ImageOps.colorize(Image.linear_gradient('L').resize((800, 600)), color_a, color_b)
+
+    dibujo = ImageDraw.Draw(img)
+    for x in (230, 570):
+        dibujo.ellipse((x - 90, 330, x + 90, 510), outline=(30, 30, 30), width=18)
+    dibujo.polygon([(230, 420), (380, 260), (520, 260), (570, 420)], outline=(30, 30, 30), width=14)
+    dibujo.text((24, 24), f'#{n}', fill=(255, 255, 255))
+
+    salida = BytesIO()
+    img.save(salida, format='JPEG', quality=80, optimize=True)
+    return salida.getvalue()
+
+
+def generar_imagenes(cantidad, semilla=1):
+    """Guarda (si no existen) las imágenes de marcador y retorna sus nombres en el almacenamiento."""
+    rng = random.Random(f'{semilla}:imagenes')
+    nombres = []
+    for n in range(cantidad):
+        contenido = _imagen_marcador(rng, n)
+        nombre = f'productos/sinteticos/marcador_{semilla}_{n:03d}.jpg'
+        if not default_storage.exists(nombre):
+            nombre = default_storage.save(nombre, ContentFile(contenido))
+        nombres.append(nombre)
+    return nombres
+
+
+def _valor_atributo(rng, unidad, valores):
+    """Texto del valor con variaciones reales de formato ("1,5 kW", "60km", "60 km")."""
+    if isinstance(valores, list):
+        return rng.choice(valores)
+    minimo, maximo, paso = valores
+    numero = rng.randrange(minimo, maximo + 1, paso)
+    if unidad == 'W' and numero >= 1000 and rng.random() < 0.3:
+        return f"{numero / 1000:g} kW".replace('.', ',')
+    separador = '' if rng.random() < 0.2 else ' '
+    return f'{numero}{separador}{unidad}'
+
+
+def generar_lote(indice_lote, inicio, cantidad, semilla, contexto, galeria=0):
+    """
+    Inserta los productos [inicio, inicio + cantidad) con sus colores, valores de atributos
+    e imágenes. Es determinista para (semilla, indice_lote). Retorna los productos creados.
+    """
+    rng = random.Random(f'{semilla}:{indice_lote}')
+    ahora = timezone.now()
+    tasas = {moneda: Decimal(tasa) for moneda, tasa in contexto['tasas'].items()}
+    imagenes = contexto['imagenes']
+    monedas, pesos_moneda = zip(*MONEDAS)
+
+    productos = []
+    for i in range(inicio, inicio + cantidad):
+        categoria_id, raiz = rng.choice(contexto['hojas'])
+        minimo, maximo = contexto['rangos_precio'][raiz]
+        moneda = rng.choices(monedas, pesos_moneda)[0]
+        precio = Decimal(str(round(rng.uniform(minimo, maximo), 2)))
+        tasa = tasas.get(moneda)
+        # Popularidad con cola larga: pocos productos concentran la mayoría de vistas
+        vistas = min(int(rng.paretovariate(1.2) * 10) - 10, 1_000_000)
+
+        productos.append(Producto(
+            sku=f'{PREFIJO_SKU}{semilla}-{i:07d}',
+            nombre=f'{rng.choice(MARCAS)} {rng.choice(MODELOS)} {i}',
+            descripcion=f'Producto sintético {i} para pruebas de carga.',
+            categoria_id=categoria_id,
+            precio_venta=precio,
+            moneda=moneda,
+            precio_normalizado=(precio * tasa).quantize(Decimal('0.01')) if tasa and moneda != 'USD' else precio,
+            stock_actual=rng.choice([0, 0, 1, 2, 5, 10, 25]),
+            imagen_principal=rng.choice(imagenes) if imagenes else None,
+            vistas=vistas,
+            ventas=int(vistas * rng.uniform(0, 0.05)),
+            es_activo=rng.random() < 0.95,
+        ))
+
+    with transaction.atomic():
+        Producto.objects.bulk_create(productos, batch_size=1000)
+
+        # auto_now_add fija la misma fecha a todo el lote: se reparte en el último año
+        for producto in productos:
+            producto.fecha_creacion = ahora - timedelta(seconds=rng.randrange(365 * 24 * 3600))
+        Producto.objects.bulk_update(productos, ['fecha_creacion'], batch_size=1000)
+
+        colores = contexto['colores']
+        Producto.colores.through.objects.bulk_create([
+            Producto.colores.through(producto_id=producto.id, color_id=color_id)
+            for producto in productos
+            for color_id in rng.sample(colores, min(len(colores), rng.randint(1, 3)))
+        ], batch_size=2000)
+
+        # bulk_create no llama a save(): el valor numérico se calcula aquí
+        valores = []
+        for producto in productos:
+            for atributo_id, unidad, opciones in contexto['atributos'][producto.categoria_id]:
+                if rng.random() < 0.9:
+                    valor = _valor_atributo(rng, unidad, opciones)
+                    valores.append(ValorProducto(
+                        producto_id=producto.id,
+                        atributo_id=atributo_id,
+                        valor=valor,
+                        valor_numerico=parsear_valor_numerico(valor, unidad),
+                    ))
+        ValorProducto.objects.bulk_create(valores, batch_size=2000)
+
+        if imagenes and galeria:
+            ImagenProducto.objects.bulk_create([
+                ImagenProducto(producto_id=producto.id, imagen=rng.choice(imagenes), orden=orden)
+                for producto in productos
+                for orden in range(rng.randint(0, galeria))
+            ], batch_size=2000)
+
+    return len(productos)
+
+
+def eliminar_catalogo_sintetico(tamano_lote=2000):
+    """Elimina por lotes los productos sintéticos (y en cascada sus datos). Retorna cuántos."""
+    total = 0
+    sinteticos = Producto.objects.filter(sku__startswith=PREFIJO_SKU)
+    while True:
+        ids = list(sinteticos.values_list('id', flat=True)[:tamano_lote])
+        if not ids:
+            return total
+        Producto.objects.filter(id__in=ids).delete()
+        total += len(ids)
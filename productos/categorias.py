@@ -0,0 +1,85 @@
+"""
+Árbol de categorías para el sidebar del catálogo.
+
+Se construye a partir de la ruta materializada de Categoria con dos consultas (categorías
+y conteo de productos activos por categoría) y se guarda en caché hasta que cambia una
+categoría o un producto. La clave lleva una versión guardada en la base de datos
+(productos.versiones), así el cambio llega a todos los workers.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from . import versiones
+from .models import Categoria, Producto
+
+
+VERSION = 'categorias_arbol'
+
+
+def invalidar_arbol():
+    versiones.incrementar(VERSION)
+
+
+def _construir_arbol():
+    categorias = list(Categoria.objects.order_by('nivel', 'nombre').values('id', 'nombre', 'padre_id', 'ruta', 'nivel'))
+    directos = dict(
+        Producto.objects.filter(es_activo=True).values('categoria_id')
+        .annotate(total=Count('id')).values_list('categoria_id', 'total')
+    )
+
+    nodos = {}
+    for categoria in categorias:
+        nodos[categoria['id']] = {
+            'id': categoria['id'],
+            'nombre': categoria['nombre'],
+            'nivel': categoria['nivel'],
+            'total': 0,
+            'subcategorias': [],
+        }
+    # Cada producto cuenta en su categoría y en todos sus ancestros
+    for categoria in categorias:
+        total = directos.get(categoria['id'], 0)
+        for ancestro_id in categoria['ruta'].strip('/').split('/'):
+            if ancestro_id and int(ancestro_id) in nodos:
+                nodos[int(ancestro_id)]['total'] += total
+
+    raices = []
+    for categoria in categorias:
+        nodo = nodos[categoria['id']]
+        if categoria['padre_id'] in nodos:
+            nodos[categoria['padre_id']]['subcategorias'].append(nodo)
+        else:
+            raices.append(nodo)
+    return raices
+
+
+def arbol_categorias():
+    """Árbol anidado [{'id', 'nombre', 'nivel', 'total', 'subcategorias': [...]}], desde caché."""
+    clave = f'categorias:arbol:{versiones.version(VERSION)}'
+    arbol = cache.get(clave)
+    if arbol is None:
+        arbol = _construir_arbol()
+        cache.set(clave, arbol, settings.CATEGORIAS_ARBOL_TTL)
+    return arbol
+
+
+def categorias_planas():
+    """El árbol recorrido en profundidad como lista plana (para pintar con sangría)."""
+    resultado = []
+    pendientes = list(reversed(arbol_categorias()))
+    while pendientes:
+        nodo = pendientes.pop()
+        resultado.append(nodo)
+        pendientes.extend(reversed(nodo['subcategorias']))
+    return resultado
+
+
+@receiver(post_save, sender=Categoria)
+@receiver(post_delete, sender=Categoria)
+@receiver(post_save, sender=Producto)
+@receiver(post_delete, sender=Producto)
+def _invalidar_al_cambiar(sender, **kwargs):
+    invalidar_arbol()
@@ -0,0 +1,39 @@
+"""
+Imitación local de Cloudinary para desarrollo, pruebas y benchmarks.
+
+Guarda en disco como FileSystemStorage, pero cada llamada que en Cloudinary es una
+petición HTTP (subir, abrir, borrar, comprobar si existe) espera `latencia_ms`. Sirve
+para medir cuánto ganan las subidas y lecturas en paralelo sin una cuenta de Cloudinary.
+
+Se activa con CLOUDINARY_LOCAL_LATENCIA_MS (ver settings).
+"""
+import time
+
+from django.core.files.storage import FileSystemStorage
+
+
+class CloudinaryLocal(FileSystemStorage):
+
+    def __init__(self, latencia_ms=0, **kwargs):
+        super().__init__(**kwargs)
+        self.latencia = latencia_ms / 1000
+
+    def _esperar(self):
+        if self.latencia:
+            time.sleep(self.latencia)
+
+    def _save(self, name, content):
+        self._esperar()
+        return super()._save(name, content)
+
+    def _open(self, name, mode='rb'):
+        self._esperar()
+        return super()._open(name, mode)
+
+    def delete(self, name):
+        self._esperar()
+        super().delete(name)
+
+    def exists(self, name):
+        self._esperar()
+        return super().exists(name)
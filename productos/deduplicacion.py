@@ -0,0 +1,261 @@
+"""
+Deduplicación de imágenes de productos por hash de contenido.
+
+La misma foto de proveedor suele subirse como imagen principal de un producto y otra vez
+en la galería de sus variantes. Cada imagen procesada queda registrada en
+ImagenProcesada con el SHA-256 del original (por estrategia de procesado, que decide el
+resultado) y el del JPEG resultante:
+
+- Si el original ya se procesó, se reutiliza su archivo: ni Pillow ni subida.
+- Si el original es nuevo pero el JPEG coincide con uno guardado (la misma foto
+  reexportada, por ejemplo), se reutiliza el archivo: se procesa pero no se sube.
+
+Las galerías subidas desde el panel (guardar_galeria) se procesan y suben en un pool de
+hilos acotado, con un presupuesto de tiempo por petición.
+
+Varios registros pueden compartir archivo; el borrado en segundo plano
+(productos/almacenamiento.py) solo borra archivos que ningún registro usa y elimina
+aquí los que borra.
+"""
+import contextvars
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, Sum, Value, When
+
+from . import almacenamiento
+
+from .imagenes import procesar_imagen
+from .marcadores import calcular_marcador
+from .models import ArchivoPorBorrar, ImagenProcesada, ImagenProducto
+
+
+def hash_contenido(datos):
+    """SHA-256 en hexadecimal de unos bytes o de un archivo (leído por trozos)."""
+    if isinstance(datos, bytes):
+        return hashlib.sha256(datos).hexdigest()
+    resumen = hashlib.sha256()
+    datos.seek(0)
+    for trozo in datos.chunks() if hasattr(datos, 'chunks') else iter(lambda: datos.read(1024 * 1024), b''):
+        resumen.update(trozo)
+    datos.seek(0)
+    return resumen.hexdigest()
+
+
+def buscar_originales(hashes, estrategia=None):
+    """{hash_original: ImagenProcesada} de los originales ya procesados con la estrategia."""
+    estrategia = estrategia or settings.IMAGEN_ESTRATEGIA
+    return {
+        imagen.hash_original: imagen
+        for imagen in ImagenProcesada.objects.filter(hash_original__in=set(hashes), estrategia=estrategia)
+    }
+
+
+def buscar_procesadas(hashes):
+    """{hash_procesado: ImagenProcesada} de los JPEG ya guardados."""
+    return {
+        imagen.hash_procesado: imagen
+        for imagen in ImagenProcesada.objects.filter(hash_procesado__in=set(hashes)).order_by('id')
+    }
+
+
+def sumar_reutilizaciones(conteos):
+    """Suma reutilizaciones a varios registros ({id: veces}) con un único UPDATE."""
+    if conteos:
+        ImagenProcesada.objects.filter(id__in=list(conteos)).update(reutilizaciones=F('reutilizaciones') + Case(
+            *[When(id=imagen_id, then=Value(veces)) for imagen_id, veces in conteos.items()],
+            default=Value(0),
+        ))
+
+
+def reclamar(nombres):
+    """
+    Saca de la cola de borrado los archivos que se van a reutilizar y retorna los que
+    siguen existiendo (solo esos se pueden reutilizar).
+
+    El hilo de borrado elimina y confirma los ImagenProcesada de un archivo antes de
+    borrarlo, y borra solo los archivos que siguen en la cola. Al quitar la fila de la
+    cola se espera al hilo si la tiene bloqueada. Si después el registro ya no existe,
+    el archivo está borrado o a punto de borrarse.
+    """
+    nombres = set(nombres)
+    if not nombres:
+        return set()
+    with transaction.atomic():
+        ArchivoPorBorrar.objects.filter(nombre__in=nombres).delete()
+        return set(ImagenProcesada.objects.filter(nombre__in=nombres).values_list('nombre', flat=True))
+
+
+def guardar_campo(archivo_campo):
+    """
+    Procesa el archivo recién asignado a un ImageField de un producto o de su galería y
+    retorna su ImagenProcesada: `nombre` es el nombre guardado en el almacenamiento para
+    asignarlo al campo (así el campo no vuelve a subir nada), con el marcador y el color.
+    Si el contenido ya existe, no se procesa ni se sube.
+    """
+    estrategia = settings.IMAGEN_ESTRATEGIA
+    hash_original = hash_contenido(archivo_campo)
+    existente = buscar_originales([hash_original], estrategia).get(hash_original)
+    if existente and reclamar([existente.nombre]):
+        sumar_reutilizaciones({existente.id: 1})
+        return existente
+
+    contenido = procesar_imagen(archivo_campo, estrategia)
+    hash_procesado = hash_contenido(contenido)
+    marcador, color = calcular_marcador(BytesIO(contenido))
+    igual = buscar_procesadas([hash_procesado]).get(hash_procesado)
+    if igual and reclamar([igual.nombre]):
+        nombre = igual.nombre
+        sumar_reutilizaciones({igual.id: 1})
+    else:
+        base = os.path.splitext(os.path.basename(archivo_campo.name))[0]
+        nombre = archivo_campo.field.generate_filename(archivo_campo.instance, f'{base}.jpg')
+        nombre = archivo_campo.storage.save(nombre, ContentFile(contenido))
+
+    procesada = ImagenProcesada(
+        hash_original=hash_original, estrategia=estrategia, hash_procesado=hash_procesado,
+        nombre=nombre, bytes=len(contenido), marcador=marcador, color=color,
+    )
+    try:
+        with transaction.atomic():
+            procesada.save()
+    except IntegrityError:
+        # Otra petición registró el mismo original a la vez: su archivo vale igual
+        pass
+    return procesada
+
+
+def _procesar_y_subir(datos, nombre, estrategia, cancelado):
+    """
+    Se ejecuta en el pool de hilos (sin tocar la base de datos): procesa una imagen y la
+    sube. Retorna (hash del JPEG, bytes, marcador, color, nombre guardado); el nombre es
+    None si se agotó el presupuesto antes de subirla.
+    """
+    contenido = procesar_imagen(BytesIO(datos), estrategia)
+    marcador, color = calcular_marcador(BytesIO(contenido))
+    guardado = None if cancelado.is_set() else default_storage.save(nombre, ContentFile(contenido))
+    return hash_contenido(contenido), len(contenido), marcador, color, guardado
+
+
+def guardar_galeria(producto, archivos, presupuesto=None, hilos=None):
+    """
+    Crea las ImagenProducto de `producto` con los archivos subidos. Las imágenes nuevas
+    se decodifican, redimensionan y suben a la vez en un pool de hilos (Pillow libera el
+    GIL al decodificar y redimensionar, y las subidas esperan a la red); las que ya se
+    procesaron antes se reutilizan sin pasar por el pool.
+
+    Lo que no termine en `presupuesto` segundos se descarta para que la petición no
+    supere el timeout del worker. Retorna (imágenes creadas, {nombre subido: motivo} de
+    las que no se guardaron).
+    """
+    presupuesto = settings.GALERIA_PRESUPUESTO_SEGUNDOS if presupuesto is None else presupuesto
+    estrategia = settings.IMAGEN_ESTRATEGIA
+    campo = ImagenProducto._meta.get_field('imagen')
+    instancia = ImagenProducto(producto=producto)
+
+    errores = {}
+    entradas = []  # (nombre subido, hash del original)
+    originales = {}  # hash del original -> (bytes, nombre de destino)
+    for archivo in archivos:
+        try:
+            datos = b''.join(archivo.chunks())
+        except OSError as e:
+            errores[archivo.name] = str(e)
+            continue
+        hash_original = hash_contenido(datos)
+        entradas.append((archivo.name, hash_original))
+        base = os.path.splitext(os.path.basename(archivo.name))[0]
+        originales.setdefault(hash_original, (datos, campo.generate_filename(instancia, f'{base}.jpg')))
+    conocidas = buscar_originales(originales, estrategia)
+    vivos = reclamar(registro.nombre for registro in conocidas.values())
+    conocidas = {h: registro for h, registro in conocidas.items() if registro.nombre in vivos}
+
+    resultados = {}  # hash del original -> resultado de _procesar_y_subir
+    pendientes = [h for h in originales if h not in conocidas]
+    if pendientes:
+        cancelado = threading.Event()
+        pool = ThreadPoolExecutor(max_workers=min(hilos or settings.GALERIA_HILOS, len(pendientes)))
+        # Cada tarea corre en una copia del contexto: el tiempo de almacenamiento cuenta
+        # en la medición de la petición
+        futuros = {
+            pool.submit(contextvars.copy_context().run, _procesar_y_subir, *originales[h], estrategia, cancelado): h
+            for h in pendientes
+        }
+        wait(futuros, timeout=presupuesto)
+        cancelado.set()
+        # Las que ya estén subiendo terminan por su cuenta; el barrido de huérfanos
+        # recupera esos archivos
+        pool.shutdown(wait=False, cancel_futures=True)
+        for futuro, hash_original in futuros.items():
+            if not futuro.done() or futuro.cancelled():
+                continue
+            try:
+                resultado = futuro.result()
+            except Exception as e:
+                resultados[hash_original] = e
+            else:
+                if resultado[4] is not None:
+                    resultados[hash_original] = resultado
+
+    # Un JPEG idéntico a uno ya guardado reutiliza ese archivo y el subido se borra
+    procesadas = buscar_procesadas(r[0] for r in resultados.values() if isinstance(r, tuple))
+    vivos = reclamar(registro.nombre for registro in procesadas.values())
+    procesadas = {h: registro for h, registro in procesadas.items() if registro.nombre in vivos}
+    duplicados = []
+    nuevas = {}
+    reutilizaciones = {}
+    for hash_original, resultado in resultados.items():
+        if not isinstance(resultado, tuple):
+            continue
+        hash_procesado, tamano, marcador, color, nombre = resultado
+        igual = procesadas.get(hash_procesado)
+        if igual:
+            duplicados.append(nombre)
+            nombre = igual.nombre
+            reutilizaciones[igual.id] = reutilizaciones.get(igual.id, 0) + 1
+        nuevas[hash_original] = ImagenProcesada(
+            hash_original=hash_original, estrategia=estrategia, hash_procesado=hash_procesado,
+            nombre=nombre, bytes=tamano, marcador=marcador, color=color,
+        )
+
+    imagenes = []
+    for nombre_subido, hash_original in entradas:
+        if hash_original in conocidas:
+            registro = conocidas[hash_original]
+            reutilizaciones[registro.id] = reutilizaciones.get(registro.id, 0) + 1
+        elif hash_original in nuevas:
+            registro = nuevas[hash_original]
+        else:
+            error = resultados.get(hash_original)
+            errores[nombre_subido] = str(error) if error else f'no se procesó en {presupuesto:g} s'
+            continue
+        imagenes.append(ImagenProducto(
+            producto=producto, imagen=registro.nombre, marcador=registro.marcador,
+            color=registro.color, orden=0,
+        ))
+
+    with transaction.atomic():
+        ImagenProcesada.objects.bulk_create(nuevas.values(), ignore_conflicts=True)
+        sumar_reutilizaciones(reutilizaciones)
+        imagenes = ImagenProducto.objects.bulk_create(imagenes)
+        almacenamiento.encolar(duplicados)
+    return imagenes, errores
+
+
+def estadisticas():
+    """Resumen para el panel: archivos únicos, subidas evitadas y espacio ahorrado."""
+    datos = ImagenProcesada.objects.aggregate(
+        registros=Count('id'),
+        archivos=Count('nombre', distinct=True),
+        total_reutilizaciones=Sum('reutilizaciones'),
+        bytes_ahorrados=Sum(F('bytes') * F('reutilizaciones')),
+    )
+    datos['reutilizaciones'] = datos.pop('total_reutilizaciones')
+    return {clave: valor or 0 for clave, valor in datos.items()}
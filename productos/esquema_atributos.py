@@ -0,0 +1,69 @@
+"""
+Esquema de atributos dinámicos por categoría para los formularios del panel de administración.
+
+El esquema resuelto (atributos de la categoría + generales) se guarda en caché junto con
+su ETag. La clave lleva una versión guardada en la base de datos (productos.versiones)
+que se incrementa cada vez que se modifica un AtributoDinamico, sus categorías o una
+Categoría, así la invalidación llega a todos los workers aunque la caché sea local.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from . import versiones
+from .models import AtributoDinamico, Categoria
+
+
+VERSION = 'esquema_atributos'
+
+
+def invalidar_esquema():
+    """Descarta todos los esquemas en caché, en todos los workers."""
+    versiones.incrementar(VERSION)
+
+
+def obtener_esquema(categoria_id):
+    """
+    Retorna (atributos, etag) para la categoría, o None si la categoría no existe.
+    Cada atributo es un dict con id, nombre, unidad_medida y categorias (texto).
+    """
+    clave = f'esquema_atributos:{versiones.version(VERSION)}:{categoria_id}'
+    esquema = cache.get(clave)
+    if esquema is None:
+        if not Categoria.objects.filter(id=categoria_id).exists():
+            return None
+
+        atributos = AtributoDinamico.objects.filter(
+            Q(categorias__isnull=True) | Q(categorias=categoria_id)
+        ).distinct().order_by('orden', 'nombre').prefetch_related('categorias')
+
+        datos = [{
+            'id': attr.id,
+            'nombre': attr.nombre,
+            'unidad_medida': attr.unidad_medida or '',
+            'categorias': ', '.join(c.nombre for c in attr.categorias.all()) or 'Todas',
+        } for attr in atributos]
+
+        # ETag por contenido: igual en todos los workers aunque la caché sea local
+        etag = '"%s"' % hashlib.md5(
+            json.dumps(datos, sort_keys=True).encode()
+        ).hexdigest()
+        esquema = (datos, etag)
+        cache.set(clave, esquema, settings.ESQUEMA_ATRIBUTOS_TTL)
+    return esquema
+
+
+@receiver(post_save, sender=AtributoDinamico)
+@receiver(post_delete, sender=AtributoDinamico)
+@receiver(post_save, sender=Categoria)
+@receiver(post_delete, sender=Categoria)
+@receiver(m2m_changed, sender=AtributoDinamico.categorias.through)
+def _invalidar_al_cambiar(sender, **kwargs):
+    if kwargs.get('action', '').startswith('pre_'):
+        return
+    invalidar_esquema()
@@ -0,0 +1,141 @@
+"""
+Exportación del catálogo en streaming (CSV o JSON Lines).
+
+Los productos se recorren con iterator(chunk_size=...) (en PostgreSQL, un cursor del
+lado del servidor) y por cada bloque se traen en tres consultas sus colores, sus
+imágenes de galería y sus valores de atributos, que se pivotan a una columna por
+atributo. La memoria usada depende del tamaño del bloque, no del catálogo.
+
+Las columnas son las mismas que acepta la importación (productos/importacion.py), así
+que un CSV exportado se puede volver a importar:
+
+    sku, nombre, categoria, precio, moneda, stock, descripcion, colores, imagen,
+    galeria, activo, <un atributo por columna>
+"""
+import csv
+import json
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import Exists, OuterRef
+
+from .importacion import COLUMNAS
+from .models import AtributoDinamico, Categoria, Color, ImagenProducto, Producto, ValorProducto
+
+
+FORMATOS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'jsonl': ('application/x-ndjson; charset=utf-8', 'jsonl'),
+}
+
+
+def filtrar_productos(categoria_id=None, estado=None):
+    """Productos a exportar: de una categoría (con sus subcategorías) y activos o inactivos."""
+    productos = Producto.objects.all()
+    if categoria_id:
+        ruta = Categoria.objects.values_list('ruta', flat=True).get(pk=categoria_id)
+        productos = productos.filter(categoria__ruta__startswith=ruta)
+    if estado == 'activo':
+        productos = productos.filter(es_activo=True)
+    elif estado == 'inactivo':
+        productos = productos.filter(es_activo=False)
+    return productos
+
+
+class Exportacion:
+    """
+    Genera los registros de los productos del queryset, un dict por producto con las
+    claves de `columnas`. Uso:
+
+        exportacion = Exportacion(filtrar_productos(estado='activo'))
+        for linea in exportacion.csv():
+            ...
+    """
+
+    def __init__(self, productos=None, tamano_bloque=None):
+        self.productos = Producto.objects.all() if productos is None else productos
+        self.tamano_bloque = max(tamano_bloque or settings.EXPORTACION_TAMANO_BLOQUE, 1)
+
+        # Solo los atributos con algún valor entre los productos exportados
+        self.atributos = list(
+            AtributoDinamico.objects.filter(
+                Exists(ValorProducto.objects.filter(atributo=OuterRef('pk'), producto__in=self.productos))
+            ).order_by('orden', 'nombre').values_list('id', 'nombre')
+        )
+        self.columnas = COLUMNAS + [nombre for _, nombre in self.atributos]
+
+    def registros(self):
+        categorias = dict(Categoria.objects.values_list('id', 'nombre_completo'))
+        colores = dict(Color.objects.values_list('id', 'nombre'))
+        campos = ['id', 'sku', 'nombre', 'categoria_id', 'precio_venta', 'moneda', 'stock_actual',
+                  'descripcion', 'imagen_principal', 'es_activo']
+        filas = self.productos.order_by('id').values_list(*campos).iterator(chunk_size=self.tamano_bloque)
+
+        while True:
+            bloque = list(islice(filas, self.tamano_bloque))
+            if not bloque:
+                return
+            ids = [fila[0] for fila in bloque]
+
+            colores_producto = {}
+            for producto_id, color_id in Producto.colores.through.objects.filter(
+                producto_id__in=ids
+            ).values_list('producto_id', 'color_id'):
+                colores_producto.setdefault(producto_id, []).append(colores[color_id])
+
+            galerias = {}
+            for producto_id, imagen in ImagenProducto.objects.filter(
+                producto_id__in=ids
+            ).order_by('orden', 'fecha_subida').values_list('producto_id', 'imagen'):
+                galerias.setdefault(producto_id, []).append(imagen)
+
+            valores = {}
+            for producto_id, atributo_id, valor in ValorProducto.objects.filter(
+                producto_id__in=ids
+            ).values_list('producto_id', 'atributo_id', 'valor'):
+                valores.setdefault(producto_id, {})[atributo_id] = valor
+
+            for (producto_id, sku, nombre, categoria_id, precio, moneda, stock,
+                 descripcion, imagen, activo) in bloque:
+                registro = {
+                    'sku': sku,
+                    'nombre': nombre,
+                    'categoria': categorias.get(categoria_id, ''),
+                    'precio': str(precio),
+                    'moneda': moneda,
+                    'stock': stock,
+                    'descripcion': descripcion or '',
+                    'colores': sorted(colores_producto.get(producto_id, [])),
+                    'imagen': imagen or '',
+                    'galeria': galerias.get(producto_id, []),
+                    'activo': activo,
+                }
+                valores_producto = valores.get(producto_id, {})
+                for atributo_id, atributo in self.atributos:
+                    registro[atributo] = valores_producto.get(atributo_id, '')
+                yield registro
+
+    def csv(self):
+        """Líneas CSV (encabezado incluido), listas para StreamingHttpResponse."""
+        class Linea:
+            # csv.writer escribe en este "archivo" y devuelve lo escrito
+            def write(self, texto):
+                return texto
+
+        escritor = csv.writer(Linea())
+        yield escritor.writerow(self.columnas)
+        for registro in self.registros():
+            registro['colores'] = ', '.join(registro['colores'])
+            registro['galeria'] = ', '.join(registro['galeria'])
+            registro['activo'] = 'si' if registro['activo'] else 'no'
+            yield escritor.writerow([registro[columna] for columna in self.columnas])
+
+    def jsonl(self):
+        """Un objeto JSON por línea, con colores y galería como listas."""
+        for registro in self.registros():
+            yield json.dumps(registro, ensure_ascii=False) + '\n'
+
+    def lineas(self, formato):
+        if formato not in FORMATOS:
+            raise ValueError(f'Formato no soportado: {formato} (usa {" o ".join(FORMATOS)})')
+        return getattr(self, formato)()
@@ -0,0 +1,138 @@
+"""
+Facetas de atributos dinámicos para el sidebar del catálogo.
+
+Los conteos por valor se guardan en ConteoValorAtributo cuando cambia un producto,
+así el listado solo lee unas pocas filas indexadas en lugar de agrupar ValorProducto
+en cada petición. Solo se facetan los valores no numéricos (tipo de batería,
+transmisión, frenos...); los numéricos se filtran por rango, y los rangos (mínimo y
+máximo por atributo) se guardan en caché y se invalidan junto con los conteos, con una
+versión en la base de datos (productos.versiones) para que lo vean todos los workers.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q, Sum
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from . import versiones
+from .models import AtributoDinamico, Categoria, ValorProducto, ConteoValorAtributo
+
+
+# Valores mostrados como máximo por atributo
+MAX_VALORES_FACETA = 10
+VERSION_RANGOS = 'facetas_rangos'
+
+
+def invalidar_rangos():
+    versiones.incrementar(VERSION_RANGOS)
+
+
+def recalcular_conteos(categoria_ids=None):
+    """
+    Recalcula los conteos de las categorías indicadas (todas si es None) y el total global.
+    """
+    valores = ValorProducto.objects.filter(producto__es_activo=True, valor_numerico__isnull=True)
+    existentes = ConteoValorAtributo.objects.filter(categoria__isnull=False)
+    if categoria_ids is not None:
+        categoria_ids = [c for c in categoria_ids if c]
+        valores = valores.filter(producto__categoria_id__in=categoria_ids)
+        existentes = existentes.filter(categoria_id__in=categoria_ids)
+
+    with transaction.atomic():
+        existentes.delete()
+        ConteoValorAtributo.objects.bulk_create([
+            ConteoValorAtributo(
+                atributo_id=fila['atributo_id'],
+                categoria_id=fila['producto__categoria_id'],
+                valor=fila['valor'],
+                total=fila['total'],
+            )
+            for fila in valores.values('atributo_id', 'producto__categoria_id', 'valor').annotate(
+                total=Count('id')
+            ).order_by()
+        ], batch_size=1000)
+
+        # El total global se deriva de las filas por categoría (tabla pequeña)
+        ConteoValorAtributo.objects.filter(categoria__isnull=True).delete()
+        ConteoValorAtributo.objects.bulk_create([
+            ConteoValorAtributo(
+                atributo_id=fila['atributo_id'],
+                valor=fila['valor'],
+                total=fila['total'],
+            )
+            for fila in ConteoValorAtributo.objects.filter(categoria__isnull=False)
+            .values('atributo_id', 'valor').annotate(total=Sum('total')).order_by()
+        ], batch_size=1000)
+    invalidar_rangos()
+
+
+def rangos_atributos():
+    """
+    Mínimo y máximo de los atributos numéricos de los productos activos, para los
+    sliders del sidebar: [{'atributo_id', 'atributo__nombre', 'atributo__unidad_medida',
+    'atributo__orden', 'minimo', 'maximo'}], desde caché.
+    """
+    clave = f'facetas:rangos:{versiones.version(VERSION_RANGOS)}'
+    rangos = cache.get(clave)
+    if rangos is None:
+        rangos = list(
+            ValorProducto.objects.filter(producto__es_activo=True, valor_numerico__isnull=False).values(
+                'atributo_id', 'atributo__nombre', 'atributo__unidad_medida', 'atributo__orden'
+            ).annotate(
+                minimo=Min('valor_numerico'),
+                maximo=Max('valor_numerico')
+            ).order_by('atributo__orden', 'atributo__nombre')
+        )
+        cache.set(clave, rangos, settings.FACETAS_RANGOS_TTL)
+    return rangos
+
+
+def facetas_para_categoria(categoria_id=None, seleccionados=None):
+    """
+    Retorna las facetas de los atributos que aplican a la categoría (o de los generales si
+    no hay categoría): [{'atributo': ..., 'valores': [{'valor', 'total', 'seleccionado'}]}].
+    """
+    seleccionados = seleccionados or {}
+    if categoria_id:
+        aplicables = AtributoDinamico.objects.filter(
+            Q(categorias__isnull=True) | Q(categorias=categoria_id)
+        )
+    else:
+        aplicables = AtributoDinamico.objects.filter(categorias__isnull=True)
+
+    conteos = ConteoValorAtributo.objects.filter(atributo__in=aplicables.values('id'))
+    if categoria_id:
+        # Suma los conteos del subárbol de la categoría
+        ruta = Categoria.objects.filter(id=categoria_id).values_list('ruta', flat=True).first() or '-'
+        conteos = conteos.filter(categoria__ruta__startswith=ruta)
+    else:
+        conteos = conteos.filter(categoria__isnull=True)
+    conteos = conteos.values(
+        'atributo_id', 'atributo__nombre', 'atributo__orden', 'valor'
+    ).annotate(suma=Sum('total')).order_by('atributo__orden', 'atributo__nombre', '-suma', 'valor')
+
+    facetas = []
+    for conteo in conteos:
+        if not facetas or facetas[-1]['atributo']['id'] != conteo['atributo_id']:
+            facetas.append({
+                'atributo': {'id': conteo['atributo_id'], 'nombre': conteo['atributo__nombre']},
+                'valores': [],
+            })
+        valores = facetas[-1]['valores']
+        if len(valores) < MAX_VALORES_FACETA:
+            valores.append({
+                'valor': conteo['valor'],
+                'total': conteo['suma'],
+                'seleccionado': conteo['valor'] in seleccionados.get(conteo['atributo_id'], set()),
+            })
+    return facetas
+
+
+@receiver(post_save, sender=AtributoDinamico)
+@receiver(post_delete, sender=AtributoDinamico)
+@receiver(post_save, sender=ValorProducto)
+@receiver(post_delete, sender=ValorProducto)
+def _invalidar_al_cambiar(sender, **kwargs):
+    # El nombre, la unidad y el orden del atributo también forman parte de los rangos
+    invalidar_rangos()
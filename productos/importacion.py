@@ -0,0 +1,599 @@
+"""
+Importación masiva de productos desde una hoja de cálculo (CSV o XLSX).
+
+La hoja se lee fila a fila, sin cargarla entera en memoria, y se inserta por lotes con
+bulk_create (productos, colores, valores de atributos e imágenes de galería), con una
+transacción por lote. La primera fila son los encabezados; se reconocen sin distinguir
+mayúsculas ni acentos:
+
+    nombre*, categoria*, precio*, sku, moneda, stock, descripcion, colores, imagen,
+    galeria, activo
+
+"categoria" admite el nombre o el nombre completo ("Motos > Eléctricas"); "colores" y
+"galeria", varios valores separados por comas o punto y coma. Cualquier otra columna
+cuyo encabezado sea el nombre de un AtributoDinamico se guarda como valor de ese
+atributo; las demás se ignoran con un aviso.
+
+Las imágenes se buscan por nombre de archivo en un zip o una carpeta y se procesan en
+un pool de procesos (cada uno lee su archivo) antes de insertar cada lote; las que ya
+se procesaron antes (mismo contenido) se reutilizan, ver productos/deduplicacion.py. Las filas con
+errores se omiten y se informan con su número; el resto se importa. En modo simulación
+solo se valida.
+"""
+import csv
+import io
+import os
+import re
+import time
+import unicodedata
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from io import BytesIO
+from multiprocessing import get_context
+
+import django
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from .categorias import invalidar_arbol
+from .facetas import recalcular_conteos
+from .deduplicacion import buscar_originales, buscar_procesadas, hash_contenido, reclamar, sumar_reutilizaciones
+from .imagenes import procesar_imagen
+from .marcadores import calcular_marcador
+from .models import (
+    AtributoDinamico, Categoria, Color, ImagenProcesada, ImagenProducto, Producto,
+    TasaCambio, ValorProducto,
+)
+from .atributos import parsear_valor_numerico
+
+
+COLUMNAS = ['sku', 'nombre', 'categoria', 'precio', 'moneda', 'stock', 'descripcion',
+            'colores', 'imagen', 'galeria', 'activo']
+OBLIGATORIAS = ['nombre', 'categoria', 'precio']
+FALSO = {'0', 'no', 'false', 'falso', 'inactivo', 'n'}
+EXTENSIONES_IMAGEN = ('.jpg', '.jpeg', '.png', '.webp', '.gif')
+# Máximo de una columna IntegerField (stock_actual) en PostgreSQL
+STOCK_MAXIMO = 2 ** 31 - 1
+
+
+def _clave(texto):
+    """Forma normalizada para comparar nombres: sin acentos, minúsculas y espacios simples."""
+    texto = unicodedata.normalize('NFKD', str(texto or '')).encode('ascii', 'ignore').decode()
+    return ' '.join(texto.casefold().split())
+
+
+def _texto(valor):
+    """Celda como texto; las de XLSX pueden llegar como número o None."""
+    if valor is None:
+        return ''
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return str(valor).strip()
+
+
+def _lista(valor):
+    return [v.strip() for v in re.split(r'[;,]', valor) if v.strip()]
+
+
+# ===== LECTURA =====
+
+def _filas_csv(archivo):
+    texto = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+    try:
+        muestra = texto.read(8192)
+        texto.seek(0)
+        try:
+            dialecto = csv.Sniffer().sniff(muestra, delimiters=',;\t')
+        except csv.Error:
+            dialecto = csv.excel
+        yield from csv.reader(texto, dialecto)
+    finally:
+        # El archivo es del llamador: que TextIOWrapper no lo cierre
+        texto.detach()
+
+
+def _filas_xlsx(archivo):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError('Para importar XLSX hace falta openpyxl (pip install openpyxl)')
+
+    libro = load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        yield from libro.active.iter_rows(values_only=True)
+    finally:
+        libro.close()
+
+
+def leer_hoja(archivo, nombre):
+    """
+    Abre una hoja CSV o XLSX (archivo binario; `nombre` decide el formato). Retorna
+    (encabezados, filas), donde filas genera (número de fila, [celdas como texto]).
+    """
+    if nombre.lower().endswith(('.xlsx', '.xlsm')):
+        filas = _filas_xlsx(archivo)
+    elif nombre.lower().endswith(('.csv', '.txt')):
+        filas = _filas_csv(archivo)
+    else:
+        raise ValueError(f'Formato no soportado: {nombre} (usa .csv o .xlsx)')
+
+    try:
+        encabezados = [_texto(celda) for celda in next(filas)]
+    except StopIteration:
+        raise ValueError('La hoja está vacía')
+
+    def datos():
+        for numero, celdas in enumerate(filas, 2):
+            celdas = [_texto(celda) for celda in celdas]
+            if any(celdas):
+                yield numero, celdas
+    return encabezados, datos()
+
+
+# ===== IMÁGENES =====
+
+class OrigenImagenes:
+    """
+    Imágenes de un zip o de una carpeta, buscadas por ruta relativa o por nombre de
+    archivo (sin distinguir mayúsculas). Solo se indexan los archivos de imagen.
+    """
+
+    def __init__(self, ruta):
+        self.ruta = str(ruta)
+        self.es_zip = zipfile.is_zipfile(self.ruta)
+        self.indice = {}
+        if self.es_zip:
+            with zipfile.ZipFile(self.ruta) as contenido:
+                miembros = [
+                    (info.filename, info.file_size) for info in contenido.infolist()
+                    if not info.is_dir() and info.filename.lower().endswith(EXTENSIONES_IMAGEN)
+                ]
+        elif os.path.isdir(self.ruta):
+            miembros = []
+            for raiz, _, archivos in os.walk(self.ruta):
+                for nombre in archivos:
+                    if nombre.lower().endswith(EXTENSIONES_IMAGEN):
+                        completa = os.path.join(raiz, nombre)
+                        miembros.append((os.path.relpath(completa, self.ruta).replace(os.sep, '/'), os.path.getsize(completa)))
+        else:
+            raise ValueError(f'{self.ruta} no es un zip ni una carpeta')
+
+        for miembro, tamano in miembros:
+            for clave in (miembro.lower(), miembro.rsplit('/', 1)[-1].lower()):
+                self.indice.setdefault(clave, (miembro, tamano))
+
+    def buscar(self, nombre):
+        """(miembro, tamaño) de la imagen, o None si no está."""
+        clave = nombre.strip().replace('\\', '/').lower()
+        # Una ruta de almacenamiento (p. ej. de una exportación) también vale por su nombre
+        return self.indice.get(clave) or self.indice.get(clave.rsplit('/', 1)[-1])
+
+
+_zips_abiertos = {}
+
+
+def _leer_imagen(ruta, es_zip, miembro):
+    if not es_zip:
+        with open(os.path.join(ruta, miembro), 'rb') as archivo:
+            return archivo.read()
+    # Cada proceso del pool abre el zip una sola vez
+    if ruta not in _zips_abiertos:
+        _zips_abiertos[ruta] = zipfile.ZipFile(ruta)
+    return _zips_abiertos[ruta].read(miembro)
+
+
+def _procesar_imagen(argumentos):
+    """
+    Se ejecuta en el pool: lee y procesa una imagen. Retorna ((jpeg, marcador, color), None)
+    o (None, error).
+    """
+    ruta, es_zip, miembro = argumentos
+    try:
+        contenido = procesar_imagen(BytesIO(_leer_imagen(ruta, es_zip, miembro)))
+        return (contenido, *calcular_marcador(BytesIO(contenido))), None
+    except Exception as e:
+        return None, f'{miembro}: {e}'
+
+
+def _inicializar_proceso():
+    # Con el método "spawn" el proceso hijo arranca sin Django configurado
+    django.setup()
+
+
+# ===== IMPORTACIÓN =====
+
+class ResultadoImportacion:
+    # Mensajes de error guardados como máximo (una hoja mal formada puede fallar entera)
+    MAX_ERRORES = 500
+
+    def __init__(self, simulacion):
+        self.simulacion = simulacion
+        self.filas = 0
+        self.validas = 0
+        self.creados = 0
+        self.imagenes = 0
+        self.reutilizadas = 0  # imágenes que no se procesaron ni subieron por estar ya guardadas
+        self.lotes = 0
+        self.errores = []  # [(fila, mensaje)]
+        self.total_errores = 0
+        self.avisos = []
+        self.segundos = 0.0
+
+    def error(self, fila, mensaje):
+        self.total_errores += 1
+        if len(self.errores) < self.MAX_ERRORES:
+            self.errores.append((fila, mensaje))
+
+
+class Importacion:
+    """
+    Importa una hoja ya abierta con leer_hoja. Uso:
+
+        encabezados, filas = leer_hoja(archivo, nombre)
+        resultado = Importacion(imagenes=OrigenImagenes('fotos.zip')).ejecutar(encabezados, filas)
+
+    `progreso`, si se indica, se llama con el ResultadoImportacion tras cada lote.
+    """
+
+    def __init__(self, imagenes=None, tamano_lote=None, procesos=None, simular=False,
+                 relacionados=False, progreso=None):
+        self.imagenes = imagenes
+        self.tamano_lote = max(tamano_lote or settings.IMPORTACION_TAMANO_LOTE, 1)
+        self.procesos = max(procesos or settings.IMPORTACION_PROCESOS, 1)
+        self.simular = simular
+        self.relacionados = relacionados
+        self.progreso = progreso
+        self.resultado = ResultadoImportacion(simular)
+
+        # Todo lo que hay que resolver por nombre, cargado una vez
+        self.categorias = {}
+        for categoria in Categoria.objects.only('id', 'nombre', 'nombre_completo'):
+            self.categorias.setdefault(_clave(categoria.nombre), categoria)
+            self.categorias.setdefault(_clave(categoria.nombre_completo), categoria)
+        self.colores = {_clave(nombre): id for id, nombre in Color.objects.values_list('id', 'nombre')}
+        self.atributos = {
+            _clave(nombre): (id, unidad) for id, nombre, unidad
+            in AtributoDinamico.objects.values_list('id', 'nombre', 'unidad_medida')
+        }
+        self.tasas = dict(TasaCambio.objects.values_list('moneda', 'tasa_usd'))
+        self.monedas = {moneda for moneda, _ in Producto.MONEDAS}
+        self.sku_max = Producto._meta.get_field('sku').max_length
+        self.skus_vistos = set()
+        self.categorias_tocadas = set()
+
+    def ejecutar(self, encabezados, filas):
+        inicio = time.perf_counter()
+        self._mapear_columnas(encabezados)
+
+        pool = None
+        if self.imagenes and not self.simular and self.procesos > 1:
+            from django.db import connections
+            # Los procesos hijos no deben heredar las conexiones abiertas del padre
+            connections.close_all()
+            pool = get_context().Pool(self.procesos, initializer=_inicializar_proceso)
+        try:
+            lote = []
+            for numero, celdas in filas:
+                self.resultado.filas += 1
+                fila = self._fila(numero, celdas)
+                if fila is not None:
+                    lote.append(fila)
+                if len(lote) >= self.tamano_lote:
+                    self._lote(lote, pool)
+                    lote = []
+            if lote:
+                self._lote(lote, pool)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        if self.resultado.creados:
+            # bulk_create no dispara señales: se recalculan los datos derivados
+            recalcular_conteos(list(self.categorias_tocadas))
+            invalidar_arbol()
+            if self.relacionados:
+                from .similitud import recalcular_relacionados
+                recalcular_relacionados()
+
+        self.resultado.segundos = time.perf_counter() - inicio
+        return self.resultado
+
+    def _mapear_columnas(self, encabezados):
+        self.columnas = {}
+        self.columnas_atributos = []
+        for indice, encabezado in enumerate(encabezados):
+            clave = _clave(encabezado)
+            if clave in COLUMNAS and clave not in self.columnas:
+                self.columnas[clave] = indice
+            elif clave in self.atributos:
+                self.columnas_atributos.append((indice, *self.atributos[clave]))
+            elif clave:
+                self.resultado.avisos.append(f'Columna "{encabezado}" ignorada: no es un campo ni un atributo')
+
+        faltan = [c for c in OBLIGATORIAS if c not in self.columnas]
+        if faltan:
+            raise ValueError(f'Faltan columnas obligatorias: {", ".join(faltan)}')
+        if not self.imagenes and ('imagen' in self.columnas or 'galeria' in self.columnas):
+            self.resultado.avisos.append('Hay columnas de imágenes pero no se indicó zip ni carpeta: se ignoran')
+
+    def _celda(self, celdas, columna):
+        indice = self.columnas.get(columna)
+        return celdas[indice] if indice is not None and indice < len(celdas) else ''
+
+    def _fila(self, numero, celdas):
+        """Valida y resuelve una fila. Retorna el dict para el lote o None si tiene errores."""
+        try:
+            nombre = self._celda(celdas, 'nombre')
+            if not nombre:
+                raise ValueError('falta el nombre')
+
+            categoria = self.categorias.get(_clave(self._celda(celdas, 'categoria')))
+            if categoria is None:
+                raise ValueError(f'categoría desconocida "{self._celda(celdas, "categoria")}"')
+
+            try:
+                precio = Decimal(self._celda(celdas, 'precio').replace(',', '.'))
+            except InvalidOperation:
+                raise ValueError(f'precio no válido "{self._celda(celdas, "precio")}"')
+            if not precio.is_finite() or precio < Decimal('0.01'):
+                raise ValueError('el precio debe ser mayor que 0')
+            precio = precio.quantize(Decimal('0.01'))
+
+            moneda = (self._celda(celdas, 'moneda') or 'USD').upper()
+            if moneda not in self.monedas:
+                raise ValueError(f'moneda desconocida "{moneda}"')
+
+            stock_texto = self._celda(celdas, 'stock') or '0'
+            try:
+                stock = int(stock_texto)
+            except ValueError:
+                raise ValueError(f'stock no válido "{stock_texto}"')
+            if not 0 <= stock <= STOCK_MAXIMO:
+                raise ValueError(f'stock fuera de rango "{stock_texto}"')
+
+            colores = []
+            for color in _lista(self._celda(celdas, 'colores')):
+                if _clave(color) not in self.colores:
+                    raise ValueError(f'color desconocido "{color}"')
+                colores.append(self.colores[_clave(color)])
+
+            sku = self._celda(celdas, 'sku')
+            if len(sku) > self.sku_max:
+                # En PostgreSQL haría fallar el lote entero al insertar
+                raise ValueError(f'SKU de más de {self.sku_max} caracteres')
+            if sku:
+                if sku in self.skus_vistos:
+                    raise ValueError(f'SKU "{sku}" repetido en la hoja')
+                self.skus_vistos.add(sku)
+
+            imagen, galeria = None, []
+            if self.imagenes:
+                nombres = [self._celda(celdas, 'imagen')] if self._celda(celdas, 'imagen') else []
+                nombres += _lista(self._celda(celdas, 'galeria'))
+                encontradas = []
+                for nombre_imagen in nombres:
+                    encontrada = self.imagenes.buscar(nombre_imagen)
+                    if encontrada is None:
+                        raise ValueError(f'imagen "{nombre_imagen}" no está en {os.path.basename(self.imagenes.ruta)}')
+                    if encontrada[1] > settings.IMPORTACION_MAX_BYTES_IMAGEN:
+                        raise ValueError(f'imagen "{nombre_imagen}" demasiado grande')
+                    encontradas.append(encontrada[0])
+                if self._celda(celdas, 'imagen'):
+                    imagen, galeria = encontradas[0], encontradas[1:]
+                else:
+                    galeria = encontradas
+        except ValueError as e:
+            self.resultado.error(numero, str(e))
+            return None
+
+        tasa = self.tasas.get(moneda)
+        producto = Producto(
+            sku=sku,
+            nombre=nombre[:200],
+            descripcion=self._celda(celdas, 'descripcion'),
+            categoria=categoria,
+            precio_venta=precio,
+            moneda=moneda,
+            precio_normalizado=(precio * tasa).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP) if tasa and moneda != 'USD' else precio,
+            stock_actual=stock,
+            es_activo=_clave(self._celda(celdas, 'activo')) not in FALSO,
+        )
+        if not producto.sku:
+            producto.sku = producto._generar_sku()
+
+        valores = []
+        for indice, atributo_id, unidad in self.columnas_atributos:
+            valor = celdas[indice][:200] if indice < len(celdas) else ''
+            if valor:
+                valores.append(ValorProducto(
+                    atributo_id=atributo_id,
+                    valor=valor,
+                    # bulk_create no llama a save(): el valor numérico se calcula aquí
+                    valor_numerico=parsear_valor_numerico(valor, unidad),
+                ))
+
+        self.resultado.validas += 1
+        return {'numero': numero, 'producto': producto, 'colores': colores, 'valores': valores,
+                'imagen': imagen, 'galeria': galeria}
+
+    def _lote(self, lote, pool):
+        self.resultado.lotes += 1
+        existentes = set(Producto.objects.filter(
+            sku__in=[fila['producto'].sku for fila in lote]
+        ).values_list('sku', flat=True))
+        for fila in lote:
+            if fila['producto'].sku in existentes:
+                self.resultado.error(fila['numero'], f'ya existe un producto con SKU "{fila["producto"].sku}"')
+        lote = [fila for fila in lote if fila['producto'].sku not in existentes]
+        self.resultado.validas -= len(existentes)
+
+        if self.simular or not lote:
+            self._notificar()
+            return
+
+        guardadas = []
+        nuevas, reutilizaciones = [], {}
+        if self.imagenes:
+            lote, guardadas, (nuevas, reutilizaciones) = self._imagenes_lote(lote, pool)
+
+        try:
+            with transaction.atomic():
+                productos = [fila['producto'] for fila in lote]
+                Producto.objects.bulk_create(productos, batch_size=500)
+
+                Producto.colores.through.objects.bulk_create([
+                    Producto.colores.through(producto_id=fila['producto'].id, color_id=color_id)
+                    for fila in lote for color_id in set(fila['colores'])
+                ], batch_size=2000)
+
+                for fila in lote:
+                    for valor in fila['valores']:
+                        valor.producto_id = fila['producto'].id
+                ValorProducto.objects.bulk_create(
+                    [valor for fila in lote for valor in fila['valores']], batch_size=2000
+                )
+
+                ImagenProducto.objects.bulk_create([
+                    ImagenProducto(producto_id=fila['producto'].id, imagen=procesada.nombre, orden=orden,
+                                   marcador=procesada.marcador, color=procesada.color)
+                    for fila in lote for orden, procesada in enumerate(fila['galeria'])
+                ], batch_size=2000)
+
+                ImagenProcesada.objects.bulk_create(nuevas, batch_size=500, ignore_conflicts=True)
+                sumar_reutilizaciones(reutilizaciones)
+        except Exception as e:
+            # No quedan archivos huérfanos de un lote que no se insertó
+            for nombre in guardadas:
+                default_storage.delete(nombre)
+            for fila in lote:
+                self.resultado.error(fila['numero'], f'lote no insertado: {e}')
+            self.resultado.validas -= len(lote)
+        else:
+            self.resultado.creados += len(lote)
+            self.categorias_tocadas.update(fila['producto'].categoria_id for fila in lote)
+        self._notificar()
+
+    def _imagenes_lote(self, lote, pool):
+        """
+        Procesa en el pool las imágenes del lote y las guarda en el almacenamiento.
+        Retorna las filas que siguen siendo válidas, los nombres guardados y lo que hay
+        que registrar en ImagenProcesada junto con el lote.
+
+        Cada imagen se identifica por el hash de su contenido: las ya procesadas antes se
+        reutilizan sin pasar por el pool ni subirse, y las repetidas dentro del lote se
+        procesan y suben una sola vez.
+        """
+        tareas = []
+        for fila in lote:
+            if fila['imagen']:
+                tareas.append((fila, 'imagen', fila['imagen']))
+            tareas += [(fila, 'galeria', miembro) for miembro in fila['galeria']]
+
+        errores = {}  # miembro -> error
+        hashes = {}  # miembro -> hash del original
+        for miembro in dict.fromkeys(miembro for _, _, miembro in tareas):
+            try:
+                hashes[miembro] = hash_contenido(_leer_imagen(self.imagenes.ruta, self.imagenes.es_zip, miembro))
+            except Exception as e:
+                errores[miembro] = f'{miembro}: {e}'
+        conocidas = buscar_originales(hashes.values())
+        vivos = reclamar(registro.nombre for registro in conocidas.values())
+        conocidas = {h: registro for h, registro in conocidas.items() if registro.nombre in vivos}
+
+        # Un miembro por cada original que nunca se ha procesado
+        pendientes = {}
+        for miembro, hash_original in hashes.items():
+            if hash_original not in conocidas:
+                pendientes.setdefault(hash_original, miembro)
+        argumentos = [(self.imagenes.ruta, self.imagenes.es_zip, miembro) for miembro in pendientes.values()]
+        resultados = pool.imap(_procesar_imagen, argumentos) if pool else map(_procesar_imagen, argumentos)
+        contenidos = {}
+        for hash_original, (procesada, error) in zip(pendientes, resultados):
+            if error:
+                for miembro, hash_miembro in hashes.items():
+                    if hash_miembro == hash_original:
+                        errores[miembro] = error
+            else:
+                contenido, marcador, color = procesada
+                contenidos[hash_original] = (contenido, hash_contenido(contenido), marcador, color)
+
+        fallidas = {}
+        for fila, _, miembro in tareas:
+            if miembro in errores:
+                fallidas.setdefault(fila['numero'], f'imagen no válida ({errores[miembro]})')
+        tareas = [tarea for tarea in tareas if tarea[0]['numero'] not in fallidas]
+
+        # JPEG que ya están en el almacenamiento (el mismo resultado desde otro original)
+        iguales = buscar_procesadas(hash_procesado for _, hash_procesado, _, _ in contenidos.values())
+        vivos = reclamar(registro.nombre for registro in iguales.values())
+        iguales = {h: registro for h, registro in iguales.items() if registro.nombre in vivos}
+        por_subir = {}  # hash del JPEG -> (campo, miembro, contenido)
+        for _, campo, miembro in tareas:
+            if hashes[miembro] in contenidos:
+                contenido, hash_procesado, _, _ = contenidos[hashes[miembro]]
+                if hash_procesado not in iguales:
+                    por_subir.setdefault(hash_procesado, (campo, miembro, contenido))
+
+        def guardar(subida):
+            campo, miembro, contenido = subida
+            directorio = 'productos/imagenes' if campo == 'imagen' else 'productos/galeria'
+            base = os.path.splitext(os.path.basename(miembro))[0]
+            return default_storage.save(f'{directorio}/{base}.jpg', ContentFile(contenido))
+
+        # Subir al almacenamiento (p. ej. Cloudinary) es E/S: en paralelo con hilos
+        with ThreadPoolExecutor(max_workers=8) as hilos:
+            subidos = dict(zip(por_subir, hilos.map(guardar, por_subir.values())))
+
+        estrategia = settings.IMAGEN_ESTRATEGIA
+        nuevas = {}  # hash del original -> ImagenProcesada por crear
+        reutilizaciones = {}  # id de ImagenProcesada existente -> veces
+        reutilizados = set()
+        usados = set()  # JPEG subidos que ya tienen una tarea asignada
+        galerias = {}
+        for fila, campo, miembro in tareas:
+            hash_original = hashes[miembro]
+            if hash_original in conocidas:
+                registro = conocidas[hash_original]
+                reutilizaciones[registro.id] = reutilizaciones.get(registro.id, 0) + 1
+                reutilizados.add(registro.nombre)
+            elif hash_original in nuevas:
+                registro = nuevas[hash_original]
+                registro.reutilizaciones += 1
+            else:
+                contenido, hash_procesado, marcador, color = contenidos[hash_original]
+                if hash_procesado in iguales:
+                    nombre = iguales[hash_procesado].nombre
+                    reutilizados.add(nombre)
+                else:
+                    nombre = subidos[hash_procesado]
+                registro = nuevas[hash_original] = ImagenProcesada(
+                    hash_original=hash_original, estrategia=estrategia, hash_procesado=hash_procesado,
+                    nombre=nombre, bytes=len(contenido), marcador=marcador, color=color,
+                    reutilizaciones=0 if nombre not in reutilizados and nombre not in usados else 1,
+                )
+                usados.add(nombre)
+
+            if campo == 'imagen':
+                producto = fila['producto']
+                producto.imagen_principal = registro.nombre
+                producto.imagen_marcador, producto.imagen_color = registro.marcador, registro.color
+            else:
+                galerias.setdefault(fila['numero'], []).append(registro)
+        for fila in lote:
+            fila['galeria'] = galerias.get(fila['numero'], [])
+            if fila['numero'] in fallidas:
+                self.resultado.error(fila['numero'], fallidas[fila['numero']])
+
+        self.resultado.imagenes += len(tareas)
+        self.resultado.reutilizadas += len(tareas) - len(subidos)
+        self.resultado.validas -= len(fallidas)
+        registros = (list(nuevas.values()), reutilizaciones)
+        return [fila for fila in lote if fila['numero'] not in fallidas], list(subidos.values()), registros
+
+    def _notificar(self):
+        if self.progreso:
+            self.progreso(self.resultado)
@@ -0,0 +1,185 @@
+"""
+Medición del tiempo de cada petición por componente.
+
+Los backends instrumentados (plantillas, caché y almacenamiento) y el registro de SQL
+acumulan sus tiempos en una variable de contexto propia de cada petición, que abre y
+cierra MedicionMiddleware. Fuera de una petición (comandos, tareas) no se acumula nada.
+"""
+import time
+from contextvars import ContextVar
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.files.storage import Storage
+from django.template.backends.django import DjangoTemplates, Template, reraise
+from django.template import TemplateDoesNotExist
+from django.utils.module_loading import import_string
+
+
+_medicion = ContextVar('medicion', default=None)
+
+
+class Medicion:
+    """Tiempos (ms) y contadores de una petición."""
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.db_ms = 0.0
+        self.db_consultas = 0
+        self.plantilla_ms = 0.0
+        self.cache_ms = 0.0
+        self.cache_aciertos = 0
+        self.cache_fallos = 0
+        self.almacenamiento_ms = 0.0
+        self.almacenamiento_llamadas = 0
+
+    @property
+    def total_ms(self):
+        return (time.perf_counter() - self.inicio) * 1000
+
+    def registrar_sql(self, execute, sql, params, many, context):
+        """execute_wrapper de las conexiones durante la petición."""
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_ms += (time.perf_counter() - inicio) * 1000
+            self.db_consultas += 1
+
+
+def iniciar():
+    medicion = Medicion()
+    return medicion, _medicion.set(medicion)
+
+
+def finalizar(token):
+    _medicion.reset(token)
+
+
+def actual():
+    """La medición de la petición en curso, o None."""
+    return _medicion.get()
+
+
+# ===== PLANTILLAS =====
+
+class PlantillaMedida(Template):
+    def render(self, context=None, request=None):
+        inicio = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            medicion = _medicion.get()
+            if medicion is not None:
+                medicion.plantilla_ms += (time.perf_counter() - inicio) * 1000
+
+
+class DjangoTemplatesMedidas(DjangoTemplates):
+    """
+    DjangoTemplates que mide el renderizado de cada plantilla de nivel superior. El
+    tiempo incluye las consultas que las plantillas disparan al recorrer querysets.
+    """
+
+    def from_string(self, template_code):
+        return PlantillaMedida(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return PlantillaMedida(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+# ===== CACHÉ =====
+
+_AUSENTE = object()
+
+
+class MedicionCacheMixin:
+    """
+    Cuenta aciertos y fallos de get/get_many. Para otro backend basta con combinarlo:
+    class RedisCacheMedida(MedicionCacheMixin, RedisCache).
+    """
+
+    def get(self, key, default=None, version=None):
+        inicio = time.perf_counter()
+        valor = super().get(key, _AUSENTE, version)
+        medicion = _medicion.get()
+        if medicion is not None:
+            medicion.cache_ms += (time.perf_counter() - inicio) * 1000
+            if valor is _AUSENTE:
+                medicion.cache_fallos += 1
+            else:
+                medicion.cache_aciertos += 1
+        return default if valor is _AUSENTE else valor
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        inicio = time.perf_counter()
+        valores = super().get_many(keys, version)
+        medicion = _medicion.get()
+        if medicion is not None:
+            medicion.cache_ms += (time.perf_counter() - inicio) * 1000
+            medicion.cache_aciertos += len(valores)
+            medicion.cache_fallos += len(keys) - len(valores)
+        return valores
+
+
+class LocMemCacheMedida(MedicionCacheMixin, LocMemCache):
+    pass
+
+
+# ===== ALMACENAMIENTO =====
+
+def _medir_almacenamiento(metodo):
+    def medido(self, *args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return getattr(self.interno, metodo)(*args, **kwargs)
+        finally:
+            medicion = _medicion.get()
+            if medicion is not None:
+                medicion.almacenamiento_ms += (time.perf_counter() - inicio) * 1000
+                medicion.almacenamiento_llamadas += 1
+    medido.__name__ = metodo
+    return medido
+
+
+def _delegar(metodo):
+    def delegado(self, *args, **kwargs):
+        return getattr(self.interno, metodo)(*args, **kwargs)
+    delegado.__name__ = metodo
+    return delegado
+
+
+class AlmacenamientoMedido(Storage):
+    """
+    Envuelve el almacenamiento real (OPTIONS['backend'], con el resto de OPTIONS como
+    argumentos) y mide las operaciones que pueden ir a la red, como las de Cloudinary.
+    El backend se importa al instanciarse, así que este módulo no depende de Cloudinary.
+    """
+
+    def __init__(self, backend='django.core.files.storage.FileSystemStorage', **opciones):
+        self.interno = import_string(backend)(**opciones)
+
+    def __getattr__(self, nombre):
+        # Atributos propios del backend (p. ej. location, base_url)
+        if 'interno' not in self.__dict__:
+            raise AttributeError(nombre)
+        return getattr(self.__dict__['interno'], nombre)
+
+    open = _medir_almacenamiento('open')
+    save = _medir_almacenamiento('save')
+    delete = _medir_almacenamiento('delete')
+    exists = _medir_almacenamiento('exists')
+    listdir = _medir_almacenamiento('listdir')
+    size = _medir_almacenamiento('size')
+    url = _medir_almacenamiento('url')
+    get_accessed_time = _medir_almacenamiento('get_accessed_time')
+    get_created_time = _medir_almacenamiento('get_created_time')
+    get_modified_time = _medir_almacenamiento('get_modified_time')
+
+    path = _delegar('path')
+    get_valid_name = _delegar('get_valid_name')
+    get_alternative_name = _delegar('get_alternative_name')
+    get_available_name = _delegar('get_available_name')
+    generate_filename = _delegar('generate_filename')
@@ -0,0 +1,34 @@
+from decimal import Decimal, InvalidOperation
+from django.core.management.base import BaseCommand
+from productos.models import Producto, TasaCambio
+
+
+class Command(BaseCommand):
+    help = 'Registra la tasa de cambio de una moneda a USD y recalcula el precio normalizado de sus productos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('moneda', help='Código de la moneda (EUR, CUP, MLC)')
+        parser.add_argument('tasa', help='USD por unidad de la moneda (ej. 1.08)')
+
+    def handle(self, *args, **options):
+        moneda = options['moneda'].upper()
+        if moneda not in dict(Producto.MONEDAS):
+            self.stdout.write(self.style.ERROR(f'Error: moneda "{moneda}" no soportada'))
+            return
+
+        try:
+            tasa = Decimal(options['tasa'])
+        except InvalidOperation:
+            self.stdout.write(self.style.ERROR(f'Error: tasa "{options["tasa"]}" no es un número'))
+            return
+        if tasa <= 0:
+            self.stdout.write(self.style.ERROR('Error: la tasa debe ser mayor que 0'))
+            return
+
+        # save() recalcula el precio normalizado de los productos en esa moneda
+        tasa_cambio, _ = TasaCambio.objects.update_or_create(moneda=moneda, defaults={'tasa_usd': tasa})
+
+        total = Producto.objects.filter(moneda=moneda).count()
+        self.stdout.write(
+            self.style.SUCCESS(f'✅ {tasa_cambio} — {total} productos actualizados')
+        )
@@ -0,0 +1,39 @@
+import math
+
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from productos.models import Producto
+
+
+class Command(BaseCommand):
+    help = 'Recalcula la puntuación de tendencia (vistas y ventas con decaimiento exponencial). Pensado para ejecutarse periódicamente (cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--vida-media',
+            type=float,
+            default=settings.TENDENCIA_VIDA_MEDIA_HORAS,
+            help='Vida media del decaimiento en horas',
+        )
+        parser.add_argument(
+            '--peso-venta',
+            type=float,
+            default=settings.TENDENCIA_PESO_VENTA,
+            help='Cuántas vistas equivale una venta',
+        )
+
+    def handle(self, *args, **options):
+        # float() acepta "nan" e "inf", que dejarían la puntuación de todos en NaN
+        if not math.isfinite(options['vida_media']) or options['vida_media'] <= 0:
+            raise CommandError('--vida-media debe ser un número mayor que 0')
+        if not math.isfinite(options['peso_venta']) or options['peso_venta'] < 0:
+            raise CommandError('--peso-venta debe ser un número mayor o igual que 0')
+
+        actualizados = Producto.actualizar_tendencias(
+            vida_media_horas=options['vida_media'],
+            peso_venta=options['peso_venta'],
+        )
+
+        self.stdout.write(
+            self.style.SUCCESS(f'✅ Tendencia recalculada para {actualizados} productos')
+        )
@@ -0,0 +1,57 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from productos.benchmark_arranque import arranque_gunicorn, desglose_importaciones, primera_peticion
+
+
+class Command(BaseCommand):
+    help = 'Mide el arranque: desglose de importaciones, tiempo hasta la primera petición y gunicorn con y sin preload'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ruta', default='/', help='Ruta de la primera petición')
+        parser.add_argument('--repeticiones', type=int, default=5, help='Procesos nuevos por medición')
+        parser.add_argument('--trabajadores', type=int, default=2, help='Workers de gunicorn')
+        parser.add_argument('--top', type=int, default=15, help='Módulos y paquetes a mostrar')
+        parser.add_argument('--sin-gunicorn', action='store_true', help='No medir el arranque de gunicorn')
+        parser.add_argument('--salida', help='Archivo JSON donde guardar los resultados')
+
+    def handle(self, *args, **options):
+        repeticiones = max(options['repeticiones'], 1)
+
+        self.stdout.write(self.style.SUCCESS('\n📦 Importaciones al cargar la aplicación\n'))
+        importaciones = desglose_importaciones(options['top'])
+        self.stdout.write(f'  Total: {importaciones["total_ms"]:.1f} ms\n')
+        for fila in importaciones['modulos']:
+            self.stdout.write(f'  {fila["acumulado_ms"]:>8.1f} ms  {fila["propio_ms"]:>7.1f} ms propio  {fila["modulo"]}')
+        self.stdout.write('\n  Tiempo propio por paquete:')
+        for paquete, ms in importaciones['paquetes'].items():
+            self.stdout.write(f'  {ms:>8.1f} ms  {paquete}')
+
+        self.stdout.write(self.style.SUCCESS(f'\n⏱️  Primera petición a {options["ruta"]} en un proceso nuevo\n'))
+        peticion = primera_peticion(options['ruta'], repeticiones)
+        self.stdout.write(
+            f'  Estado {peticion["estado"]}  carga {peticion["carga_ms"]:.1f} ms  '
+            f'primera {peticion["primera_ms"]:.1f} ms  segunda {peticion["segunda_ms"]:.1f} ms  '
+            f'hasta la primera respuesta {peticion["hasta_primera_respuesta_ms"]:.1f} ms'
+        )
+        self.stdout.write(f'  Dependencias pesadas cargadas: {", ".join(peticion["pesados_cargados"]) or "ninguna"}')
+
+        resultados = {'importaciones': importaciones, 'primera_peticion': peticion, 'gunicorn': []}
+        if not options['sin_gunicorn']:
+            self.stdout.write(self.style.SUCCESS(f'\n🦄 Gunicorn con {options["trabajadores"]} workers\n'))
+            for preload in (True, False):
+                try:
+                    medicion = arranque_gunicorn(options['ruta'], repeticiones, options['trabajadores'], preload)
+                except RuntimeError as e:
+                    raise CommandError(str(e))
+                resultados['gunicorn'].append(medicion)
+                memoria = f'{medicion["pss_total_mb"]:.1f} MB' if medicion['pss_total_mb'] is not None else '?'
+                self.stdout.write(
+                    f'  {"con" if preload else "sin"} preload  hasta la primera respuesta '
+                    f'{medicion["hasta_primera_respuesta_ms"]:>7.1f} ms  PSS total {memoria}'
+                )
+
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as archivo:
+                json.dump(resultados, archivo, indent=2, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(f'\n✅ Resultados guardados en {options["salida"]}\n'))
@@ -0,0 +1,64 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from productos.benchmark_imagenes import corpus, corpus_directorio, ejecutar_benchmark
+from productos.imagenes import ESTRATEGIAS
+
+
+class Command(BaseCommand):
+    help = 'Mide tiempo, memoria y tamaño de salida de cada estrategia de redimensionado de imágenes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--estrategias',
+            default=','.join(ESTRATEGIAS),
+            help=f'Estrategias a medir separadas por comas ({", ".join(ESTRATEGIAS)})',
+        )
+        parser.add_argument('--repeticiones', type=int, default=5, help='Veces que se procesa cada entrada')
+        parser.add_argument('--directorio', help='Usar las imágenes de este directorio en lugar del corpus sintético')
+        parser.add_argument('--salida', help='Archivo JSON donde guardar los resultados')
+
+    def handle(self, *args, **options):
+        estrategias = [e.strip() for e in options['estrategias'].split(',') if e.strip()]
+        desconocidas = [e for e in estrategias if e not in ESTRATEGIAS]
+        if desconocidas:
+            raise CommandError(f'Estrategias desconocidas: {", ".join(desconocidas)}')
+
+        if options['directorio']:
+            entradas = corpus_directorio(options['directorio'])
+            if not entradas:
+                raise CommandError(f'No hay imágenes en {options["directorio"]}')
+        else:
+            self.stdout.write('🖼️  Generando corpus sintético...')
+            entradas = corpus()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\n⏱️  {len(entradas)} entradas × {len(estrategias)} estrategias '
+            f'(configurada: {settings.IMAGEN_ESTRATEGIA})\n'
+        ))
+        resultados = ejecutar_benchmark(entradas, estrategias, max(options['repeticiones'], 1), self._progreso)
+
+        # Resumen: totales por estrategia sobre todo el corpus
+        self.stdout.write(self.style.SUCCESS('\n📊 Totales por estrategia:'))
+        for estrategia in estrategias:
+            filas = [r[estrategia] for r in resultados.values()]
+            self.stdout.write(
+                f'  {estrategia:<12} {sum(f["p50_ms"] for f in filas):>9.1f}ms  '
+                f'pico RSS máx {max((f["pico_rss_kb"] or 0) for f in filas) / 1024:>6.1f} MB  '
+                f'{sum(f["bytes_salida"] for f in filas) / 1024:>7.1f} KB  '
+                f'diferencia media {sum(f["diferencia"] for f in filas) / len(filas):.2f}'
+            )
+
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as archivo:
+                json.dump(resultados, archivo, indent=2, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(f'\n✅ Resultados guardados en {options["salida"]}\n'))
+
+    def _progreso(self, entrada, estrategia, resultado):
+        pico = f'{resultado["pico_rss_kb"] / 1024:>6.1f} MB' if resultado['pico_rss_kb'] is not None else '     ? MB'
+        self.stdout.write(
+            f'  {entrada:<20} {estrategia:<12} {resultado["p50_ms"]:>8.1f}ms  '
+            f'{resultado["megapixeles_s"]:>6.1f} MP/s  {pico}  '
+            f'{resultado["bytes_salida"] / 1024:>6.1f} KB  Δ {resultado["diferencia"]:.2f}'
+        )
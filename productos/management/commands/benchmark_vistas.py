@@ -0,0 +1,94 @@
+import json
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from productos.benchmark import ejecutar_benchmark, comparar
+
+
+# Sin manifiesto de estáticos (no hace falta collectstatic) y con los medios en un
+# directorio temporal, para no tocar el almacenamiento real
+def _almacenamiento_temporal(directorio):
+    return {
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage', 'OPTIONS': {'location': directorio}},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    }
+
+
+class Command(BaseCommand):
+    help = 'Mide latencia, consultas y bytes de las vistas públicas y del panel sobre catálogos sintéticos de varios tamaños'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamanos', default='500,2000', help='Tamaños de catálogo separados por comas')
+        parser.add_argument('--repeticiones', type=int, default=5, help='Peticiones medidas por escenario')
+        parser.add_argument('--calentamiento', type=int, default=2, help='Peticiones previas no medidas por escenario')
+        parser.add_argument('--semilla', type=int, default=1, help='Semilla del catálogo sintético')
+        parser.add_argument('--escenarios', help='Expresión regular: medir solo los escenarios que coincidan (ej. "^lista:")')
+        parser.add_argument('--cache-fria', action='store_true', help='Vaciar la caché antes de cada petición medida')
+        parser.add_argument('--sin-relacionados', action='store_true', help='No precalcular productos relacionados')
+        parser.add_argument('--salida', default='benchmark.json', help='Archivo JSON donde guardar el informe')
+        parser.add_argument('--comparar', help='Informe JSON de referencia contra el que detectar regresiones')
+        parser.add_argument('--tolerancia', type=float, default=0.25, help='Aumento relativo tolerado (0.25 = 25%%)')
+        parser.add_argument('--margen-ms', type=float, default=2.0, help='Aumento absoluto mínimo de latencia para marcar regresión')
+
+    def handle(self, *args, **options):
+        try:
+            tamanos = [int(t) for t in options['tamanos'].split(',') if t.strip()]
+        except ValueError:
+            raise CommandError(f'--tamanos no válido: "{options["tamanos"]}"')
+
+        referencia = None
+        if options['comparar']:
+            try:
+                with open(options['comparar'], encoding='utf-8') as archivo:
+                    referencia = json.load(archivo)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'No se pudo leer el informe de referencia: {e}')
+
+        self.stdout.write(self.style.SUCCESS(f'\n⏱️  Benchmark de vistas: catálogos de {", ".join(map(str, tamanos))} productos\n'))
+
+        # Se mide sobre una base de datos de pruebas nueva: nunca sobre la real
+        setup_test_environment()
+        nombre_original = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            with tempfile.TemporaryDirectory() as medios, \
+                    override_settings(STORAGES=_almacenamiento_temporal(medios), MEDIA_ROOT=medios):
+                informe = ejecutar_benchmark(
+                    tamanos,
+                    repeticiones=max(options['repeticiones'], 1),
+                    calentamiento=max(options['calentamiento'], 0),
+                    semilla=options['semilla'],
+                    cache_fria=options['cache_fria'],
+                    patron=options['escenarios'],
+                    relacionados=not options['sin_relacionados'],
+                    progreso=self._progreso,
+                )
+        finally:
+            connection.creation.destroy_test_db(nombre_original, verbosity=0)
+            teardown_test_environment()
+
+        with open(options['salida'], 'w', encoding='utf-8') as archivo:
+            json.dump(informe, archivo, indent=2, ensure_ascii=False)
+        self.stdout.write(self.style.SUCCESS(f'\n✅ Informe guardado en {options["salida"]}'))
+
+        if referencia is None:
+            return
+
+        regresiones = comparar(informe, referencia, options['tolerancia'], options['margen_ms'])
+        if not regresiones:
+            self.stdout.write(self.style.SUCCESS(f'✅ Sin regresiones respecto a {options["comparar"]}\n'))
+            return
+
+        self.stdout.write(self.style.ERROR(f'\n❌ {len(regresiones)} regresiones respecto a {options["comparar"]}:'))
+        for r in regresiones:
+            self.stdout.write(f'  [{r["tamano"]}] {r["escenario"]} {r["metrica"]}: {r["antes"]} → {r["despues"]}')
+        raise CommandError('Se detectaron regresiones de rendimiento')
+
+    def _progreso(self, tamano, escenario, resultado):
+        estilo = self.style.ERROR if resultado['estado'] >= 400 else str
+        self.stdout.write(estilo(
+            f'  [{tamano}] {escenario:<40} p50 {resultado["p50_ms"]:>8.1f}ms  p90 {resultado["p90_ms"]:>8.1f}ms  '
+            f'{resultado["consultas"]:>3} consultas  {resultado["bytes"] / 1024:>7.1f} KB'
+        ))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from productos.marcadores import rellenar_marcadores
+
+
+class Command(BaseCommand):
+    help = 'Calcula el marcador de posición y el color dominante de las imágenes que no lo tienen'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--procesos', type=int, help='Procesos en paralelo (por defecto IMPORTACION_PROCESOS)')
+        parser.add_argument('--lote', type=int, default=200, help='Archivos por lote')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('\n🎨 Calculando marcadores de imágenes...\n'))
+        archivos, actualizados, errores = rellenar_marcadores(
+            procesos=options['procesos'], tamano_lote=options['lote'], progreso=self._progreso,
+        )
+
+        for nombre, error in list(errores.items())[:20]:
+            self.stdout.write(self.style.ERROR(f'  ❌ {nombre}: {error}'))
+        if len(errores) > 20:
+            self.stdout.write(self.style.ERROR(f'  ... y {len(errores) - 20} errores más'))
+
+        estilo = self.style.WARNING if errores else self.style.SUCCESS
+        self.stdout.write(estilo(
+            f'\n✅ {archivos - len(errores)} de {archivos} archivos procesados; {actualizados} registros actualizados\n'
+        ))
+
+    def _progreso(self, hechos, total):
+        self.stdout.write(f'  {hechos}/{total} archivos')
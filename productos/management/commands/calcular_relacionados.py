@@ -0,0 +1,43 @@
+import time
+from django.core.management.base import BaseCommand
+from django.conf import settings
+from productos import recalculos
+from productos.similitud import recalcular_relacionados
+
+
+class Command(BaseCommand):
+    help = 'Precalcula los productos relacionados de todo el catálogo por similitud de atributos y precio'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--k',
+            type=int,
+            default=settings.PRODUCTOS_RELACIONADOS_K,
+            help='Número de vecinos a guardar por producto',
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=500,
+            help='Filas de la matriz de similitud procesadas a la vez',
+        )
+        parser.add_argument(
+            '--pendientes',
+            action='store_true',
+            help='Solo los productos en la cola de recálculos (cambiados desde el panel)',
+        )
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        if options['pendientes']:
+            total = recalculos.procesar_pendientes()
+            self.stdout.write(self.style.SUCCESS(
+                f'✅ Cola procesada: {total} productos pendientes en {time.perf_counter() - inicio:.1f}s'
+            ))
+            return
+        total = recalcular_relacionados(k=options['k'], tamano_lote=options['lote'])
+        duracion = time.perf_counter() - inicio
+
+        self.stdout.write(
+            self.style.SUCCESS(f'✅ Relacionados calculados para {total} productos en {duracion:.1f}s')
+        )
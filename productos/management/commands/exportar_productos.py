@@ -0,0 +1,40 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from productos.exportacion import FORMATOS, Exportacion, filtrar_productos
+from productos.models import Categoria
+
+
+class Command(BaseCommand):
+    help = 'Exporta el catálogo en streaming a CSV o JSON Lines, con una columna por atributo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--formato', choices=list(FORMATOS), default='csv')
+        parser.add_argument('--salida', help='Archivo de salida (por defecto, la salida estándar)')
+        parser.add_argument('--categoria', type=int, help='Solo esta categoría y sus subcategorías')
+        parser.add_argument('--estado', choices=['activo', 'inactivo'], help='Solo productos activos o inactivos')
+        parser.add_argument('--bloque', type=int, default=settings.EXPORTACION_TAMANO_BLOQUE, help='Productos leídos por bloque')
+
+    def handle(self, *args, **options):
+        try:
+            productos = filtrar_productos(options['categoria'], options['estado'])
+        except Categoria.DoesNotExist:
+            raise CommandError(f'La categoría {options["categoria"]} no existe')
+        exportacion = Exportacion(productos, tamano_bloque=options['bloque'])
+
+        inicio = time.perf_counter()
+        if not options['salida']:
+            for linea in exportacion.lineas(options['formato']):
+                self.stdout.write(linea, ending='')
+            return
+
+        lineas = 0
+        with open(options['salida'], 'w', encoding='utf-8', newline='') as archivo:
+            for linea in exportacion.lineas(options['formato']):
+                archivo.write(linea)
+                lineas += 1
+        registros = lineas - 1 if options['formato'] == 'csv' else lineas
+        self.stdout.write(self.style.SUCCESS(
+            f'\n✅ {registros} productos exportados a {options["salida"]} en {time.perf_counter() - inicio:.1f}s\n'
+        ))
@@ -0,0 +1,99 @@
+import time
+from multiprocessing import get_context
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from productos.catalogo_sintetico import (
+    PREFIJO_SKU, preparar_metadatos, generar_lote, eliminar_catalogo_sintetico,
+)
+from productos.categorias import invalidar_arbol
+from productos.facetas import recalcular_conteos
+from productos.models import Producto
+from productos.similitud import recalcular_relacionados
+
+
+def _inicializar_proceso():
+    # Con el método "spawn" el proceso hijo arranca sin Django configurado
+    django.setup()
+
+
+def _generar_lote(argumentos):
+    return generar_lote(*argumentos)
+
+
+class Command(BaseCommand):
+    help = 'Genera un catálogo sintético determinista (productos, colores, atributos e imágenes) para pruebas de carga'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--productos', type=int, default=10000, help='Número de productos a generar')
+        parser.add_argument('--semilla', type=int, default=1, help='Semilla: la misma semilla genera el mismo catálogo')
+        parser.add_argument('--lote', type=int, default=1000, help='Productos insertados por lote')
+        parser.add_argument('--procesos', type=int, default=1, help='Procesos que insertan lotes en paralelo (PostgreSQL)')
+        parser.add_argument('--categorias', type=int, default=16, help='Número de subcategorías')
+        parser.add_argument('--imagenes', type=int, default=24, help='Imágenes de marcador distintas (0 = sin imágenes)')
+        parser.add_argument('--galeria', type=int, default=3, help='Máximo de imágenes de galería por producto')
+        parser.add_argument('--limpiar', action='store_true', help='Elimina antes los productos sintéticos existentes')
+        parser.add_argument('--relacionados', action='store_true', help='Calcula también los productos relacionados (lento con catálogos grandes)')
+
+    def handle(self, *args, **options):
+        semilla = options['semilla']
+        total = options['productos']
+        tamano_lote = max(options['lote'], 1)
+        procesos = max(options['procesos'], 1)
+
+        if options['limpiar']:
+            eliminados = eliminar_catalogo_sintetico()
+            self.stdout.write(self.style.WARNING(f'🗑️  {eliminados} productos sintéticos eliminados'))
+        elif Producto.objects.filter(sku__startswith=f'{PREFIJO_SKU}{semilla}-').exists():
+            self.stdout.write(self.style.ERROR(
+                f'Error: ya existe un catálogo sintético con semilla {semilla}. Usa --limpiar u otra --semilla'
+            ))
+            return
+
+        if procesos > 1 and connection.vendor == 'sqlite':
+            self.stdout.write(self.style.WARNING('⚠️  SQLite no admite escrituras concurrentes: se usará un solo proceso'))
+            procesos = 1
+
+        inicio = time.perf_counter()
+        contexto = preparar_metadatos(options['categorias'], options['imagenes'], semilla)
+        self.stdout.write(self.style.SUCCESS(
+            f'\n📋 {len(contexto["hojas"])} categorías, {len(contexto["colores"])} colores, '
+            f'{len(contexto["imagenes"])} imágenes de marcador\n'
+        ))
+
+        lotes = [
+            (n, desde, min(tamano_lote, total - desde), semilla, contexto, options['galeria'])
+            for n, desde in enumerate(range(0, total, tamano_lote))
+        ]
+
+        creados = 0
+        if procesos > 1:
+            # Los procesos hijos no deben heredar las conexiones abiertas del padre
+            connections.close_all()
+            with get_context().Pool(procesos, initializer=_inicializar_proceso) as pool:
+                for cantidad in pool.imap_unordered(_generar_lote, lotes):
+                    creados += cantidad
+                    self._progreso(creados, total, inicio)
+        else:
+            for lote in lotes:
+                creados += generar_lote(*lote)
+                self._progreso(creados, total, inicio)
+
+        # bulk_create no dispara señales: se recalculan los datos derivados
+        self.stdout.write('\n🔄 Recalculando tendencias, facetas y árbol de categorías...')
+        Producto.actualizar_tendencias()
+        recalcular_conteos()
+        invalidar_arbol()
+        if options['relacionados']:
+            self.stdout.write('🔄 Calculando productos relacionados...')
+            recalcular_relacionados()
+
+        duracion = time.perf_counter() - inicio
+        self.stdout.write(
+            self.style.SUCCESS(f'\n✅ {creados} productos generados en {duracion:.1f}s ({creados / duracion:.0f}/s)\n')
+        )
+
+    def _progreso(self, creados, total, inicio):
+        transcurrido = time.perf_counter() - inicio
+        self.stdout.write(f'  {creados}/{total} productos ({creados / transcurrido:.0f}/s)')
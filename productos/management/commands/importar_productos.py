@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from productos.importacion import Importacion, OrigenImagenes, leer_hoja
+
+
+class Command(BaseCommand):
+    help = 'Importa productos desde una hoja CSV o XLSX, con imágenes opcionales de un zip o una carpeta'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Hoja de cálculo (.csv o .xlsx)')
+        parser.add_argument('--imagenes', help='Zip o carpeta con las imágenes de las columnas imagen y galeria')
+        parser.add_argument('--lote', type=int, default=settings.IMPORTACION_TAMANO_LOTE, help='Filas insertadas por lote')
+        parser.add_argument('--procesos', type=int, default=settings.IMPORTACION_PROCESOS, help='Procesos que procesan las imágenes')
+        parser.add_argument('--simular', action='store_true', help='Solo validar: no procesa imágenes ni inserta nada')
+        parser.add_argument('--relacionados', action='store_true', help='Recalcular después los productos relacionados')
+
+    def handle(self, *args, **options):
+        try:
+            imagenes = OrigenImagenes(options['imagenes']) if options['imagenes'] else None
+            with open(options['archivo'], 'rb') as archivo:
+                encabezados, filas = leer_hoja(archivo, options['archivo'])
+                importacion = Importacion(
+                    imagenes=imagenes,
+                    tamano_lote=options['lote'],
+                    procesos=options['procesos'],
+                    simular=options['simular'],
+                    relacionados=options['relacionados'],
+                    progreso=self._progreso,
+                )
+                modo = 'Validando' if options['simular'] else 'Importando'
+                self.stdout.write(self.style.SUCCESS(f'\n📥 {modo} {options["archivo"]}...\n'))
+                resultado = importacion.ejecutar(encabezados, filas)
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        for aviso in resultado.avisos:
+            self.stdout.write(self.style.WARNING(f'⚠️  {aviso}'))
+        for fila, mensaje in resultado.errores:
+            self.stdout.write(self.style.ERROR(f'  ✗ Fila {fila}: {mensaje}'))
+        if resultado.total_errores > len(resultado.errores):
+            self.stdout.write(self.style.ERROR(f'  ... y {resultado.total_errores - len(resultado.errores)} errores más'))
+
+        if resultado.simulacion:
+            resumen = f'{resultado.validas} de {resultado.filas} filas válidas (simulación: no se importó nada)'
+        else:
+            resumen = (
+                f'{resultado.creados} productos y {resultado.imagenes} imágenes importados de '
+                f'{resultado.filas} filas en {resultado.segundos:.1f}s '
+                f'({resultado.reutilizadas} imágenes reutilizadas sin procesar ni subir)'
+            )
+        estilo = self.style.WARNING if resultado.total_errores else self.style.SUCCESS
+        self.stdout.write(estilo(f'\n✅ {resumen}; {resultado.total_errores} filas con errores\n'))
+
+    def _progreso(self, resultado):
+        self.stdout.write(
+            f'  Lote {resultado.lotes}: {resultado.filas} filas leídas, {resultado.creados} creadas, '
+            f'{resultado.total_errores} con errores'
+        )
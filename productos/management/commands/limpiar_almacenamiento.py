@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from productos.almacenamiento import barrer_huerfanos, carpetas_subida, procesar_pendientes
+from productos.models import ArchivoPorBorrar
+
+
+class Command(BaseCommand):
+    help = 'Procesa la cola de archivos por borrar y, con --huerfanos, barre los que no usa ningún registro'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--huerfanos', action='store_true', help='Buscar archivos sin registro en las carpetas de subida')
+        parser.add_argument('--antiguedad', type=float, help='Horas mínimas de un huérfano para borrarlo')
+        parser.add_argument('--simular', action='store_true', help='Con --huerfanos: solo contar, sin borrar')
+        parser.add_argument('--reintentar', action='store_true', help='Reintentar también los que agotaron los intentos')
+
+    def handle(self, *args, **options):
+        if options['reintentar']:
+            ArchivoPorBorrar.objects.update(intentos=0)
+
+        if not options['simular']:
+            self.stdout.write(self.style.SUCCESS('\n🧹 Procesando la cola de borrado...\n'))
+            borrados, en_uso, fallidos = procesar_pendientes()
+            self.stdout.write(f'  {borrados} borrados, {en_uso} aún en uso (descartados), {fallidos} fallidos')
+
+        if options['huerfanos']:
+            self.stdout.write(self.style.SUCCESS(f'\n🔎 Buscando huérfanos en {", ".join(carpetas_subida())}...\n'))
+            resumen = barrer_huerfanos(options['antiguedad'], simular=options['simular'])
+            mb = resumen['bytes'] / (1024 * 1024)
+            self.stdout.write(f'  {resumen["revisados"]} archivos revisados, {resumen["huerfanos"]} huérfanos ({mb:.1f} MB)')
+            if not options['simular']:
+                self.stdout.write(f'  {resumen["borrados"]} borrados, {resumen["fallidos"]} fallidos')
+
+        con_errores = ArchivoPorBorrar.objects.filter(intentos__gte=1)
+        if con_errores.exists():
+            self.stdout.write(self.style.WARNING(
+                f'\n⚠️  {con_errores.count()} archivos con errores en la cola (ver ArchivoPorBorrar.error)'
+            ))
+        self.stdout.write(self.style.SUCCESS('\n✅ Limpieza completada\n'))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from productos.atributos import recalcular_valores_numericos
+from productos.models import ValorProducto
+
+
+class Command(BaseCommand):
+    help = 'Calcula el valor numérico de los valores de atributos existentes (para filtros por rango)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=1000,
+            help='Filas procesadas por lote',
+        )
+        parser.add_argument(
+            '--atributo',
+            type=int,
+            help='Procesar solo los valores de este atributo (id)',
+        )
+
+    def handle(self, *args, **options):
+        valores = ValorProducto.objects.all()
+        if options['atributo']:
+            valores = valores.filter(atributo_id=options['atributo'])
+
+        total = valores.count()
+        revisados = 0
+        actualizados = 0
+
+        self.stdout.write(self.style.SUCCESS(f'\n🔢 Procesando {total} valores...\n'))
+
+        for lote_revisados, lote_actualizados in recalcular_valores_numericos(valores, options['lote']):
+            revisados += lote_revisados
+            actualizados += lote_actualizados
+            self.stdout.write(f'  {revisados}/{total} revisados, {actualizados} actualizados')
+
+        self.stdout.write(
+            self.style.SUCCESS(f'\n✅ Proceso completado: {revisados} revisados, {actualizados} actualizados\n')
+        )
@@ -0,0 +1,145 @@
+import hashlib
+import os
+import time
+from io import StringIO
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.staticfiles.finders import get_finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+
+from productos.models import Color
+from productos.management.commands.poblar_colores import COLORES
+
+
+PASOS = ['migraciones', 'superusuario', 'colores', 'estaticos']
+# Mismos patrones que ignora collectstatic por defecto
+IGNORAR_ESTATICOS = ['CVS', '.*', '*~']
+ARCHIVO_HUELLA = '.huella_estaticos'
+
+
+class Command(BaseCommand):
+    help = (
+        'Prepara un despliegue (migraciones, superuser, colores y estáticos) saltando '
+        'los pasos ya hechos y mostrando el tiempo de cada uno. Pensado para la fase release'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--solo',
+            type=str,
+            default='',
+            help=f'Pasos a ejecutar, separados por comas ({", ".join(PASOS)})',
+        )
+        parser.add_argument(
+            '--omitir',
+            type=str,
+            default='',
+            help='Pasos a omitir, separados por comas',
+        )
+        parser.add_argument(
+            '--forzar',
+            action='store_true',
+            help='Ejecutar cada paso aunque su huella indique que ya está hecho',
+        )
+
+    def handle(self, *args, **options):
+        solo = [p.strip() for p in options['solo'].split(',') if p.strip()]
+        omitir = [p.strip() for p in options['omitir'].split(',') if p.strip()]
+        desconocidos = set(solo + omitir) - set(PASOS)
+        if desconocidos:
+            raise CommandError(f'Pasos desconocidos: {", ".join(sorted(desconocidos))}. Opciones: {", ".join(PASOS)}')
+
+        pasos = [p for p in PASOS if (not solo or p in solo) and p not in omitir]
+        self.forzar = options['forzar']
+
+        self.stdout.write(self.style.SUCCESS('\n🚀 Preparando despliegue...\n'))
+        inicio_total = time.perf_counter()
+        ejecutados = 0
+        for paso in pasos:
+            inicio = time.perf_counter()
+            hecho, detalle = getattr(self, f'_paso_{paso}')()
+            ms = (time.perf_counter() - inicio) * 1000
+            if hecho:
+                ejecutados += 1
+                self.stdout.write(self.style.SUCCESS(f'  ✓ {paso:<13} {ms:8.0f} ms  {detalle}'))
+            else:
+                self.stdout.write(f'  = {paso:<13} {ms:8.0f} ms  {detalle}')
+
+        total_ms = (time.perf_counter() - inicio_total) * 1000
+        self.stdout.write(self.style.SUCCESS(
+            f'\n✅ Despliegue preparado en {total_ms:.0f} ms: {ejecutados} pasos ejecutados, '
+            f'{len(pasos) - ejecutados} ya estaban hechos\n'
+        ))
+
+    # ===== PASOS =====
+    # Cada paso retorna (ejecutado, detalle)
+
+    def _paso_migraciones(self):
+        executor = MigrationExecutor(connections[DEFAULT_DB_ALIAS])
+        plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+        if not plan and not self.forzar:
+            return False, 'todas aplicadas'
+
+        call_command('migrate', interactive=False, verbosity=0)
+        return True, f'{len(plan)} migraciones aplicadas'
+
+    def _paso_superusuario(self):
+        username = os.environ.get('ADMIN_USERNAME')
+        if not username:
+            return False, 'sin ADMIN_USERNAME, nada que crear'
+        if User.objects.filter(username=username).exists():
+            return False, f'"{username}" ya existe'
+
+        salida = StringIO()
+        call_command('createsuperuserenv', stdout=salida)
+        return True, salida.getvalue().strip()
+
+    def _paso_colores(self):
+        esperados = {(c['nombre'], c['codigo_hex'], c['orden']) for c in COLORES}
+        actuales = set(
+            Color.objects.filter(nombre__in=[c['nombre'] for c in COLORES])
+            .values_list('nombre', 'codigo_hex', 'orden')
+        )
+        pendientes = len(esperados - actuales)
+        if not pendientes and not self.forzar:
+            return False, f'{len(esperados)} colores sin cambios'
+
+        call_command('poblar_colores', stdout=StringIO())
+        return True, f'{pendientes} colores creados o actualizados'
+
+    def _paso_estaticos(self):
+        huella = self._huella_estaticos()
+        destino = Path(settings.STATIC_ROOT)
+        archivo_huella = destino / ARCHIVO_HUELLA
+        manifiesto = getattr(staticfiles_storage, 'manifest_name', None)
+        completo = not manifiesto or (destino / manifiesto).exists()
+
+        if (not self.forzar and completo and archivo_huella.exists()
+                and archivo_huella.read_text() == huella):
+            return False, 'sin cambios desde el último collectstatic'
+
+        salida = StringIO()
+        call_command('collectstatic', interactive=False, verbosity=1, stdout=salida)
+        archivo_huella.write_text(huella)
+        return True, salida.getvalue().strip().splitlines()[-1]
+
+    def _huella_estaticos(self):
+        """Hash del contenido de todos los archivos que recogería collectstatic."""
+        huella = hashlib.sha256(settings.STORAGES['staticfiles']['BACKEND'].encode())
+        archivos = []
+        for finder in get_finders():
+            for ruta, almacenamiento in finder.list(IGNORAR_ESTATICOS):
+                archivos.append((getattr(almacenamiento, 'prefix', None) or '', ruta, almacenamiento))
+
+        for prefijo, ruta, almacenamiento in sorted(archivos, key=lambda a: (a[0], a[1])):
+            huella.update(f'{prefijo}/{ruta}\0'.encode())
+            with almacenamiento.open(ruta) as archivo:
+                for bloque in iter(lambda: archivo.read(1 << 16), b''):
+                    huella.update(bloque)
+        return huella.hexdigest()
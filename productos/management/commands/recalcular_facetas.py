@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from productos.facetas import recalcular_conteos
+from productos.models import ConteoValorAtributo
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice de conteos de valores de atributos usado por las facetas del catálogo'
+
+    def handle(self, *args, **options):
+        recalcular_conteos()
+
+        self.stdout.write(
+            self.style.SUCCESS(f'✅ Facetas recalculadas: {ConteoValorAtributo.objects.count()} conteos')
+        )
@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.core.exceptions import ImproperlyConfigured
+from productos.reproceso import Reproceso
+
+
+class Command(BaseCommand):
+    help = 'Reprocesa las imágenes guardadas con la estrategia actual (retomable si se interrumpe)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--estrategia', help='Estrategia de procesado (por defecto IMAGEN_ESTRATEGIA)')
+        parser.add_argument('--procesos', type=int, help='Procesos que procesan imágenes (por defecto IMPORTACION_PROCESOS)')
+        parser.add_argument('--hilos', type=int, default=8, help='Subidas en paralelo al almacenamiento')
+        parser.add_argument('--pagina', type=int, default=100, help='Archivos por página (un punto de control por página)')
+        parser.add_argument('--limite', type=int, help='Revisar como mucho este número de archivos en esta ejecución')
+        parser.add_argument('--estado', help='Archivo del punto de control (por defecto REPROCESO_ARCHIVO_ESTADO)')
+        parser.add_argument('--reiniciar', action='store_true', help='Ignorar el punto de control y empezar de cero')
+
+    def handle(self, *args, **options):
+        try:
+            reproceso = Reproceso(
+                estrategia=options['estrategia'], procesos=options['procesos'], hilos=options['hilos'],
+                tamano_pagina=options['pagina'], archivo_estado=options['estado'],
+                reiniciar=options['reiniciar'], limite=options['limite'], progreso=self._progreso,
+            )
+        except ImproperlyConfigured as e:
+            raise CommandError(str(e))
+
+        estado = reproceso.estado
+        if estado['terminado']:
+            self.stdout.write(self.style.SUCCESS(
+                f'\n✅ Ya se reprocesó todo con la estrategia "{estado["estrategia"]}" (usa --reiniciar para repetir)\n'
+            ))
+            return
+        if reproceso.retomado:
+            self.stdout.write(self.style.WARNING(
+                f'\n⏯️  Retomando desde {estado["ultimo"]} ({estado["revisadas"]} de {estado["total"]} revisadas)'
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f'\n🖼️  Reprocesando imágenes con la estrategia "{estado["estrategia"]}" '
+            f'({reproceso.procesos} procesos, {reproceso.hilos} hilos de subida)...\n'
+        ))
+
+        estado = reproceso.ejecutar()
+
+        for nombre, error in list(estado['errores'].items())[:20]:
+            self.stdout.write(self.style.ERROR(f'  ❌ {nombre}: {error}'))
+        if len(estado['errores']) > 20:
+            self.stdout.write(self.style.ERROR(f'  ... y {len(estado["errores"]) - 20} errores más'))
+
+        antes, despues = estado['bytes_antes'] / (1024 * 1024), estado['bytes_despues'] / (1024 * 1024)
+        self.stdout.write(
+            f'\n  {estado["procesadas"]} reprocesadas, {estado["sin_cambios"]} sin cambios, '
+            f'{estado["omitidas"]} ya hechas, {len(estado["errores"])} con errores'
+        )
+        self.stdout.write(f'  {antes:.1f} MB -> {despues:.1f} MB en {estado["segundos"]:.1f}s ({self._ritmo(estado)})')
+        if estado['terminado']:
+            estilo = self.style.WARNING if estado['errores'] else self.style.SUCCESS
+            self.stdout.write(estilo('\n✅ Reproceso completado\n'))
+        else:
+            self.stdout.write(self.style.WARNING('\n⏸️  Reproceso incompleto: vuelve a ejecutar el comando para seguir\n'))
+
+    def _ritmo(self, estado):
+        segundos = estado['segundos'] or 1e-9
+        return (f'{estado["revisadas"] / segundos:.1f} imágenes/s, '
+                f'{estado["bytes_antes"] / (1024 * 1024) / segundos:.1f} MB/s')
+
+    def _progreso(self, estado):
+        self.stdout.write(f'  {estado["revisadas"]}/{estado["total"]} revisadas · {self._ritmo(estado)}')
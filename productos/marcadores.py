@@ -0,0 +1,122 @@
+"""
+Marcadores de posición de las imágenes de productos.
+
+Por cada imagen procesada se guarda en la base de datos una versión WebP de 20x15 en
+base64 (unos 200 bytes como data URI) y su color dominante. Las tarjetas los pintan
+como fondo del hueco de la imagen, así que se ve algo parecido a la foto desde el primer
+byte de HTML, sin esperar al JPEG; el navegador amplía el WebP diminuto y lo difumina.
+
+Se calculan al subir (ver productos/deduplicacion.py y la importación) a partir del JPEG
+ya procesado. `manage.py calcular_marcadores` los rellena para las imágenes que ya
+existían, en un pool de procesos.
+"""
+import base64
+from io import BytesIO
+from multiprocessing import get_context
+
+import django
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connections
+
+from .imagenes import FONDO, _a_rgb
+from .models import ImagenProcesada, ImagenProducto, Producto
+
+
+# Tamaño del marcador (4:3, como las imágenes procesadas)
+TAMANO = (20, 15)
+# Distancia mínima a FONDO para que un color cuente como dominante
+DISTANCIA_FONDO = 30
+
+# (modelo, campo de imagen, campo del marcador, campo del color)
+CAMPOS = [
+    (Producto, 'imagen_principal', 'imagen_marcador', 'imagen_color'),
+    (ImagenProducto, 'imagen', 'marcador', 'color'),
+]
+
+
+def calcular_marcador(archivo):
+    """(data URI del marcador, color dominante "#rrggbb") de una imagen."""
+    from PIL import Image
+
+    img = Image.open(archivo)
+    img.draft('RGB', (TAMANO[0] * 4, TAMANO[1] * 4))
+    img = _a_rgb(img)
+
+    salida = BytesIO()
+    img.resize(TAMANO, Image.BILINEAR).save(salida, format='WEBP', quality=40)
+    marcador = 'data:image/webp;base64,' + base64.b64encode(salida.getvalue()).decode()
+
+    # El color más frecuente de una paleta reducida, sin contar el relleno de fondo
+    paleta = img.resize((64, 48), Image.BILINEAR).quantize(8)
+    valores = paleta.getpalette()
+    color = FONDO
+    for _, indice in sorted(paleta.getcolors(), reverse=True):
+        rgb = tuple(valores[indice * 3:indice * 3 + 3])
+        if sum(abs(a - b) for a, b in zip(rgb, FONDO)) > DISTANCIA_FONDO:
+            color = rgb
+            break
+    return marcador, '#{:02x}{:02x}{:02x}'.format(*color)
+
+
+def _marcador_guardado(nombre):
+    """Se ejecuta en el pool: marcador de un archivo del almacenamiento."""
+    try:
+        with default_storage.open(nombre) as archivo:
+            return (nombre, *calcular_marcador(archivo), None)
+    except Exception as e:
+        return nombre, '', '', str(e)
+
+
+def _inicializar_proceso():
+    django.setup()
+
+
+def _pendientes():
+    """Nombres de archivo distintos que algún registro usa sin marcador, en orden."""
+    nombres = set()
+    for modelo, campo, campo_marcador, _ in CAMPOS:
+        nombres.update(
+            modelo.objects.filter(**{campo_marcador: ''}).exclude(**{f'{campo}__isnull': True})
+            .exclude(**{campo: ''}).values_list(campo, flat=True).distinct()
+        )
+    return sorted(nombres)
+
+
+def rellenar_marcadores(procesos=None, tamano_lote=200, progreso=None):
+    """
+    Calcula el marcador de las imágenes que no lo tienen, una vez por archivo aunque lo
+    usen varios registros. Retorna (archivos, registros actualizados, errores {nombre: error}).
+    `progreso`, si se indica, se llama con (hechos, total) tras cada lote.
+    """
+    procesos = max(procesos or settings.IMPORTACION_PROCESOS, 1)
+    nombres = _pendientes()
+    actualizados = 0
+    errores = {}
+
+    pool = None
+    if procesos > 1 and len(nombres) > 1:
+        # Los procesos hijos no deben heredar las conexiones abiertas del padre
+        connections.close_all()
+        pool = get_context().Pool(procesos, initializer=_inicializar_proceso)
+    try:
+        for inicio in range(0, len(nombres), tamano_lote):
+            trozo = nombres[inicio:inicio + tamano_lote]
+            resultados = pool.map(_marcador_guardado, trozo) if pool else map(_marcador_guardado, trozo)
+            for nombre, marcador, color, error in resultados:
+                if error:
+                    errores[nombre] = error
+                    continue
+                for modelo, campo, campo_marcador, campo_color in CAMPOS:
+                    actualizados += modelo.objects.filter(**{campo: nombre, campo_marcador: ''}).update(
+                        **{campo_marcador: marcador, campo_color: color}
+                    )
+                # Las subidas que reutilicen el archivo copiarán el marcador
+                ImagenProcesada.objects.filter(nombre=nombre).update(marcador=marcador, color=color)
+            if progreso:
+                progreso(min(inicio + tamano_lote, len(nombres)), len(nombres))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return len(nombres), actualizados, errores
@@ -0,0 +1,202 @@
+"""
+Métricas de Prometheus de la tienda, expuestas en /metrics (ver TiendaMotos/views.py).
+
+Con varios workers de gunicorn cada proceso tiene sus propios contadores; para que el
+scrape vea el total, prometheus_client los escribe en ficheros de un directorio
+compartido (variable de entorno PROMETHEUS_MULTIPROC_DIR, la fija gunicorn.conf.py) y
+la vista de /metrics los agrega al responder. Sin esa variable (runserver, tests) las
+métricas viven en el registro del propio proceso.
+
+Las métricas por petición las alimenta MedicionMiddleware a partir de la medición de
+productos/instrumentacion.py; las de imágenes, productos/imagenes.py. El retraso de
+las tendencias se calcula al hacer el scrape (ColectorTendencias).
+"""
+import hmac
+import ipaddress
+import os
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Max, Sum
+from django.utils import timezone
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+    generate_latest, multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+
+# Vistas cuya latencia cuenta como búsqueda (la lista solo si lleva ?q=)
+VISTAS_BUSQUEDA = {'productos:buscar': 'autocompletar', 'productos:lista': 'catalogo'}
+
+PETICION_DURACION = Histogram(
+    'tiendamotos_peticion_duracion_segundos',
+    'Latencia de las peticiones por vista',
+    ['vista', 'metodo', 'estado'],
+    buckets=(.01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10),
+)
+PETICION_CONSULTAS = Histogram(
+    'tiendamotos_peticion_consultas_db',
+    'Consultas SQL por petición',
+    ['vista'],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 250, 500, 1000),
+)
+PETICION_DB_DURACION = Histogram(
+    'tiendamotos_peticion_db_segundos',
+    'Tiempo en SQL por petición',
+    ['vista'],
+    buckets=(.001, .005, .01, .025, .05, .1, .25, .5, 1, 2.5),
+)
+CACHE_LECTURAS = Counter(
+    'tiendamotos_cache_lecturas',
+    'Lecturas de caché durante peticiones; ratio de aciertos = acierto / total',
+    ['resultado'],
+)
+BUSQUEDA_DURACION = Histogram(
+    'tiendamotos_busqueda_duracion_segundos',
+    'Latencia de las búsquedas',
+    ['tipo'],
+    buckets=(.005, .01, .025, .05, .1, .25, .5, 1, 2.5),
+)
+IMAGENES_EN_PROCESO = Gauge(
+    'tiendamotos_imagenes_en_proceso',
+    'Imágenes que se están procesando ahora mismo (suma de todos los procesos vivos)',
+    multiprocess_mode='livesum',
+)
+IMAGEN_DURACION = Histogram(
+    'tiendamotos_imagen_procesamiento_segundos',
+    'Duración del procesamiento de una imagen',
+    ['estrategia'],
+    buckets=(.05, .1, .25, .5, 1, 2, 4, 8, 15),
+)
+
+
+def observar_peticion(request, response, medicion, total_ms):
+    """Registra una petición terminada (lo llama MedicionMiddleware)."""
+    match = getattr(request, 'resolver_match', None)
+    # Sin vista resuelta (404, estáticos) se agrupa para no crear una serie por URL
+    vista = match.view_name if match else 'sin_vista'
+    segundos = total_ms / 1000
+
+    PETICION_DURACION.labels(vista, request.method, f'{response.status_code // 100}xx').observe(segundos)
+    PETICION_CONSULTAS.labels(vista).observe(medicion.db_consultas)
+    PETICION_DB_DURACION.labels(vista).observe(medicion.db_ms / 1000)
+    if medicion.cache_aciertos:
+        CACHE_LECTURAS.labels('acierto').inc(medicion.cache_aciertos)
+    if medicion.cache_fallos:
+        CACHE_LECTURAS.labels('fallo').inc(medicion.cache_fallos)
+
+    tipo = VISTAS_BUSQUEDA.get(vista)
+    if tipo == 'autocompletar' or (tipo and request.GET.get('q')):
+        BUSQUEDA_DURACION.labels(tipo).observe(segundos)
+
+
+@contextmanager
+def procesando_imagen(estrategia):
+    """Cuenta la imagen como en proceso y mide cuánto tarda."""
+    IMAGENES_EN_PROCESO.inc()
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        IMAGEN_DURACION.labels(estrategia).observe(time.perf_counter() - inicio)
+        IMAGENES_EN_PROCESO.dec()
+
+
+class ColectorTendencias:
+    """
+    Vistas y ventas acumuladas en cada producto que actualizar_tendencias aún no ha
+    incorporado a la puntuación, y segundos desde su última ejecución. Son agregados
+    sobre toda la tabla, así que se guardan en caché METRICAS_TENDENCIAS_TTL segundos.
+    """
+
+    CLAVE = 'metricas:tendencias'
+
+    def _valores(self):
+        from .models import Producto
+
+        valores = cache.get(self.CLAVE)
+        if valores is None:
+            agregado = Producto.objects.aggregate(
+                ultimo=Max('fecha_tendencia'),
+                vistas=Sum(F('vistas') - F('vistas_contabilizadas')),
+                ventas=Sum(F('ventas') - F('ventas_contabilizadas')),
+            )
+            valores = {
+                'retraso': (timezone.now() - agregado['ultimo']).total_seconds() if agregado['ultimo'] else None,
+                'vistas': agregado['vistas'] or 0,
+                'ventas': agregado['ventas'] or 0,
+            }
+            cache.set(self.CLAVE, valores, settings.METRICAS_TENDENCIAS_TTL)
+        return valores
+
+    def collect(self):
+        valores = self._valores()
+        if valores['retraso'] is not None:
+            yield GaugeMetricFamily(
+                'tiendamotos_tendencias_retraso_segundos',
+                'Segundos desde el último cálculo de tendencias',
+                value=valores['retraso'],
+            )
+        pendientes = GaugeMetricFamily(
+            'tiendamotos_tendencias_pendientes',
+            'Eventos registrados que aún no cuentan en la tendencia',
+            labels=['evento'],
+        )
+        pendientes.add_metric(['vista'], valores['vistas'])
+        pendientes.add_metric(['venta'], valores['ventas'])
+        yield pendientes
+
+    def describe(self):
+        # Evita que el registro llame a collect() (y consulte la base) al registrarlo
+        return []
+
+
+class _ColectorRegistroGlobal:
+    """Las métricas del registro del proceso (modo de un solo proceso)."""
+
+    def collect(self):
+        return REGISTRY.collect()
+
+    def describe(self):
+        return []
+
+
+_colector_tendencias = ColectorTendencias()
+
+
+def exportar():
+    """Retorna (contenido, content_type) con todas las métricas en formato de texto."""
+    registro = CollectorRegistry()
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.MultiProcessCollector(registro)
+    else:
+        registro.register(_ColectorRegistroGlobal())
+    registro.register(_colector_tendencias)
+    return generate_latest(registro), CONTENT_TYPE_LATEST
+
+
+def acceso_permitido(request):
+    """
+    /metrics es solo para el scraper interno. Se permite con la cabecera
+    "Authorization: Bearer <METRICAS_TOKEN>" o, si la petición no ha pasado por el
+    proxy público (sin X-Forwarded-For), desde una IP de METRICAS_IPS_PERMITIDAS o, si
+    esta lista está vacía, desde una red privada o loopback (red interna de Railway).
+    """
+    token = settings.METRICAS_TOKEN
+    if token:
+        autorizacion = request.headers.get('Authorization', '')
+        if hmac.compare_digest(autorizacion.encode(), f'Bearer {token}'.encode()):
+            return True
+
+    if 'X-Forwarded-For' in request.headers:
+        return False
+    try:
+        ip = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    if settings.METRICAS_IPS_PERMITIDAS:
+        return any(ip in ipaddress.ip_network(red, strict=False) for red in settings.METRICAS_IPS_PERMITIDAS)
+    return ip.is_private or ip.is_loopback
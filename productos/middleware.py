@@ -0,0 +1,91 @@
+import json
+import logging
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+
+from . import instrumentacion, metricas
+from .perfilado import modo_solicitado, perfilar, guardar_informe
+
+
+logger = logging.getLogger('tiendamotos.rendimiento')
+
+
+class MedicionMiddleware:
+    """
+    Mide cada petición (SQL, plantillas, caché y almacenamiento, ver
+    productos/instrumentacion.py), la registra en las métricas de Prometheus, añade la
+    cabecera Server-Timing y escribe una línea JSON por petición en el logger
+    "tiendamotos.rendimiento". Debe ir el primero.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        medicion, token = instrumentacion.iniciar()
+        try:
+            with ExitStack() as pila:
+                for conexion in connections.all():
+                    pila.enter_context(conexion.execute_wrapper(medicion.registrar_sql))
+                response = self.get_response(request)
+        finally:
+            instrumentacion.finalizar(token)
+
+        total_ms = medicion.total_ms
+        metricas.observar_peticion(request, response, medicion, total_ms)
+        if settings.METRICAS_SERVER_TIMING:
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={medicion.db_ms:.1f};desc="{medicion.db_consultas} consultas"',
+                f'tpl;dur={medicion.plantilla_ms:.1f};desc="plantillas"',
+                f'cache;dur={medicion.cache_ms:.1f};desc="{medicion.cache_aciertos} aciertos / {medicion.cache_fallos} fallos"',
+                f'storage;dur={medicion.almacenamiento_ms:.1f};desc="{medicion.almacenamiento_llamadas} llamadas"',
+                f'total;dur={total_ms:.1f}',
+            ])
+
+        if logger.isEnabledFor(logging.INFO):
+            match = getattr(request, 'resolver_match', None)
+            logger.info(json.dumps({
+                'vista': match.view_name if match else None,
+                'metodo': request.method,
+                'ruta': request.path,
+                'estado': response.status_code,
+                'total_ms': round(total_ms, 2),
+                'db_ms': round(medicion.db_ms, 2),
+                'db_consultas': medicion.db_consultas,
+                'plantilla_ms': round(medicion.plantilla_ms, 2),
+                'cache_ms': round(medicion.cache_ms, 2),
+                'cache_aciertos': medicion.cache_aciertos,
+                'cache_fallos': medicion.cache_fallos,
+                'almacenamiento_ms': round(medicion.almacenamiento_ms, 2),
+                'almacenamiento_llamadas': medicion.almacenamiento_llamadas,
+                'bytes': None if response.streaming else len(response.content),
+            }, ensure_ascii=False))
+        return response
+
+
+class PerfiladoMiddleware:
+    """
+    Perfila la petición cuando un usuario staff lo pide con ?_perfil o la cabecera
+    X-Perfil (ver productos/perfilado.py). Debe ir después de AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        modo = modo_solicitado(request)
+        if modo is None or not request.user.is_staff:
+            return self.get_response(request)
+
+        response, informe = perfilar(request, self.get_response)
+
+        if modo == 'guardar':
+            response['X-Perfil-Id'] = guardar_informe(request, informe)
+            return response
+
+        respuesta_informe = HttpResponse(informe, content_type='text/plain; charset=utf-8')
+        respuesta_informe['Cache-Control'] = 'private, no-store'
+        return respuesta_informe
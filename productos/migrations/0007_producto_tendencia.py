@@ -0,0 +1,41 @@
+# Generated by Django 5.2.10 on 2026-10-19 01:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0006_alter_atributodinamico_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='fecha_tendencia',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Último Cálculo de Tendencia'),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='puntuacion_tendencia',
+            field=models.FloatField(default=0, editable=False, verbose_name='Puntuación de Tendencia'),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='ventas_contabilizadas',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Ventas ya contabilizadas en la tendencia'),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='vistas_contabilizadas',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Vistas ya contabilizadas en la tendencia'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['es_activo', '-puntuacion_tendencia', '-fecha_creacion'], name='producto_activo_tendencia_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['es_activo', '-ventas', '-fecha_creacion'], name='producto_activo_ventas_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.10 on 2026-10-19 01:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0007_producto_tendencia'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductoRelacionado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('similitud', models.FloatField(verbose_name='Similitud')),
+                ('posicion', models.PositiveSmallIntegerField(default=0, verbose_name='Posición')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='relacionados', to='productos.producto', verbose_name='Producto')),
+                ('relacionado', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='relacionado_de', to='productos.producto', verbose_name='Producto Relacionado')),
+            ],
+            options={
+                'verbose_name': 'Producto Relacionado',
+                'verbose_name_plural': 'Productos Relacionados',
+                'ordering': ['producto', 'posicion'],
+                'indexes': [models.Index(fields=['producto', 'posicion'], name='relacionado_producto_pos_idx')],
+                'unique_together': {('producto', 'relacionado')},
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.10 on 2026-10-19 01:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0008_productorelacionado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='valorproducto',
+            name='valor_numerico',
+            field=models.FloatField(blank=True, editable=False, help_text="Número extraído de 'valor' en la unidad de medida del atributo", null=True, verbose_name='Valor Numérico'),
+        ),
+        migrations.AddIndex(
+            model_name='valorproducto',
+            index=models.Index(fields=['atributo', 'valor_numerico'], name='valor_atributo_numerico_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.10 on 2026-10-19 01:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0009_valorproducto_valor_numerico'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConteoValorAtributo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('valor', models.CharField(max_length=200, verbose_name='Valor')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Productos')),
+            ],
+            options={
+                'verbose_name': 'Conteo de Valor de Atributo',
+                'verbose_name_plural': 'Conteos de Valores de Atributos',
+                'ordering': ['atributo', '-total', 'valor'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='valorproducto',
+            index=models.Index(fields=['atributo', 'valor'], name='valor_atributo_texto_idx'),
+        ),
+        migrations.AddField(
+            model_name='conteovaloratributo',
+            name='atributo',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conteos', to='productos.atributodinamico', verbose_name='Atributo'),
+        ),
+        migrations.AddField(
+            model_name='conteovaloratributo',
+            name='categoria',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='conteos_atributos', to='productos.categoria', verbose_name='Categoría'),
+        ),
+        migrations.AddIndex(
+            model_name='conteovaloratributo',
+            index=models.Index(fields=['categoria', 'atributo'], name='conteo_categoria_atributo_idx'),
+        ),
+    ]
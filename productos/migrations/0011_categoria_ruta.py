@@ -0,0 +1,47 @@
+# Generated by Django 5.2.10 on 2026-10-19 01:44
+
+from django.db import migrations, models
+
+
+def calcular_rutas(apps, schema_editor):
+    Categoria = apps.get_model('productos', 'Categoria')
+    categorias = {c.pk: c for c in Categoria.objects.all()}
+    hijos = {}
+    for categoria in categorias.values():
+        hijos.setdefault(categoria.padre_id, []).append(categoria)
+
+    pendientes = [(c, '/', 0, '') for c in hijos.get(None, [])]
+    while pendientes:
+        categoria, ruta_padre, nivel, prefijo = pendientes.pop()
+        categoria.ruta = f"{ruta_padre}{categoria.pk}/"
+        categoria.nivel = nivel
+        categoria.nombre_completo = f"{prefijo}{categoria.nombre}"
+        for hijo in hijos.get(categoria.pk, []):
+            pendientes.append((hijo, categoria.ruta, nivel + 1, f"{categoria.nombre_completo} > "))
+    Categoria.objects.bulk_update(categorias.values(), ['ruta', 'nivel', 'nombre_completo'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0010_facetas_atributos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='categoria',
+            name='nivel',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Nivel'),
+        ),
+        migrations.AddField(
+            model_name='categoria',
+            name='nombre_completo',
+            field=models.CharField(blank=True, default='', editable=False, max_length=500, verbose_name='Nombre Completo'),
+        ),
+        migrations.AddField(
+            model_name='categoria',
+            name='ruta',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=255, verbose_name='Ruta'),
+        ),
+        migrations.RunPython(calcular_rutas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.10 on 2026-10-19 01:45
+
+import django.core.validators
+from decimal import Decimal
+from django.db import migrations, models
+
+
+def copiar_precios(apps, schema_editor):
+    # Sin tasas registradas el precio normalizado coincide con el de venta
+    Producto = apps.get_model('productos', 'Producto')
+    Producto.objects.update(precio_normalizado=models.F('precio_venta'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0011_categoria_ruta'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TasaCambio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('moneda', models.CharField(choices=[('USD', 'Dólares USD'), ('EUR', 'Euros'), ('CUP', 'Pesos Cubanos'), ('MLC', 'Moneda Libremente Convertible')], max_length=3, unique=True, verbose_name='Moneda')),
+                ('tasa_usd', models.DecimalField(decimal_places=6, help_text='Ej: 1.08 para EUR si 1 EUR = 1.08 USD', max_digits=14, validators=[django.core.validators.MinValueValidator(Decimal('0.000001'))], verbose_name='USD por unidad')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Última Actualización')),
+            ],
+            options={
+                'verbose_name': 'Tasa de Cambio',
+                'verbose_name_plural': 'Tasas de Cambio',
+                'ordering': ['moneda'],
+            },
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='precio_normalizado',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, help_text='Precio convertido a USD con la tasa de cambio vigente, para filtrar y ordenar', max_digits=14, null=True, verbose_name='Precio Normalizado (USD)'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['es_activo', 'precio_normalizado'], name='producto_activo_precio_idx'),
+        ),
+        migrations.RunPython(copiar_precios, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.10 on 2026-10-19 01:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0012_precio_normalizado'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='producto',
+            name='producto_activo_tendencia_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='producto',
+            name='producto_activo_ventas_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='producto',
+            name='producto_activo_precio_idx',
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(condition=models.Q(('es_activo', True)), fields=['-fecha_creacion'], name='producto_activo_recientes_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(condition=models.Q(('es_activo', True)), fields=['-puntuacion_tendencia', '-fecha_creacion'], name='producto_activo_tendencia_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(condition=models.Q(('es_activo', True)), fields=['-ventas', '-fecha_creacion'], name='producto_activo_ventas_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(condition=models.Q(('es_activo', True)), fields=['precio_normalizado'], name='producto_activo_precio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(condition=models.Q(('es_activo', True)), fields=['nombre'], name='producto_activo_nombre_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(condition=models.Q(('es_activo', True)), fields=['categoria', '-fecha_creacion'], name='producto_activo_categoria_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['-fecha_actualizacion', '-fecha_creacion'], name='producto_actualizacion_idx'),
+        ),
+    ]
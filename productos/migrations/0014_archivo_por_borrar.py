@@ -0,0 +1,28 @@
+# Generated by Django 5.2.10 on 2026-10-19 02:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0013_indices_catalogo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivoPorBorrar',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=255, unique=True, verbose_name='Nombre en el almacenamiento')),
+                ('intentos', models.PositiveSmallIntegerField(default=0, verbose_name='Intentos')),
+                ('error', models.TextField(blank=True, verbose_name='Último error')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+            ],
+            options={
+                'verbose_name': 'Archivo por Borrar',
+                'verbose_name_plural': 'Archivos por Borrar',
+                'ordering': ['id'],
+            },
+        ),
+    ]
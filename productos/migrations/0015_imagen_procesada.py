@@ -0,0 +1,31 @@
+# Generated by Django 5.2.10 on 2026-10-19 02:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0014_archivo_por_borrar'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImagenProcesada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hash_original', models.CharField(max_length=64, verbose_name='SHA-256 del original')),
+                ('estrategia', models.CharField(max_length=30, verbose_name='Estrategia de procesado')),
+                ('hash_procesado', models.CharField(db_index=True, max_length=64, verbose_name='SHA-256 del JPEG')),
+                ('nombre', models.CharField(db_index=True, max_length=255, verbose_name='Nombre en el almacenamiento')),
+                ('bytes', models.PositiveIntegerField(verbose_name='Tamaño (bytes)')),
+                ('reutilizaciones', models.PositiveIntegerField(default=0, verbose_name='Reutilizaciones')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+            ],
+            options={
+                'verbose_name': 'Imagen Procesada',
+                'verbose_name_plural': 'Imágenes Procesadas',
+                'unique_together': {('hash_original', 'estrategia')},
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.10 on 2026-10-19 02:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0015_imagen_procesada'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imagenprocesada',
+            name='color',
+            field=models.CharField(blank=True, default='', max_length=7, verbose_name='Color dominante'),
+        ),
+        migrations.AddField(
+            model_name='imagenprocesada',
+            name='marcador',
+            field=models.CharField(blank=True, default='', max_length=1000, verbose_name='Marcador de la imagen'),
+        ),
+        migrations.AddField(
+            model_name='imagenproducto',
+            name='color',
+            field=models.CharField(blank=True, default='', max_length=7, verbose_name='Color dominante'),
+        ),
+        migrations.AddField(
+            model_name='imagenproducto',
+            name='marcador',
+            field=models.CharField(blank=True, default='', max_length=1000, verbose_name='Marcador de la imagen'),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='imagen_color',
+            field=models.CharField(blank=True, default='', max_length=7, verbose_name='Color dominante'),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='imagen_marcador',
+            field=models.CharField(blank=True, default='', max_length=1000, verbose_name='Marcador de la imagen'),
+        ),
+    ]
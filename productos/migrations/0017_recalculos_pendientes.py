@@ -0,0 +1,28 @@
+# Generated by Django 5.2.10 on 2026-10-19 02:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0016_marcadores_imagen'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecalculoPendiente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(max_length=20, verbose_name='Tipo')),
+                ('objeto_id', models.PositiveIntegerField(verbose_name='ID del objeto')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+            ],
+            options={
+                'verbose_name': 'Recálculo Pendiente',
+                'verbose_name_plural': 'Recálculos Pendientes',
+                'ordering': ['id'],
+                'unique_together': {('tipo', 'objeto_id')},
+            },
+        ),
+    ]
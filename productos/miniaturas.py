@@ -0,0 +1,225 @@
+"""
+Miniaturas bajo demanda de imágenes de productos y de archivos estáticos.
+
+Las imágenes subidas antes de que existiera el procesado (y los estáticos como
+static/images/hero1.jpg) se servían a tamaño completo en listados y tarjetas. La
+etiqueta {% miniatura %} genera una URL firmada con el origen, el tamaño y el formato;
+la vista la valida, genera la miniatura la primera vez y la guarda en disco. Como la URL
+solo se puede firmar en el servidor, nadie puede pedir tamaños arbitrarios.
+
+La URL identifica un contenido que no cambia (los archivos subidos tienen nombre único y
+los estáticos llevan su versión del manifiesto), así que se sirve con caché
+"immutable" de un año.
+
+La caché en disco tiene un tamaño máximo (MINIATURAS_MAX_MB): cada acierto actualiza la
+fecha de modificación del archivo y, al pasarse del límite, se borran los menos usados
+hasta quedar en el 90 %.
+
+Si los archivos subidos están en Cloudinary, la etiqueta no pasa por la vista: emite una
+URL de transformación de Cloudinary (url_cloudinary) y la miniatura se genera y se
+guarda en su CDN. Así el worker no descarga el original ni redimensiona, y la caché no
+se pierde con cada despliegue. La vista queda para los estáticos y el disco local.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core import signing
+from django.core.files.storage import default_storage
+
+from .almacenamiento import _backend, _es_cloudinary
+from .metricas import procesando_imagen
+
+
+FORMATOS = {
+    'webp': ('WEBP', 'image/webp'),
+    'jpeg': ('JPEG', 'image/jpeg'),
+}
+_firmador = signing.Signer(salt='productos.miniaturas')
+
+
+def firmar(origen, ancho, alto, formato='webp'):
+    """
+    Token firmado para la URL de la miniatura. `origen` es un FieldFile, el nombre de un
+    archivo subido o "static:<ruta>" para un archivo estático.
+    """
+    ancho, alto = _validar(ancho, alto, formato)
+    nombre = getattr(origen, 'name', origen)
+    datos = {'a': ancho, 'h': alto, 'f': formato}
+    if nombre.startswith('static:'):
+        ruta = nombre[len('static:'):]
+        # La URL del manifiesto lleva el hash del contenido: si el archivo cambia, cambia el token
+        datos.update(s=ruta, v=staticfiles_storage.url(ruta))
+    else:
+        datos['m'] = nombre
+    return _firmador.sign_object(datos, compress=True)
+
+
+def _validar(ancho, alto, formato):
+    if formato not in FORMATOS:
+        raise ValueError(f'Formato no soportado: {formato} (usa {" o ".join(FORMATOS)})')
+    ancho, alto = int(ancho), int(alto)
+    if not (0 < ancho <= settings.MINIATURAS_LADO_MAXIMO and 0 < alto <= settings.MINIATURAS_LADO_MAXIMO):
+        raise ValueError(f'Tamaño no válido: {ancho}x{alto}')
+    return ancho, alto
+
+
+def url_cloudinary(origen, ancho, alto, formato='webp'):
+    """
+    URL de transformación de Cloudinary para un archivo subido (ajustada dentro de ancho x
+    alto, sin ampliar), o None si el origen es estático o el almacenamiento no es Cloudinary.
+    """
+    ancho, alto = _validar(ancho, alto, formato)
+    nombre = getattr(origen, 'name', origen)
+    backend = _backend()
+    if nombre.startswith('static:') or not _es_cloudinary(backend):
+        return None
+    import cloudinary
+
+    recurso = cloudinary.CloudinaryResource(
+        backend._prepend_prefix(nombre), default_resource_type=backend.RESOURCE_TYPE
+    )
+    return recurso.build_url(
+        width=ancho, height=alto, crop='limit', fetch_format='jpg' if formato == 'jpeg' else formato,
+        quality=settings.MINIATURAS_CALIDAD, secure=True,
+    )
+
+
+def leer_token(token):
+    """Datos de un token firmado. Lanza signing.BadSignature si no es válido."""
+    return _firmador.unsign_object(token)
+
+
+def _abrir_origen(datos):
+    if 'm' in datos:
+        return default_storage.open(datos['m'])
+    ruta = finders.find(datos['s'])
+    return open(ruta, 'rb') if ruta else staticfiles_storage.open(datos['s'])
+
+
+def generar(datos):
+    """Bytes de la miniatura: ajustada dentro de ancho x alto, sin ampliar ni recortar."""
+    from PIL import Image, ImageOps
+    from .imagenes import _a_rgb
+
+    formato, _ = FORMATOS[datos['f']]
+    with procesando_imagen('miniatura'), _abrir_origen(datos) as archivo:
+        img = Image.open(archivo)
+        # Las JPEG grandes se decodifican ya reducidas
+        img.draft('RGB', (datos['a'], datos['h']))
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((datos['a'], datos['h']), Image.LANCZOS)
+        if formato == 'JPEG' or img.mode not in ('RGB', 'RGBA'):
+            img = _a_rgb(img)
+        salida = BytesIO()
+        img.save(salida, format=formato, quality=settings.MINIATURAS_CALIDAD, optimize=True)
+    return salida.getvalue()
+
+
+class CacheDisco:
+    """Caché de miniaturas en disco con expulsión LRU por tamaño total."""
+
+    def __init__(self, directorio=None, maximo_bytes=None):
+        self._directorio = directorio
+        self._maximo = maximo_bytes
+        self.cerrojo = threading.Lock()
+        # Estimación del tamaño total: se recuenta al expulsar o cada minuto, porque
+        # otros workers escriben en el mismo directorio
+        self.estimado = None
+        self.ultimo_recuento = 0
+
+    @property
+    def directorio(self):
+        return str(self._directorio or settings.MINIATURAS_DIRECTORIO)
+
+    @property
+    def maximo(self):
+        return self._maximo or settings.MINIATURAS_MAX_MB * 1024 * 1024
+
+    def ruta(self, token, formato):
+        clave = hashlib.sha256(token.encode()).hexdigest()
+        return os.path.join(self.directorio, clave[:2], f'{clave}.{formato}')
+
+    def abrir(self, ruta):
+        """Abre la miniatura si está en caché (o None) y la marca como recién usada."""
+        try:
+            archivo = open(ruta, 'rb')
+        except FileNotFoundError:
+            return None
+        # Abierto, el archivo se puede leer aunque otro worker lo expulse ahora
+        os.utime(ruta)
+        return archivo
+
+    def guardar(self, ruta, contenido):
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        # Escritura atómica: otra petición nunca lee una miniatura a medias
+        descriptor, temporal = tempfile.mkstemp(dir=os.path.dirname(ruta), suffix='.tmp')
+        with os.fdopen(descriptor, 'wb') as archivo:
+            archivo.write(contenido)
+        os.replace(temporal, ruta)
+
+        with self.cerrojo:
+            if self.estimado is None or time.monotonic() - self.ultimo_recuento > 60:
+                self._recontar()
+            else:
+                self.estimado += len(contenido)
+            if self.estimado > self.maximo:
+                self._expulsar()
+
+    def _archivos(self):
+        for directorio, _, archivos in os.walk(self.directorio):
+            for nombre in archivos:
+                if nombre.endswith('.tmp'):
+                    # Escrituras en curso de otros workers
+                    continue
+                ruta = os.path.join(directorio, nombre)
+                try:
+                    estado = os.stat(ruta)
+                except FileNotFoundError:
+                    continue
+                yield estado.st_mtime, estado.st_size, ruta
+
+    def _recontar(self):
+        self.estimado = sum(tamano for _, tamano, _ in self._archivos())
+        self.ultimo_recuento = time.monotonic()
+
+    def _expulsar(self):
+        """Borra las miniaturas usadas hace más tiempo hasta quedar en el 90 % del máximo."""
+        archivos = sorted(self._archivos())
+        total = sum(tamano for _, tamano, _ in archivos)
+        objetivo = self.maximo * 0.9
+        for _, tamano, ruta in archivos:
+            if total <= objetivo:
+                break
+            try:
+                os.remove(ruta)
+            except FileNotFoundError:
+                pass
+            total -= tamano
+        self.estimado = total
+        self.ultimo_recuento = time.monotonic()
+
+
+cache_disco = CacheDisco()
+
+
+def obtener_miniatura(token):
+    """
+    Archivo abierto con la miniatura del token (generada si no estaba en caché) y su tipo
+    MIME. Lanza signing.BadSignature si el token no es válido y OSError si el origen no
+    existe o no es una imagen.
+    """
+    datos = leer_token(token)
+    ruta = cache_disco.ruta(token, datos['f'])
+    archivo = cache_disco.abrir(ruta)
+    if archivo is None:
+        contenido = generar(datos)
+        cache_disco.guardar(ruta, contenido)
+        archivo = BytesIO(contenido)
+    return archivo, FORMATOS[datos['f']][1]
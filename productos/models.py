@@ -1,11 +1,13 @@
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Round
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
-from decimal import Decimal
+from django.conf import settings
+from django.utils import timezone
+from decimal import ROUND_HALF_UP, Decimal
 import uuid
-from PIL import Image
-from io import BytesIO
-from django.core.files.uploadedfile import InMemoryUploadedFile
-import sys
+from .atributos import parsear_valor_numerico
 
 
 class Categoria(models.Model):
@@ -24,15 +26,86 @@ class Categoria(models.Model):
     )
     fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de Creación")
     
+    # Ruta materializada (mantenida en save): ids de la raíz a esta categoría, ej. "/1/5/12/"
+    ruta = models.CharField(max_length=255, blank=True, default='', editable=False, db_index=True, verbose_name="Ruta")
+    nivel = models.PositiveSmallIntegerField(default=0, editable=False, verbose_name="Nivel")
+    nombre_completo = models.CharField(max_length=500, blank=True, default='', editable=False, verbose_name="Nombre Completo")
+    
     class Meta:
         verbose_name = "Categoría"
         verbose_name_plural = "Categorías"
         ordering = ['nombre']
     
     def __str__(self):
-        if self.padre:
-            return f"{self.padre.nombre} > {self.nombre}"
-        return self.nombre
+        return self.nombre_completo or self.nombre
+    
+    @property
+    def ids_ruta(self):
+        """Ids de los ancestros y de la propia categoría, desde la raíz."""
+        return [int(i) for i in self.ruta.strip('/').split('/') if i]
+    
+    def ancestros(self):
+        """Ancestros desde la raíz, en una sola consulta."""
+        return Categoria.objects.filter(id__in=self.ids_ruta[:-1]).order_by('nivel')
+    
+    def migas(self):
+        """Breadcrumbs: ancestros más la propia categoría."""
+        return [*self.ancestros(), self]
+    
+    def descendientes(self, incluir_propia=True):
+        """Subárbol de la categoría, en una sola consulta."""
+        categorias = Categoria.objects.filter(ruta__startswith=self.ruta)
+        if not incluir_propia:
+            categorias = categorias.exclude(pk=self.pk)
+        return categorias
+    
+    ERROR_CICLO = 'Una categoría no puede ser subcategoría de sí misma ni de sus subcategorías'
+    
+    def clean(self):
+        # El admin valida antes de guardar: el ciclo se muestra en el campo, no como error 500
+        super().clean()
+        if self.pk and self.padre_id:
+            ruta_padre = Categoria.objects.filter(pk=self.padre_id).values_list('ruta', flat=True).first()
+            if ruta_padre is not None and f'/{self.pk}/' in ruta_padre:
+                raise ValidationError({'padre': self.ERROR_CICLO})
+    
+    def save(self, *args, **kwargs):
+        if self.padre_id:
+            padre = Categoria.objects.only('ruta', 'nivel', 'nombre_completo').get(pk=self.padre_id)
+            if self.pk and f'/{self.pk}/' in padre.ruta:
+                raise ValueError(self.ERROR_CICLO)
+            ruta_padre, nivel, prefijo_nombre = padre.ruta, padre.nivel + 1, f"{padre.nombre_completo} > "
+        else:
+            ruta_padre, nivel, prefijo_nombre = '/', 0, ''
+        
+        ruta_anterior = self.ruta
+        nombre_anterior = self.nombre_completo
+        nivel_anterior = self.nivel
+        self.nivel = nivel
+        self.nombre_completo = f"{prefijo_nombre}{self.nombre}"
+        
+        if self.pk:
+            self.ruta = f"{ruta_padre}{self.pk}/"
+            super().save(*args, **kwargs)
+        else:
+            # La ruta incluye el propio id, que solo se conoce tras insertar
+            super().save(*args, **kwargs)
+            self.ruta = f"{ruta_padre}{self.pk}/"
+            Categoria.objects.filter(pk=self.pk).update(ruta=self.ruta)
+        
+        if ruta_anterior and (ruta_anterior != self.ruta or nombre_anterior != self.nombre_completo):
+            self._actualizar_descendientes(ruta_anterior, nombre_anterior, self.nivel - nivel_anterior)
+    
+    def _actualizar_descendientes(self, ruta_anterior, nombre_anterior, delta_nivel):
+        """Reescribe ruta, nivel y nombre completo del subárbol tras mover o renombrar."""
+        descendientes = list(
+            Categoria.objects.filter(ruta__startswith=ruta_anterior).exclude(pk=self.pk)
+        )
+        for categoria in descendientes:
+            categoria.ruta = self.ruta + categoria.ruta[len(ruta_anterior):]
+            categoria.nivel += delta_nivel
+            categoria.nombre_completo = self.nombre_completo + categoria.nombre_completo[len(nombre_anterior):]
+        Categoria.objects.bulk_update(descendientes, ['ruta', 'nivel', 'nombre_completo'], batch_size=500)
 
 
 class Color(models.Model):
@@ -97,6 +170,15 @@ class Producto(models.Model):
         default='USD',
         verbose_name="Moneda"
     )
+    precio_normalizado = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        blank=True,
+        null=True,
+        editable=False,
+        verbose_name="Precio Normalizado (USD)",
+        help_text="Precio convertido a USD con la tasa de cambio vigente, para filtrar y ordenar"
+    )
     
     # Colores disponibles (relación muchos a muchos)
     colores = models.ManyToManyField(
@@ -120,6 +202,9 @@ class Producto(models.Model):
         null=True,
         verbose_name="Imagen Principal"
     )
+    # Marcador de posición y color dominante de la imagen (ver productos/marcadores.py)
+    imagen_marcador = models.CharField(max_length=1000, blank=True, default='', verbose_name="Marcador de la imagen")
+    imagen_color = models.CharField(max_length=7, blank=True, default='', verbose_name="Color dominante")
     
     # Estadísticas
     vistas = models.IntegerField(
@@ -133,6 +218,29 @@ class Producto(models.Model):
         verbose_name="Unidades Vendidas"
     )
     
+    # Tendencia (vistas y ventas con decaimiento exponencial)
+    puntuacion_tendencia = models.FloatField(
+        default=0,
+        editable=False,
+        verbose_name="Puntuación de Tendencia"
+    )
+    vistas_contabilizadas = models.IntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Vistas ya contabilizadas en la tendencia"
+    )
+    ventas_contabilizadas = models.IntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Ventas ya contabilizadas en la tendencia"
+    )
+    fecha_tendencia = models.DateTimeField(
+        blank=True,
+        null=True,
+        editable=False,
+        verbose_name="Último Cálculo de Tendencia"
+    )
+    
     # Estado
     es_activo = models.BooleanField(default=True, verbose_name="Activo")
     
@@ -144,71 +252,99 @@ class Producto(models.Model):
         verbose_name = "Producto"
         verbose_name_plural = "Productos"
         ordering = ['-fecha_creacion']
+        # Las consultas públicas (lista, detalle, home, buscar) siempre filtran
+        # es_activo=True, así que los índices del catálogo son parciales sobre las
+        # filas activas: más pequeños y válidos para cada ordenamiento de lista.
+        indexes = [
+            models.Index(
+                fields=['-fecha_creacion'],
+                condition=models.Q(es_activo=True),
+                name='producto_activo_recientes_idx'
+            ),
+            models.Index(
+                fields=['-puntuacion_tendencia', '-fecha_creacion'],
+                condition=models.Q(es_activo=True),
+                name='producto_activo_tendencia_idx'
+            ),
+            models.Index(
+                fields=['-ventas', '-fecha_creacion'],
+                condition=models.Q(es_activo=True),
+                name='producto_activo_ventas_idx'
+            ),
+            models.Index(
+                fields=['precio_normalizado'],
+                condition=models.Q(es_activo=True),
+                name='producto_activo_precio_idx'
+            ),
+            models.Index(
+                fields=['nombre'],
+                condition=models.Q(es_activo=True),
+                name='producto_activo_nombre_idx'
+            ),
+            models.Index(
+                fields=['categoria', '-fecha_creacion'],
+                condition=models.Q(es_activo=True),
+                name='producto_activo_categoria_idx'
+            ),
+            # Panel de administración: últimos productos editados
+            models.Index(
+                fields=['-fecha_actualizacion', '-fecha_creacion'],
+                name='producto_actualizacion_idx'
+            ),
+        ]
     
-    def _redimensionar_imagen(self, imagen_field):
-        """
-        Redimensiona la imagen a 800x600px manteniendo la proporción
-        sin recortar, agregando padding si es necesario
+    @classmethod
+    def actualizar_tendencias(cls, vida_media_horas=None, peso_venta=None):
         """
-        if not imagen_field:
-            return None
-            
-        img = Image.open(imagen_field)
-        
-        # Convertir a RGB si es necesario (para PNGs con transparencia)
-        if img.mode in ('RGBA', 'LA', 'P'):
-            background = Image.new('RGB', img.size, (255, 255, 255))
-            if img.mode == 'P':
-                img = img.convert('RGBA')
-            background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-            img = background
-        elif img.mode != 'RGB':
-            img = img.convert('RGB')
-        
-        # Dimensiones objetivo
-        target_width = 800
-        target_height = 600
-        
-        # Calcular el ratio de la imagen original
-        img_ratio = img.width / img.height
-        target_ratio = target_width / target_height
-        
-        # Redimensionar manteniendo aspecto (sin recortar)
-        if img_ratio > target_ratio:
-            # Imagen más ancha - ajustar por ancho
-            new_width = target_width
-            new_height = int(target_width / img_ratio)
-        else:
-            # Imagen más alta - ajustar por altura
-            new_height = target_height
-            new_width = int(target_height * img_ratio)
+        Recalcula de forma incremental la puntuación de tendencia de todos los productos.
         
-        img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+        La puntuación anterior decae según la vida media configurada y se le suman solo
+        las vistas y ventas registradas desde el último cálculo, en un único UPDATE.
+        Retorna el número de productos actualizados.
+        """
+        if vida_media_horas is None:
+            vida_media_horas = settings.TENDENCIA_VIDA_MEDIA_HORAS
+        if peso_venta is None:
+            peso_venta = settings.TENDENCIA_PESO_VENTA
         
-        # Crear lienzo con fondo azul difuminado y centrar la imagen
-        final_img = Image.new('RGB', (target_width, target_height), (232, 235, 242))  # Color azul difuminado #e8ebf2
-        paste_x = (target_width - new_width) // 2
-        paste_y = (target_height - new_height) // 2
-        final_img.paste(img, (paste_x, paste_y))
+        ahora = timezone.now()
+        ultimo_calculo = cls.objects.aggregate(
+            ultimo=models.Max('fecha_tendencia')
+        )['ultimo']
         
-        # Guardar en BytesIO
-        output = BytesIO()
-        final_img.save(output, format='JPEG', quality=85, optimize=True)
-        output.seek(0)
+        # Factor de decaimiento común: todos los productos se recalculan a la vez
+        factor = 1.0
+        if ultimo_calculo:
+            horas = max((ahora - ultimo_calculo).total_seconds() / 3600, 0)
+            factor = 0.5 ** (horas / vida_media_horas)
         
-        # Crear nuevo archivo
-        return InMemoryUploadedFile(
-            output, 'ImageField',
-            f"{imagen_field.name.split('.')[0]}.jpg",
-            'image/jpeg',
-            sys.getsizeof(output),
-            None
+        return cls.objects.update(
+            puntuacion_tendencia=(
+                F('puntuacion_tendencia') * factor
+                + (F('vistas') - F('vistas_contabilizadas'))
+                + (F('ventas') - F('ventas_contabilizadas')) * peso_venta
+            ),
+            vistas_contabilizadas=F('vistas'),
+            ventas_contabilizadas=F('ventas'),
+            fecha_tendencia=ahora,
         )
     
+    def _redimensionar_imagen(self, imagen_field):
+        """
+        Redimensiona la imagen a 800x600px manteniendo la proporción, sin recortar, y la
+        guarda; si ya se procesó una imagen idéntica reutiliza su archivo. Retorna la
+        ImagenProcesada con el nombre guardado, el marcador y el color dominante.
+        """
+        from .deduplicacion import guardar_campo
+        return guardar_campo(imagen_field)
+    
     def save(self, *args, **kwargs):
         if not self.sku:
             self.sku = self._generar_sku()
         
+        if self.precio_venta is not None:
+            self.precio_normalizado = TasaCambio.convertir_a_usd(self.precio_venta, self.moneda)
+        
         # Redimensionar imagen principal si se ha cambiado
         if self.imagen_principal:
             try:
@@ -216,7 +352,9 @@ class Producto(models.Model):
                 if not self.pk or (self.pk and Producto.objects.filter(pk=self.pk).exists()):
                     old_instance = Producto.objects.filter(pk=self.pk).first() if self.pk else None
                     if not old_instance or old_instance.imagen_principal != self.imagen_principal:
-                        self.imagen_principal = self._redimensionar_imagen(self.imagen_principal)
+                        procesada = self._redimensionar_imagen(self.imagen_principal)
+                        self.imagen_principal = procesada.nombre
+                        self.imagen_marcador, self.imagen_color = procesada.marcador, procesada.color
             except Exception as e:
                 print(f"Error al redimensionar imagen: {e}")
                 # Reset file pointer so storage backend can still read the original
@@ -252,6 +390,59 @@ class Producto(models.Model):
         return self.colores.filter(es_activo=True)
 
 
+class TasaCambio(models.Model):
+    """
+    Tasa de cambio de cada moneda a USD. Al guardarla o eliminarla se recalcula en
+    bloque el precio normalizado de todos los productos en esa moneda.
+    """
+    moneda = models.CharField(max_length=3, choices=Producto.MONEDAS, unique=True, verbose_name="Moneda")
+    tasa_usd = models.DecimalField(
+        max_digits=14,
+        decimal_places=6,
+        validators=[MinValueValidator(Decimal('0.000001'))],
+        verbose_name="USD por unidad",
+        help_text="Ej: 1.08 para EUR si 1 EUR = 1.08 USD"
+    )
+    fecha_actualizacion = models.DateTimeField(auto_now=True, verbose_name="Última Actualización")
+    
+    class Meta:
+        verbose_name = "Tasa de Cambio"
+        verbose_name_plural = "Tasas de Cambio"
+        ordering = ['moneda']
+    
+    def __str__(self):
+        return f"1 {self.moneda} = {self.tasa_usd} USD"
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.recalcular_precios()
+    
+    def delete(self, *args, **kwargs):
+        resultado = super().delete(*args, **kwargs)
+        # Sin tasa, convertir_a_usd asume 1:1: los precios guardados deben coincidir
+        self.recalcular_precios(tasa=Decimal('1'))
+        return resultado
+    
+    def recalcular_precios(self, tasa=None):
+        """
+        Actualiza el precio normalizado de los productos en esta moneda con un único
+        UPDATE, redondeado a céntimos como en Producto.save().
+        """
+        return Producto.objects.filter(moneda=self.moneda).update(
+            precio_normalizado=Round(F('precio_venta') * (self.tasa_usd if tasa is None else tasa), 2)
+        )
+    
+    @classmethod
+    def convertir_a_usd(cls, precio, moneda):
+        """Convierte un precio a USD; sin tasa registrada se asume 1:1."""
+        precio = Decimal(str(precio))
+        if moneda == 'USD':
+            return precio
+        tasa = cls.objects.filter(moneda=moneda).values_list('tasa_usd', flat=True).first()
+        # ROUND_HALF_UP, como ROUND() en SQL (recalcular_precios)
+        return (precio * tasa).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP) if tasa else precio
+
+
 class ImagenProducto(models.Model):
     """
     Modelo para galería de imágenes de productos.
@@ -263,6 +454,8 @@ class ImagenProducto(models.Model):
         verbose_name="Producto"
     )
     imagen = models.ImageField(upload_to='productos/galeria/', verbose_name="Imagen")
+    marcador = models.CharField(max_length=1000, blank=True, default='', verbose_name="Marcador de la imagen")
+    color = models.CharField(max_length=7, blank=True, default='', verbose_name="Color dominante")
     descripcion = models.CharField(max_length=200, blank=True, null=True, verbose_name="Descripción")
     orden = models.IntegerField(default=0, verbose_name="Orden")
     fecha_subida = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de Subida")
@@ -274,62 +467,12 @@ class ImagenProducto(models.Model):
     
     def _redimensionar_imagen(self, imagen_field):
         """
-        Redimensiona la imagen a 800x600px manteniendo la proporción
-        sin recortar, agregando padding si es necesario
+        Redimensiona la imagen a 800x600px manteniendo la proporción, sin recortar, y la
+        guarda; si ya se procesó una imagen idéntica reutiliza su archivo. Retorna la
+        ImagenProcesada con el nombre guardado, el marcador y el color dominante.
         """
-        if not imagen_field:
-            return None
-            
-        img = Image.open(imagen_field)
-        
-        # Convertir a RGB si es necesario
-        if img.mode in ('RGBA', 'LA', 'P'):
-            background = Image.new('RGB', img.size, (255, 255, 255))
-            if img.mode == 'P':
-                img = img.convert('RGBA')
-            background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-            img = background
-        elif img.mode != 'RGB':
-            img = img.convert('RGB')
-        
-        # Dimensiones objetivo
-        target_width = 800
-        target_height = 600
-        
-        # Calcular el ratio de la imagen original
-        img_ratio = img.width / img.height
-        target_ratio = target_width / target_height
-        
-        # Redimensionar manteniendo aspecto (sin recortar)
-        if img_ratio > target_ratio:
-            # Imagen más ancha - ajustar por ancho
-            new_width = target_width
-            new_height = int(target_width / img_ratio)
-        else:
-            # Imagen más alta - ajustar por altura
-            new_height = target_height
-            new_width = int(target_height * img_ratio)
-        
-        img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-        
-        # Crear lienzo con fondo azul difuminado y centrar la imagen
-        final_img = Image.new('RGB', (target_width, target_height), (232, 235, 242))  # Color azul difuminado #e8ebf2
-        paste_x = (target_width - new_width) // 2
-        paste_y = (target_height - new_height) // 2
-        final_img.paste(img, (paste_x, paste_y))
-        
-        # Guardar en BytesIO
-        output = BytesIO()
-        final_img.save(output, format='JPEG', quality=85, optimize=True)
-        output.seek(0)
-        
-        return InMemoryUploadedFile(
-            output, 'ImageField',
-            f"{imagen_field.name.split('.')[0]}.jpg",
-            'image/jpeg',
-            sys.getsizeof(output),
-            None
-        )
+        from .deduplicacion import guardar_campo
+        return guardar_campo(imagen_field)
     
     def save(self, *args, **kwargs):
         # Redimensionar imagen de galería
@@ -338,7 +481,9 @@ class ImagenProducto(models.Model):
                 if not self.pk or (self.pk and ImagenProducto.objects.filter(pk=self.pk).exists()):
                     old_instance = ImagenProducto.objects.filter(pk=self.pk).first() if self.pk else None
                     if not old_instance or old_instance.imagen != self.imagen:
-                        self.imagen = self._redimensionar_imagen(self.imagen)
+                        procesada = self._redimensionar_imagen(self.imagen)
+                        self.imagen = procesada.nombre
+                        self.marcador, self.color = procesada.marcador, procesada.color
             except Exception as e:
                 print(f"Error al redimensionar imagen: {e}")
                 # Reset file pointer so storage backend can still read the original
@@ -411,11 +556,26 @@ class ValorProducto(models.Model):
         verbose_name="Atributo"
     )
     valor = models.CharField(max_length=200, verbose_name="Valor")
+    valor_numerico = models.FloatField(
+        blank=True,
+        null=True,
+        editable=False,
+        verbose_name="Valor Numérico",
+        help_text="Número extraído de 'valor' en la unidad de medida del atributo"
+    )
     
     class Meta:
         verbose_name = "Valor de Atributo"
         verbose_name_plural = "Valores de Atributos"
         unique_together = ['producto', 'atributo']
+        indexes = [
+            models.Index(fields=['atributo', 'valor_numerico'], name='valor_atributo_numerico_idx'),
+            models.Index(fields=['atributo', 'valor'], name='valor_atributo_texto_idx'),
+        ]
+    
+    def save(self, *args, **kwargs):
+        self.valor_numerico = parsear_valor_numerico(self.valor, self.atributo.unidad_medida)
+        super().save(*args, **kwargs)
     
     def __str__(self):
         return f"{self.producto.nombre} - {self.atributo.nombre}: {self.valor}"
@@ -428,6 +588,73 @@ class ValorProducto(models.Model):
         return self.valor
 
 
+class ConteoValorAtributo(models.Model):
+    """
+    Índice precalculado de facetas: cuántos productos activos de cada categoría tienen
+    cada valor (no numérico) de un atributo. Las filas sin categoría son el total global.
+    Se mantiene con productos.facetas.recalcular_conteos.
+    """
+    atributo = models.ForeignKey(
+        AtributoDinamico,
+        on_delete=models.CASCADE,
+        related_name='conteos',
+        verbose_name="Atributo"
+    )
+    categoria = models.ForeignKey(
+        Categoria,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='conteos_atributos',
+        verbose_name="Categoría"
+    )
+    valor = models.CharField(max_length=200, verbose_name="Valor")
+    total = models.PositiveIntegerField(default=0, verbose_name="Productos")
+    
+    class Meta:
+        verbose_name = "Conteo de Valor de Atributo"
+        verbose_name_plural = "Conteos de Valores de Atributos"
+        ordering = ['atributo', '-total', 'valor']
+        indexes = [
+            models.Index(fields=['categoria', 'atributo'], name='conteo_categoria_atributo_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.atributo.nombre}: {self.valor} ({self.total})"
+
+
+class ProductoRelacionado(models.Model):
+    """
+    Vecinos más similares de cada producto, precalculados por productos.similitud.
+    """
+    producto = models.ForeignKey(
+        Producto,
+        on_delete=models.CASCADE,
+        related_name='relacionados',
+        verbose_name="Producto"
+    )
+    relacionado = models.ForeignKey(
+        Producto,
+        on_delete=models.CASCADE,
+        related_name='relacionado_de',
+        verbose_name="Producto Relacionado"
+    )
+    similitud = models.FloatField(verbose_name="Similitud")
+    posicion = models.PositiveSmallIntegerField(default=0, verbose_name="Posición")
+    
+    class Meta:
+        verbose_name = "Producto Relacionado"
+        verbose_name_plural = "Productos Relacionados"
+        ordering = ['producto', 'posicion']
+        unique_together = ['producto', 'relacionado']
+        indexes = [
+            models.Index(fields=['producto', 'posicion'], name='relacionado_producto_pos_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.producto_id} → {self.relacionado_id} ({self.similitud:.3f})"
+
+
 class ConfiguracionHome(models.Model):
     """
     Modelo singleton para configurar la imagen del hero section en la página de inicio.
@@ -462,3 +689,86 @@ class ConfiguracionHome(models.Model):
         obj, _ = cls.objects.get_or_create(pk=1, defaults={'imagen_hero': ''})
         return obj
 
+
+
+class ArchivoPorBorrar(models.Model):
+    """
+    Cola de archivos del almacenamiento pendientes de borrar (imágenes de productos y
+    de galería eliminados, huérfanos encontrados por el barrido). La procesa
+    productos.almacenamiento en segundo plano, por lotes.
+    """
+    nombre = models.CharField(max_length=255, unique=True, verbose_name="Nombre en el almacenamiento")
+    intentos = models.PositiveSmallIntegerField(default=0, verbose_name="Intentos")
+    error = models.TextField(blank=True, verbose_name="Último error")
+    fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de Creación")
+
+    class Meta:
+        verbose_name = "Archivo por Borrar"
+        verbose_name_plural = "Archivos por Borrar"
+        ordering = ['id']
+
+    def __str__(self):
+        return self.nombre
+
+
+class ImagenProcesada(models.Model):
+    """
+    Imágenes ya procesadas y guardadas, por hash de contenido. Una subida idéntica (el
+    mismo archivo original, o uno que produce el mismo JPEG) reutiliza el archivo en
+    lugar de procesarlo y subirlo otra vez (ver productos/deduplicacion.py).
+    """
+    hash_original = models.CharField(max_length=64, verbose_name="SHA-256 del original")
+    estrategia = models.CharField(max_length=30, verbose_name="Estrategia de procesado")
+    hash_procesado = models.CharField(max_length=64, db_index=True, verbose_name="SHA-256 del JPEG")
+    nombre = models.CharField(max_length=255, db_index=True, verbose_name="Nombre en el almacenamiento")
+    bytes = models.PositiveIntegerField(verbose_name="Tamaño (bytes)")
+    reutilizaciones = models.PositiveIntegerField(default=0, verbose_name="Reutilizaciones")
+    marcador = models.CharField(max_length=1000, blank=True, default='', verbose_name="Marcador de la imagen")
+    color = models.CharField(max_length=7, blank=True, default='', verbose_name="Color dominante")
+    fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de Creación")
+
+    class Meta:
+        verbose_name = "Imagen Procesada"
+        verbose_name_plural = "Imágenes Procesadas"
+        unique_together = ['hash_original', 'estrategia']
+
+    def __str__(self):
+        return f"{self.nombre} ({self.hash_procesado[:12]})"
+
+
+class RecalculoPendiente(models.Model):
+    """
+    Cola de datos derivados por recalcular tras un cambio en el panel (por ejemplo, los
+    productos relacionados de un producto editado). La procesa productos.recalculos en
+    segundo plano, por lotes, fuera de la petición.
+    """
+    tipo = models.CharField(max_length=20, verbose_name="Tipo")
+    objeto_id = models.PositiveIntegerField(verbose_name="ID del objeto")
+    fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de Creación")
+
+    class Meta:
+        verbose_name = "Recálculo Pendiente"
+        verbose_name_plural = "Recálculos Pendientes"
+        ordering = ['id']
+        unique_together = ['tipo', 'objeto_id']
+
+    def __str__(self):
+        return f"{self.tipo} #{self.objeto_id}"
+
+
+class VersionDatos(models.Model):
+    """
+    Versión de un conjunto de datos derivados que se guarda en caché (esquema de
+    atributos, árbol de categorías...). La caché es local a cada worker, así que la
+    versión vive en la base de datos: al incrementarla, todos los workers dejan de usar
+    lo que tenían en caché (ver productos/versiones.py).
+    """
+    nombre = models.CharField(max_length=50, primary_key=True, verbose_name="Nombre")
+    version = models.PositiveBigIntegerField(default=0, verbose_name="Versión")
+
+    class Meta:
+        verbose_name = "Versión de Datos"
+        verbose_name_plural = "Versiones de Datos"
+
+    def __str__(self):
+        return f"{self.nombre} v{self.version}"
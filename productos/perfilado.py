@@ -0,0 +1,149 @@
+"""
+Perfilado bajo demanda de peticiones reales, solo para usuarios staff.
+
+Se activa por petición con el parámetro ?_perfil (o la cabecera X-Perfil):
+
+- ?_perfil=1        responde con el informe en texto en lugar de la página;
+- ?_perfil=guardar  responde la página normal y guarda el informe en caché para verlo
+                    en el panel (admin-custom/perfiles/); la cabecera X-Perfil-Id
+                    indica cuál es.
+
+?_perfil_orden=tottime cambia el orden de las funciones (por defecto cumulative).
+
+El informe incluye el perfil de cProfile, cada consulta SQL con su duración (y las
+repetidas, típicas de un N+1) y el pico de memoria asignada según tracemalloc. Para el
+resto del tráfico el coste es mirar un parámetro de la petición.
+"""
+import cProfile
+import io
+import pstats
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.utils import timezone
+
+
+PARAMETRO = '_perfil'
+CABECERA = 'X-Perfil'
+CLAVE_RECIENTES = 'perfiles:recientes'
+ORDENES = {'cumulative', 'tottime', 'calls', 'ncalls', 'time'}
+
+
+def modo_solicitado(request):
+    """'informe', 'guardar' o None si la petición no pide perfilado."""
+    valor = request.GET.get(PARAMETRO) or request.headers.get(CABECERA)
+    if not valor:
+        return None
+    return 'guardar' if valor == 'guardar' else 'informe'
+
+
+class _RegistroSQL:
+    """execute_wrapper que anota cada consulta con su duración."""
+
+    def __init__(self):
+        self.consultas = []
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.consultas.append((sql, (time.perf_counter() - inicio) * 1000))
+
+
+def perfilar(request, get_response):
+    """Ejecuta la petición bajo cProfile, registro de SQL y tracemalloc. Retorna (response, informe)."""
+    registro = _RegistroSQL()
+    envolturas = [c.execute_wrapper(registro) for c in connections.all()]
+    for envoltura in envolturas:
+        envoltura.__enter__()
+
+    tracemalloc_propio = not tracemalloc.is_tracing()
+    if tracemalloc_propio:
+        tracemalloc.start()
+    else:
+        tracemalloc.reset_peak()
+
+    perfil = cProfile.Profile()
+    inicio = time.perf_counter()
+    try:
+        perfil.enable()
+        try:
+            response = get_response(request)
+        finally:
+            perfil.disable()
+    finally:
+        total_ms = (time.perf_counter() - inicio) * 1000
+        pico = tracemalloc.get_traced_memory()[1]
+        if tracemalloc_propio:
+            tracemalloc.stop()
+        for envoltura in reversed(envolturas):
+            envoltura.__exit__(None, None, None)
+
+    orden = request.GET.get(f'{PARAMETRO}_orden', 'cumulative')
+    informe = _informe(request, response, total_ms, pico, registro.consultas, perfil,
+                       orden if orden in ORDENES else 'cumulative')
+    return response, informe
+
+
+def _informe(request, response, total_ms, pico, consultas, perfil, orden):
+    match = getattr(request, 'resolver_match', None)
+    vista = match.view_name if match else '?'
+    tiempo_sql = sum(duracion for _, duracion in consultas)
+
+    lineas = [
+        f'Perfil de {request.method} {request.get_full_path()}',
+        f'Fecha: {timezone.now():%Y-%m-%d %H:%M:%S}  Usuario: {request.user}',
+        f'Vista: {vista}  Estado: {response.status_code}',
+        f'Tiempo total: {total_ms:.1f} ms  (SQL {tiempo_sql:.1f} ms, Python {total_ms - tiempo_sql:.1f} ms)',
+        f'Memoria (tracemalloc): pico {pico / 1024 / 1024:.2f} MB',
+        '',
+        f'=== SQL: {len(consultas)} consultas, {tiempo_sql:.1f} ms ===',
+    ]
+
+    repetidas = [(sql, n) for sql, n in Counter(sql for sql, _ in consultas).most_common() if n > 1]
+    if repetidas:
+        lineas.append('Repetidas (posible N+1):')
+        lineas += [f'  {n}x  {sql[:300]}' for sql, n in repetidas[:10]]
+        lineas.append('')
+
+    lineas.append('Por duración:')
+    for sql, duracion in sorted(consultas, key=lambda c: -c[1])[:settings.PERFILADO_MAX_CONSULTAS]:
+        lineas.append(f'  {duracion:8.2f} ms  {sql[:500]}')
+
+    salida = io.StringIO()
+    pstats.Stats(perfil, stream=salida).strip_dirs().sort_stats(orden).print_stats(settings.PERFILADO_MAX_FUNCIONES)
+    lineas += ['', f'=== cProfile (orden: {orden}) ===', salida.getvalue()]
+    return '\n'.join(lineas)
+
+
+def guardar_informe(request, informe):
+    """Guarda el informe en caché y lo añade a la lista de recientes. Retorna su id."""
+    perfil_id = uuid.uuid4().hex[:12]
+    cache.set(f'perfiles:{perfil_id}', informe, settings.PERFILADO_TTL)
+
+    recientes = cache.get(CLAVE_RECIENTES, [])
+    recientes.insert(0, {
+        'id': perfil_id,
+        'ruta': request.get_full_path(),
+        'usuario': str(request.user),
+        'fecha': timezone.now(),
+    })
+    cache.set(CLAVE_RECIENTES, recientes[:settings.PERFILADO_MAX_GUARDADOS], settings.PERFILADO_TTL)
+    return perfil_id
+
+
+def obtener_informe(perfil_id):
+    return cache.get(f'perfiles:{perfil_id}')
+
+
+def informes_recientes():
+    """Informes guardados aún en caché, del más reciente al más antiguo."""
+    recientes = cache.get(CLAVE_RECIENTES, [])
+    vigentes = cache.get_many([f'perfiles:{r["id"]}' for r in recientes])
+    return [r for r in recientes if f'perfiles:{r["id"]}' in vigentes]
@@ -0,0 +1,90 @@
+"""
+Recálculo en segundo plano de los datos derivados de los productos.
+
+Recalcular los productos relacionados obliga a vectorizar todo el catálogo, y los
+conteos de facetas agrupan los valores de categorías enteras, así que no se hace en la
+petición que guarda el producto. La petición añade el producto y sus categorías a la
+cola RecalculoPendiente en la misma transacción y, al confirmarse, un hilo en segundo
+plano (productos/trabajador.py) la vacía por lotes: una sola vectorización para todos
+los productos pendientes y un recálculo de conteos para todas las categorías.
+"manage.py calcular_relacionados --pendientes" la vacía a mano.
+"""
+import logging
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .facetas import recalcular_conteos
+from .models import RecalculoPendiente
+from .trabajador import Trabajador
+
+
+logger = logging.getLogger('tiendamotos.recalculos')
+
+RELACIONADOS = 'relacionados'
+FACETAS = 'facetas'
+
+
+def marcar(producto_ids=(), categoria_ids=()):
+    """
+    Encola los relacionados de los productos y los conteos de facetas de las categorías;
+    se recalculan al confirmarse la transacción en curso.
+    """
+    pendientes = [(RELACIONADOS, producto_id) for producto_id in set(producto_ids) if producto_id]
+    pendientes += [(FACETAS, categoria_id) for categoria_id in set(categoria_ids) if categoria_id]
+    if not pendientes:
+        return
+    RecalculoPendiente.objects.bulk_create([
+        RecalculoPendiente(tipo=tipo, objeto_id=objeto_id) for tipo, objeto_id in pendientes
+    ], ignore_conflicts=True)
+    transaction.on_commit(_al_confirmar)
+
+
+def procesar_pendientes(tamano_lote=None):
+    """
+    Vacía la cola por lotes. Retorna el número de recálculos hechos. Con más de
+    RELACIONADOS_MAX_INCREMENTAL productos en un lote sale más barato recalcular los
+    relacionados de todo el catálogo.
+    """
+    # Importación diferida: similitud carga numpy, que las vistas públicas no usan
+    from .similitud import recalcular_relacionados, recalcular_relacionados_productos
+
+    tamano_lote = tamano_lote or settings.RECALCULOS_TAMANO_LOTE
+    procesados = 0
+    while True:
+        with transaction.atomic():
+            pendientes = RecalculoPendiente.objects.order_by('id')
+            if connection.features.has_select_for_update_skip_locked:
+                # Varios workers pueden vaciar la cola a la vez sin repetir trabajo
+                pendientes = pendientes.select_for_update(skip_locked=True)
+            lote = list(pendientes[:tamano_lote])
+            if not lote:
+                break
+            # Se sacan de la cola antes de leer el catálogo: un cambio que llegue mientras se
+            # recalcula vuelve a encolarse. Si el recálculo falla, se deshace todo
+            RecalculoPendiente.objects.filter(id__in=[pendiente.id for pendiente in lote]).delete()
+            producto_ids = [p.objeto_id for p in lote if p.tipo == RELACIONADOS]
+            categoria_ids = [p.objeto_id for p in lote if p.tipo == FACETAS]
+            if categoria_ids:
+                recalcular_conteos(categoria_ids)
+            if len(producto_ids) > settings.RELACIONADOS_MAX_INCREMENTAL:
+                recalcular_relacionados()
+            elif producto_ids:
+                recalcular_relacionados_productos(producto_ids)
+        procesados += len(lote)
+    return procesados
+
+
+def _tarea():
+    procesar_pendientes()
+    return False
+
+
+_trabajador = Trabajador('recalculos', _tarea, 'RECALCULOS_REINTENTO_SEGUNDOS', logger)
+
+
+def _al_confirmar():
+    if settings.RECALCULOS_EN_SEGUNDO_PLANO:
+        _trabajador.despertar()
+    else:
+        procesar_pendientes()
@@ -0,0 +1,269 @@
+"""
+Reprocesado de las imágenes ya guardadas con la estrategia actual.
+
+Al cambiar IMAGEN_ESTRATEGIA (calidad, JPEG progresivo, etc.) las imágenes existentes
+se quedan como se procesaron. El reproceso recorre los archivos distintos que usan
+Producto.imagen_principal e ImagenProducto.imagen, por orden de nombre y en páginas (sin
+cargar la lista entera):
+
+- Los procesa en un ProcessPoolExecutor: cada proceso abre el archivo del almacenamiento,
+  lo procesa y calcula su marcador.
+- Sube los resultados con un pool de hilos acotado (subir es E/S), cada uno con nombre
+  nuevo, y en una transacción por página apunta los registros al archivo nuevo y
+  encola el anterior en la cola de borrado (productos/almacenamiento.py).
+- Tras cada página guarda un punto de control en un archivo JSON: si se interrumpe,
+  la siguiente ejecución sigue desde el último archivo confirmado.
+
+El original subido no se conserva: se reprocesa el archivo guardado (ya de 800x600), así
+que conviene hacerlo al cambiar de estrategia, no repetirlo sin motivo.
+"""
+import json
+import os
+import time
+from datetime import datetime
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from multiprocessing import get_context
+
+import django
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.db.models import Case, Value, When
+from django.utils import timezone
+
+from . import almacenamiento
+from .deduplicacion import hash_contenido
+from .imagenes import obtener_estrategia, procesar_imagen
+from .marcadores import CAMPOS, calcular_marcador
+from .models import ImagenProcesada
+
+
+def _reprocesar(argumentos):
+    """
+    Se ejecuta en el pool: procesa un archivo guardado. Retorna (nombre, None, resultado)
+    con resultado = {jpeg, hash del original, hash del jpeg, bytes del original, marcador,
+    color} o (nombre, error, None).
+    """
+    nombre, estrategia = argumentos
+    try:
+        with default_storage.open(nombre) as archivo:
+            original = archivo.read()
+        contenido = procesar_imagen(BytesIO(original), estrategia)
+        marcador, color = calcular_marcador(BytesIO(contenido))
+    except Exception as e:
+        return nombre, str(e), None
+    return nombre, None, {
+        'contenido': contenido, 'hash_original': hash_contenido(original),
+        'hash_procesado': hash_contenido(contenido), 'bytes_antes': len(original),
+        'marcador': marcador, 'color': color,
+    }
+
+
+def _inicializar_proceso():
+    # Con el método "spawn" el proceso hijo arranca sin Django configurado
+    django.setup()
+
+
+def _nombres_desde(ultimo, cantidad):
+    """Los `cantidad` primeros nombres de archivo en uso mayores que `ultimo`, sin repetir."""
+    nombres = set()
+    for modelo, campo, _, _ in CAMPOS:
+        consulta = modelo.objects.exclude(**{f'{campo}__isnull': True}).exclude(**{campo: ''})
+        if ultimo:
+            consulta = consulta.filter(**{f'{campo}__gt': ultimo})
+        nombres.update(consulta.order_by(campo).values_list(campo, flat=True).distinct()[:cantidad])
+    return sorted(nombres)[:cantidad]
+
+
+def total_archivos():
+    """Número de archivos distintos en uso (una consulta)."""
+    consultas = [
+        modelo.objects.exclude(**{f'{campo}__isnull': True}).exclude(**{campo: ''}).order_by().values_list(campo)
+        for modelo, campo, _, _ in CAMPOS
+    ]
+    return consultas[0].union(*consultas[1:]).count()
+
+
+class Reproceso:
+    """
+    Reprocesa las imágenes guardadas que no estén ya procesadas con la estrategia,
+    retomando desde `archivo_estado`. Uso:
+
+        estado = Reproceso(procesos=4, hilos=8).ejecutar()
+
+    Un archivo está hecho si tiene una ImagenProcesada de la estrategia: así se saltan
+    los subidos después del cambio y los que ya renombró esta misma ejecución.
+    `progreso`, si se indica, se llama con el estado tras cada página.
+    """
+
+    def __init__(self, estrategia=None, procesos=None, hilos=8, tamano_pagina=100,
+                 archivo_estado=None, reiniciar=False, limite=None, progreso=None):
+        self.estrategia = estrategia or settings.IMAGEN_ESTRATEGIA
+        obtener_estrategia(self.estrategia)
+        self.procesos = max(procesos or settings.IMPORTACION_PROCESOS, 1)
+        self.hilos = max(hilos, 1)
+        self.tamano_pagina = max(tamano_pagina, 1)
+        self.archivo_estado = str(archivo_estado or settings.REPROCESO_ARCHIVO_ESTADO)
+        self.limite = limite
+        self.progreso = progreso
+        self.estado = None if reiniciar else self._leer_estado()
+        self.retomado = self.estado is not None
+        if self.estado is None:
+            self.estado = {
+                'estrategia': self.estrategia, 'inicio': timezone.now().isoformat(),
+                'ultimo': '', 'total': total_archivos(),
+                'revisadas': 0, 'procesadas': 0, 'omitidas': 0, 'sin_cambios': 0, 'errores': {},
+                'bytes_antes': 0, 'bytes_despues': 0, 'segundos': 0.0, 'terminado': False,
+            }
+
+    def _leer_estado(self):
+        try:
+            with open(self.archivo_estado) as archivo:
+                estado = json.load(archivo)
+        except (FileNotFoundError, ValueError):
+            return None
+        # Un punto de control de otra estrategia no vale: se empieza de cero
+        return estado if estado.get('estrategia') == self.estrategia else None
+
+    def _guardar_estado(self):
+        temporal = f'{self.archivo_estado}.tmp'
+        with open(temporal, 'w') as archivo:
+            json.dump(self.estado, archivo, indent=2)
+        # Reemplazo atómico: una interrupción nunca deja el punto de control a medias
+        os.replace(temporal, self.archivo_estado)
+
+    def ejecutar(self):
+        if self.estado['terminado']:
+            return self.estado
+
+        procesos = None
+        if self.procesos > 1:
+            # Los procesos hijos no deben heredar las conexiones abiertas del padre
+            connections.close_all()
+            procesos = ProcessPoolExecutor(
+                self.procesos, mp_context=get_context(), initializer=_inicializar_proceso
+            )
+            # Se arrancan ya: con "fork" heredarían las conexiones que se abran después
+            procesos.submit(int).result()
+        hilos = ThreadPoolExecutor(max_workers=self.hilos)
+        revisadas = 0
+        try:
+            while self.limite is None or revisadas < self.limite:
+                cantidad = self.tamano_pagina if self.limite is None else min(self.tamano_pagina, self.limite - revisadas)
+                pagina = _nombres_desde(self.estado['ultimo'], cantidad)
+                if not pagina:
+                    self.estado['terminado'] = True
+                    break
+                inicio = time.perf_counter()
+                self._pagina(pagina, procesos, hilos)
+                revisadas += len(pagina)
+                self.estado['ultimo'] = pagina[-1]
+                self.estado['segundos'] += time.perf_counter() - inicio
+                self._guardar_estado()
+                if self.progreso:
+                    self.progreso(self.estado)
+        finally:
+            hilos.shutdown()
+            if procesos is not None:
+                procesos.shutdown()
+        self._guardar_estado()
+        return self.estado
+
+    def _pagina(self, pagina, procesos, hilos):
+        hechas = dict(ImagenProcesada.objects.filter(
+            nombre__in=pagina, estrategia=self.estrategia
+        ).values_list('nombre', 'fecha_creacion'))
+        # Los registrados desde el inicio son archivos nuevos de este reproceso (o subidos
+        # durante él): no cuentan como revisados
+        inicio = datetime.fromisoformat(self.estado['inicio'])
+        nuevas = sum(1 for fecha in hechas.values() if fecha >= inicio)
+        self.estado['omitidas'] += len(hechas) - nuevas
+        self.estado['revisadas'] += len(pagina) - nuevas
+        argumentos = [(nombre, self.estrategia) for nombre in pagina if nombre not in hechas]
+
+        if procesos is not None:
+            resultados = (futuro.result() for futuro in as_completed(
+                [procesos.submit(_reprocesar, a) for a in argumentos]
+            ))
+        else:
+            resultados = map(_reprocesar, argumentos)
+
+        # Cada imagen se sube en cuanto está procesada, mientras los procesos siguen
+        subidas = {}
+        sin_cambios = {}
+        for nombre, error, resultado in resultados:
+            if error:
+                self.estado['errores'][nombre] = error
+            elif resultado['hash_procesado'] == resultado['hash_original']:
+                sin_cambios[nombre] = resultado
+            else:
+                subidas[hilos.submit(self._subir, nombre, resultado['contenido'])] = (nombre, resultado)
+
+        cambios = {}
+        for futuro in as_completed(subidas):
+            nombre, resultado = subidas[futuro]
+            try:
+                resultado['nombre'] = futuro.result()
+            except Exception as e:
+                self.estado['errores'][nombre] = str(e)
+            else:
+                cambios[nombre] = resultado
+        self._aplicar(cambios, sin_cambios)
+
+    def _subir(self, nombre, contenido):
+        base = os.path.splitext(nombre)[0]
+        return default_storage.save(f'{base}.jpg', ContentFile(contenido))
+
+    def _aplicar(self, cambios, sin_cambios):
+        """
+        Apunta los registros a los archivos nuevos, encola los anteriores para borrarlos y
+        marca todos como procesados con la estrategia.
+        """
+        anteriores = list(cambios)
+        for nombre, resultado in sin_cambios.items():
+            resultado['nombre'] = nombre
+        try:
+            with transaction.atomic():
+                if cambios:
+                    for modelo, campo, campo_marcador, campo_color in CAMPOS:
+                        modelo.objects.filter(**{f'{campo}__in': anteriores}).update(**{
+                            campo: _segun(campo, cambios, 'nombre'),
+                            campo_marcador: _segun(campo, cambios, 'marcador'),
+                            campo_color: _segun(campo, cambios, 'color'),
+                        })
+                    # Los registros de deduplicación de otras estrategias pasan al archivo nuevo
+                    ImagenProcesada.objects.filter(nombre__in=anteriores).update(
+                        **{clave: _segun('nombre', cambios, clave)
+                           for clave in ('nombre', 'hash_procesado', 'marcador', 'color')}
+                    )
+                    almacenamiento.encolar(anteriores)
+
+                ImagenProcesada.objects.bulk_create([
+                    ImagenProcesada(
+                        hash_original=resultado['hash_original'], estrategia=self.estrategia,
+                        hash_procesado=resultado['hash_procesado'], nombre=resultado['nombre'],
+                        bytes=len(resultado['contenido']), marcador=resultado['marcador'],
+                        color=resultado['color'],
+                    )
+                    for resultado in [*cambios.values(), *sin_cambios.values()]
+                ], ignore_conflicts=True)
+        except Exception as e:
+            # Los archivos nuevos sin registro los recupera el barrido de huérfanos
+            for anterior in [*cambios, *sin_cambios]:
+                self.estado['errores'][anterior] = f'no se actualizaron los registros: {e}'
+            return
+
+        self.estado['procesadas'] += len(cambios)
+        self.estado['sin_cambios'] += len(sin_cambios)
+        self.estado['bytes_antes'] += sum(r['bytes_antes'] for r in cambios.values())
+        self.estado['bytes_despues'] += sum(len(r['contenido']) for r in cambios.values())
+
+
+def _segun(campo, cambios, clave):
+    """Expresión con el valor `clave` del cambio que corresponde al nombre actual de `campo`."""
+    return Case(*[
+        When(**{campo: anterior}, then=Value(resultado[clave]))
+        for anterior, resultado in cambios.items()
+    ])
@@ -0,0 +1,211 @@
+"""
+Cálculo de productos relacionados por similitud de atributos y precio.
+
+Cada producto activo se representa como un vector (categoría, colores, precio y
+valores numéricos de sus atributos dinámicos). Los vecinos más cercanos por
+similitud coseno se guardan en ProductoRelacionado, de modo que la vista de
+detalle los obtiene con una sola consulta indexada.
+"""
+import math
+from collections import defaultdict
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min
+
+from .models import Producto, ValorProducto, ProductoRelacionado
+
+
+# Peso de cada bloque del vector antes de normalizar
+PESO_CATEGORIA = 2.0
+PESO_COLORES = 0.5
+PESO_PRECIO = 1.5
+PESO_ATRIBUTOS = 1.0
+
+def _codificar_escalar(valores, presentes):
+    """
+    Codifica una magnitud normalizada en [0, 1] como un ángulo en el primer cuadrante.
+    El producto escalar de dos codificaciones es cos(Δángulo): valores cercanos dan
+    similitud alta. Las filas sin valor quedan en cero y no aportan.
+    """
+    bloque = np.zeros((len(valores), 2))
+    if not presentes.any():
+        return bloque
+    minimo = valores[presentes].min()
+    rango = valores[presentes].max() - minimo
+    normalizados = (valores - minimo) / rango if rango > 0 else np.zeros_like(valores)
+    angulos = normalizados * (math.pi / 2)
+    bloque[presentes, 0] = np.cos(angulos[presentes])
+    bloque[presentes, 1] = np.sin(angulos[presentes])
+    return bloque
+
+
+def vectorizar_productos():
+    """
+    Construye la matriz de características de todos los productos activos.
+    Retorna (ids, matriz) con filas normalizadas (norma L2 = 1).
+    """
+    productos = list(
+        Producto.objects.filter(es_activo=True)
+        .order_by('id')
+        .values_list('id', 'categoria_id', 'precio_normalizado')
+    )
+    ids = np.array([p[0] for p in productos], dtype=np.int64)
+    if not len(ids):
+        return ids, np.zeros((0, 0))
+    fila = {pid: i for i, pid in enumerate(ids.tolist())}
+
+    # Categoría (one-hot)
+    categorias = sorted({p[1] for p in productos})
+    col_categoria = {cid: j for j, cid in enumerate(categorias)}
+    bloque_categoria = np.zeros((len(ids), len(categorias)))
+    for i, p in enumerate(productos):
+        bloque_categoria[i, col_categoria[p[1]]] = 1.0
+
+    # Colores (multi-hot normalizado por producto)
+    colores = Producto.colores.through.objects.filter(
+        producto__es_activo=True, color__es_activo=True
+    ).values_list('producto_id', 'color_id')
+    pares_colores = [(fila[pid], cid) for pid, cid in colores if pid in fila]
+    ids_colores = sorted({cid for _, cid in pares_colores})
+    col_color = {cid: j for j, cid in enumerate(ids_colores)}
+    bloque_colores = np.zeros((len(ids), len(ids_colores)))
+    for i, cid in pares_colores:
+        bloque_colores[i, col_color[cid]] = 1.0
+    normas = np.linalg.norm(bloque_colores, axis=1, keepdims=True)
+    np.divide(bloque_colores, normas, out=bloque_colores, where=normas > 0)
+
+    # Precio en USD (escala logarítmica para que la diferencia sea relativa)
+    precios = np.log1p(np.array([float(p[2] or 0) for p in productos]))
+    bloque_precio = _codificar_escalar(precios, np.ones(len(ids), dtype=bool))
+
+    # Atributos dinámicos numéricos
+    valores_por_atributo = defaultdict(dict)
+    for pid, atributo_id, numero in ValorProducto.objects.filter(
+        producto__es_activo=True, valor_numerico__isnull=False
+    ).values_list('producto_id', 'atributo_id', 'valor_numerico').iterator(chunk_size=2000):
+        if pid in fila:
+            valores_por_atributo[atributo_id][fila[pid]] = numero
+
+    bloques_atributos = []
+    for atributo_id in sorted(valores_por_atributo):
+        valores = np.zeros(len(ids))
+        presentes = np.zeros(len(ids), dtype=bool)
+        for i, numero in valores_por_atributo[atributo_id].items():
+            valores[i] = numero
+            presentes[i] = True
+        bloques_atributos.append(_codificar_escalar(valores, presentes))
+    if bloques_atributos:
+        bloque_atributos = np.hstack(bloques_atributos) / math.sqrt(len(bloques_atributos))
+    else:
+        bloque_atributos = np.zeros((len(ids), 0))
+
+    matriz = np.hstack([
+        bloque_categoria * PESO_CATEGORIA,
+        bloque_colores * PESO_COLORES,
+        bloque_precio * PESO_PRECIO,
+        bloque_atributos * PESO_ATRIBUTOS,
+    ])
+    normas = np.linalg.norm(matriz, axis=1, keepdims=True)
+    np.divide(matriz, normas, out=matriz, where=normas > 0)
+    return ids, matriz
+
+
+def _top_k(ids, matriz, filas, k):
+    """Retorna {producto_id: [(relacionado_id, similitud), ...]} para las filas indicadas."""
+    k = min(k, len(ids) - 1)
+    if k <= 0:
+        return {int(ids[i]): [] for i in filas}
+
+    resultado = {}
+    similitudes = matriz[filas] @ matriz.T
+    similitudes[np.arange(len(filas)), filas] = -np.inf  # excluir el propio producto
+    candidatos = np.argpartition(-similitudes, k - 1, axis=1)[:, :k]
+    for n, i in enumerate(filas):
+        orden = candidatos[n][np.argsort(-similitudes[n, candidatos[n]], kind='stable')]
+        resultado[int(ids[i])] = [(int(ids[j]), float(similitudes[n, j])) for j in orden]
+    return resultado
+
+
+def _guardar_vecinos(vecinos):
+    """Reemplaza en bloque los vecinos guardados de los productos indicados."""
+    with transaction.atomic():
+        ProductoRelacionado.objects.filter(producto_id__in=list(vecinos)).delete()
+        ProductoRelacionado.objects.bulk_create([
+            ProductoRelacionado(
+                producto_id=producto_id,
+                relacionado_id=relacionado_id,
+                similitud=similitud,
+                posicion=posicion,
+            )
+            for producto_id, lista in vecinos.items()
+            for posicion, (relacionado_id, similitud) in enumerate(lista)
+        ], batch_size=1000)
+
+
+def recalcular_relacionados(k=None, tamano_lote=500):
+    """
+    Recalcula los vecinos de todos los productos activos, por lotes de filas para
+    acotar la memoria de la matriz de similitud. Retorna el número de productos procesados.
+    """
+    k = k or settings.PRODUCTOS_RELACIONADOS_K
+    ids, matriz = vectorizar_productos()
+
+    with transaction.atomic():
+        # Los eliminados ya se borran en cascada; quedan los desactivados
+        ProductoRelacionado.objects.filter(producto__es_activo=False).delete()
+        for inicio in range(0, len(ids), tamano_lote):
+            filas = np.arange(inicio, min(inicio + tamano_lote, len(ids)))
+            _guardar_vecinos(_top_k(ids, matriz, filas, k))
+    return len(ids)
+
+
+def recalcular_relacionados_productos(producto_ids, k=None, tamano_lote=500):
+    """
+    Recalcula de forma incremental tras crear, editar, activar/desactivar o eliminar
+    productos (los de la cola de productos.recalculos, en segundo plano).
+
+    Solo se actualizan los propios productos, los que tenían alguno como vecino y aquellos
+    para los que alguno supera ahora en similitud a su vecino más lejano. La matriz se
+    construye una vez para todos los productos indicados.
+
+    Es exacto mientras no cambien los rangos de precio o de atributos del catálogo (se
+    normalizan con el mínimo y el máximo); calcular_relacionados lo corrige por completo.
+    """
+    k = k or settings.PRODUCTOS_RELACIONADOS_K
+    producto_ids = set(producto_ids)
+    apuntan_a_productos = set(
+        ProductoRelacionado.objects.filter(relacionado_id__in=producto_ids)
+        .values_list('producto_id', flat=True)
+    )
+    ids, matriz = vectorizar_productos()
+    fila = {pid: i for i, pid in enumerate(ids.tolist())}
+
+    # Vecino más lejano de cada producto con la lista completa; los que tienen huecos
+    # (p. ej. porque se eliminó uno de sus vecinos) se recalculan siempre
+    umbral = {
+        vecinos['producto_id']: vecinos['minimo']
+        for vecinos in ProductoRelacionado.objects.values('producto_id').annotate(
+            total=Count('id'), minimo=Min('similitud')
+        ).filter(total__gte=min(k, len(ids) - 1))
+    }
+    minimos = np.array([umbral.get(pid, -np.inf) for pid in ids.tolist()])
+
+    afectados = {fila[pid] for pid in apuntan_a_productos if pid in fila}
+    cambiados = np.array(sorted(fila[pid] for pid in producto_ids if pid in fila), dtype=np.int64)
+    afectados.update(cambiados.tolist())
+    if len(cambiados) < len(producto_ids):
+        # Algún producto ya no está activo: los que quedaron con huecos
+        afectados.update(np.nonzero(np.isneginf(minimos))[0].tolist())
+    for inicio in range(0, len(cambiados), tamano_lote):
+        # Aquellos para los que algún cambiado es ahora más similar que su vecino más lejano
+        similitudes = matriz[cambiados[inicio:inicio + tamano_lote]] @ matriz.T
+        afectados.update(np.nonzero((similitudes > minimos).any(axis=0))[0].tolist())
+
+    with transaction.atomic():
+        ProductoRelacionado.objects.filter(producto_id__in=list(producto_ids - set(fila))).delete()
+        afectados = np.array(sorted(afectados), dtype=np.int64)
+        for inicio in range(0, len(afectados), tamano_lote):
+            _guardar_vecinos(_top_k(ids, matriz, afectados[inicio:inicio + tamano_lote], k))
+    return len(afectados)
@@ -0,0 +1,21 @@
+from django import template
+from django.urls import reverse
+
+from productos.miniaturas import firmar, url_cloudinary
+
+register = template.Library()
+
+@register.simple_tag
+def miniatura(imagen, ancho, alto, formato='webp'):
+    """
+    URL firmada de una miniatura de ancho x alto como máximo (o la transformación de
+    Cloudinary si el archivo subido está allí).
+    Uso: {% miniatura producto.imagen_principal 400 300 %} o
+         {% miniatura 'static:images/hero.webp' 400 300 'jpeg' %}
+    """
+    if not imagen:
+        return ''
+    url = url_cloudinary(imagen, ancho, alto, formato)
+    if url:
+        return url
+    return reverse('productos:miniatura', args=[firmar(imagen, ancho, alto, formato)])
@@ -0,0 +1,56 @@
+"""
+Hilo en segundo plano, uno por proceso, que ejecuta una tarea cuando se le despierta.
+
+Lo usan las colas que se llenan en las peticiones y se vacían fuera de ellas (el borrado
+del almacenamiento y los recálculos de datos derivados): la petición solo inserta filas
+en la cola y despierta al hilo al confirmar la transacción.
+"""
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.db import connections
+
+
+class Trabajador:
+    """
+    `tarea()` vacía la cola y retorna True si algo falló; en ese caso se vuelve a
+    intentar pasados los segundos del ajuste `ajuste_reintento` aunque nadie despierte
+    al hilo.
+    """
+
+    def __init__(self, nombre, tarea, ajuste_reintento, logger):
+        self.nombre = nombre
+        self.tarea = tarea
+        self.ajuste_reintento = ajuste_reintento
+        self.logger = logger
+        self.cerrojo = threading.Lock()
+        self.evento = threading.Event()
+        self.hilo = None
+        self.pid = None
+
+    def despertar(self):
+        with self.cerrojo:
+            # Tras un fork (workers de gunicorn) el hilo del proceso padre no existe
+            if self.hilo is None or not self.hilo.is_alive() or self.pid != os.getpid():
+                self.pid = os.getpid()
+                self.evento = threading.Event()
+                self.hilo = threading.Thread(target=self._bucle, name=self.nombre, daemon=True)
+                self.hilo.start()
+        self.evento.set()
+
+    def _bucle(self):
+        espera = None
+        while True:
+            self.evento.wait(espera)
+            self.evento.clear()
+            try:
+                fallos = self.tarea()
+                espera = getattr(settings, self.ajuste_reintento) if fallos else None
+            except Exception:
+                self.logger.exception('Error en el hilo %s', self.nombre)
+                espera = getattr(settings, self.ajuste_reintento)
+            finally:
+                # Las conexiones de este hilo no las cierra el ciclo de peticiones
+                connections.close_all()
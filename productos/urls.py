@@ -7,6 +7,8 @@ urlpatterns = [
     path('', views.lista, name='lista'),
     path('<int:producto_id>/', views.detalle, name='detalle'),
     path('buscar/', views.buscar_productos, name='buscar'),
+    path('categorias/arbol/', views.categorias_arbol, name='categorias_arbol'),
+    path('miniatura/<str:token>/', views.miniatura, name='miniatura'),
     
     # Auth URLs
     path('admin-custom/login/', views.admin_login, name='admin_login'),
@@ -18,6 +20,9 @@ urlpatterns = [
     # Productos
     path('admin-custom/productos/', views.admin_productos_lista, name='admin_productos_lista'),
     path('admin-custom/productos/crear/', views.admin_producto_crear, name='admin_producto_crear'),
+    path('admin-custom/productos/importar/', views.admin_productos_importar, name='admin_productos_importar'),
+    path('admin-custom/productos/exportar/', views.admin_productos_exportar, name='admin_productos_exportar'),
+    path('admin-custom/productos/accion-masiva/', views.admin_productos_accion_masiva, name='admin_productos_accion_masiva'),
     path('admin-custom/productos/<int:producto_id>/editar/', views.admin_producto_editar, name='admin_producto_editar'),
     path('admin-custom/productos/<int:producto_id>/toggle/', views.admin_producto_toggle_estado, name='admin_producto_toggle'),
     path('admin-custom/productos/<int:producto_id>/eliminar/', views.admin_producto_eliminar, name='admin_producto_eliminar'),
@@ -48,6 +53,10 @@ urlpatterns = [
     path('admin-custom/colores/<int:color_id>/editar/', views.admin_color_editar, name='admin_color_editar'),
     path('admin-custom/colores/<int:color_id>/eliminar/', views.admin_color_eliminar, name='admin_color_eliminar'),
 
+    # Perfiles de peticiones guardados (?_perfil=guardar)
+    path('admin-custom/perfiles/', views.admin_perfiles, name='admin_perfiles'),
+    path('admin-custom/perfiles/<str:perfil_id>/', views.admin_perfil, name='admin_perfil'),
+
     # Configuración Home
     path('admin-custom/hero/', views.admin_hero_config, name='admin_hero_config'),
 ]
\ No newline at end of file
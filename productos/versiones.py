@@ -0,0 +1,23 @@
+"""
+Versiones en base de datos para invalidar cachés locales en todos los workers.
+
+La caché por defecto es local a cada proceso: borrar una clave al guardar solo la
+invalida en el worker que atendió el cambio. En su lugar, cada conjunto de datos
+cacheado tiene una fila en VersionDatos que se incrementa al cambiar y forma parte de
+la clave de caché. Leer la versión es una consulta por clave primaria; con ella cada
+worker ve el cambio en cuanto se confirma la transacción, sin esperar al TTL.
+"""
+from django.db.models import F
+
+from .models import VersionDatos
+
+
+def version(nombre):
+    """Versión actual de los datos (0 si nunca han cambiado)."""
+    return VersionDatos.objects.filter(nombre=nombre).values_list('version', flat=True).first() or 0
+
+
+def incrementar(nombre):
+    """Invalida en todos los workers lo cacheado con la versión actual."""
+    if not VersionDatos.objects.filter(nombre=nombre).update(version=F('version') + 1):
+        VersionDatos.objects.bulk_create([VersionDatos(nombre=nombre, version=1)], ignore_conflicts=True)
@@ -1,6 +1,6 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from django.db.models import Q, Max
-from django.http import JsonResponse
+from django.db.models import Q, Max, F, Exists, OuterRef
+from django.http import JsonResponse, HttpResponse, Http404, StreamingHttpResponse, FileResponse
 from django.views.decorators.http import require_POST
 from django.contrib.admin.views.decorators import staff_member_required
 from django.core.paginator import Paginator
@@ -8,8 +8,68 @@ from django.urls import reverse
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from .models import Producto, Categoria, ImagenProducto, AtributoDinamico, ValorProducto, Color, ConfiguracionHome
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.core import signing
+from .models import Producto, Categoria, ImagenProducto, AtributoDinamico, ValorProducto, Color, ConfiguracionHome, ProductoRelacionado
+from . import recalculos
+from .atributos import recalcular_valores_numericos
+from .facetas import facetas_para_categoria, rangos_atributos
+from .esquema_atributos import obtener_esquema
+from .categorias import arbol_categorias, categorias_planas
+from .perfilado import informes_recientes, obtener_informe
+from .importacion import Importacion, OrigenImagenes, leer_hoja
+from .exportacion import FORMATOS, Exportacion, filtrar_productos
+from .acciones_masivas import ACCIONES, ejecutar_accion
+from .deduplicacion import estadisticas as estadisticas_imagenes, guardar_galeria
+from .miniaturas import obtener_miniatura
 import json
+import math
+import re
+import tempfile
+
+_FILTRO_ATRIBUTO_RE = re.compile(r'^atributo_(\d+)(?:_(min|max))?$')
+
+
+def _programar_recalculos(producto_id, categoria_ids):
+    """
+    Encola el recálculo de los datos derivados de un producto (relacionados y conteos
+    de facetas de sus categorías); lo hace un hilo en segundo plano al confirmarse la
+    transacción (productos/recalculos.py).
+    """
+    recalculos.marcar([producto_id], categoria_ids)
+
+
+def _filtros_atributos(params):
+    """
+    Agrupa por atributo los filtros atributo_<id> (igualdad, admite varios valores),
+    atributo_<id>_min y atributo_<id>_max presentes en la query string.
+    """
+    filtros = {}
+    for clave in params:
+        match = _FILTRO_ATRIBUTO_RE.match(clave)
+        if not match:
+            continue
+        condiciones = filtros.setdefault(int(match.group(1)), {})
+        if match.group(2):
+            valor = params.get(clave, '').strip()
+            if valor:
+                condiciones[match.group(2)] = valor
+        else:
+            valores = [v.strip() for v in params.getlist(clave) if v.strip()]
+            if valores:
+                condiciones['igual'] = valores
+    return {atributo_id: condiciones for atributo_id, condiciones in filtros.items() if condiciones}
+
+
+def _numero_finito(texto):
+    """float() que rechaza "nan" e "inf" (ValueError), que no sirven como límites de un filtro."""
+    numero = float(texto)
+    if not math.isfinite(numero):
+        raise ValueError(f'Número no válido: {texto}')
+    return numero
+
 
 def lista(request):
     """
@@ -17,13 +77,15 @@ def lista(request):
     """
     productos = Producto.objects.filter(es_activo=True).select_related('categoria').prefetch_related('valores_atributos', 'colores')
     
-    # Obtener todas las categorías y colores para el sidebar
-    categorias = Categoria.objects.all().prefetch_related('productos')
-    colores_disponibles = Color.objects.filter(es_activo=True, productos__es_activo=True).distinct().order_by('orden')
+    # Obtener todas las categorías (árbol en caché) y colores para el sidebar
+    categorias = categorias_planas()
+    colores_disponibles = Color.objects.filter(es_activo=True).filter(
+        Exists(Producto.colores.through.objects.filter(color_id=OuterRef('pk'), producto__es_activo=True))
+    ).order_by('orden')
     
-    # Obtener precio máximo para el slider
+    # Obtener precio máximo (normalizado a USD) para el slider
     precio_max_db = Producto.objects.filter(es_activo=True).aggregate(
-        max_precio=Max('precio_venta')
+        max_precio=Max('precio_normalizado')
     )['max_precio'] or 10000
     
     # Filtro de búsqueda por nombre o descripción
@@ -35,15 +97,15 @@ def lista(request):
             Q(sku__icontains=query)
         )
     
-    # Filtro por categoría
+    # Filtro por categoría (incluye los productos de sus subcategorías)
     categoria_id = request.GET.get('categoria')
     categoria_seleccionada = None
     if categoria_id:
-        productos = productos.filter(categoria_id=categoria_id)
         try:
             categoria_seleccionada = Categoria.objects.get(id=categoria_id)
+            productos = productos.filter(categoria__ruta__startswith=categoria_seleccionada.ruta)
         except Categoria.DoesNotExist:
-            pass
+            productos = productos.none()
     
     # Filtro por colores (múltiple)
     colores_ids = request.GET.getlist('color')
@@ -52,22 +114,53 @@ def lista(request):
         productos = productos.filter(colores__id__in=colores_ids).distinct()
         colores_seleccionados = Color.objects.filter(id__in=colores_ids)
     
-    # Filtro por rango de precio
+    # Filtro por rango de precio (en USD, sobre el precio normalizado)
     precio_min = request.GET.get('precio_min')
     precio_max = request.GET.get('precio_max')
     
     if precio_min:
         try:
-            productos = productos.filter(precio_venta__gte=float(precio_min))
+            productos = productos.filter(precio_normalizado__gte=_numero_finito(precio_min))
         except ValueError:
             pass
     
     if precio_max:
         try:
-            productos = productos.filter(precio_venta__lte=float(precio_max))
+            productos = productos.filter(precio_normalizado__lte=_numero_finito(precio_max))
         except ValueError:
             pass
     
+    # Filtros por atributos dinámicos (usan el índice atributo + valor_numerico)
+    filtros_atributos = _filtros_atributos(request.GET)
+    for atributo_id, condiciones in filtros_atributos.items():
+        valores = ValorProducto.objects.filter(atributo_id=atributo_id)
+        try:
+            if 'min' in condiciones:
+                valores = valores.filter(valor_numerico__gte=_numero_finito(condiciones['min']))
+            if 'max' in condiciones:
+                valores = valores.filter(valor_numerico__lte=_numero_finito(condiciones['max']))
+        except ValueError:
+            continue
+        if 'igual' in condiciones:
+            coincidencias = Q()
+            for valor in condiciones['igual']:
+                try:
+                    coincidencias |= Q(valor_numerico=_numero_finito(valor))
+                except ValueError:
+                    coincidencias |= Q(valor=valor)
+            valores = valores.filter(coincidencias)
+        productos = productos.filter(id__in=valores.values('producto_id'))
+    
+    # Rangos disponibles de los atributos numéricos para el sidebar
+    atributos_rango = [
+        {
+            **rango,
+            'min_actual': filtros_atributos.get(rango['atributo_id'], {}).get('min', ''),
+            'max_actual': filtros_atributos.get(rango['atributo_id'], {}).get('max', ''),
+        }
+        for rango in rangos_atributos()
+    ]
+    
     # Filtro por disponibilidad en stock
     en_stock = request.GET.get('en_stock')
     if en_stock:
@@ -76,13 +169,13 @@ def lista(request):
     # Ordenamiento
     ordenar = request.GET.get('ordenar', '')
     if ordenar == 'precio_asc':
-        productos = productos.order_by('precio_venta')
+        productos = productos.order_by('precio_normalizado')
     elif ordenar == 'precio_desc':
-        productos = productos.order_by('-precio_venta')
+        productos = productos.order_by('-precio_normalizado')
     elif ordenar == 'nombre':
         productos = productos.order_by('nombre')
     elif ordenar == 'popular':
-        productos = productos.order_by('-vistas', '-fecha_creacion')
+        productos = productos.order_by('-puntuacion_tendencia', '-fecha_creacion')
     elif ordenar == 'mas_vendido':
         productos = productos.order_by('-ventas', '-fecha_creacion')
     else:
@@ -95,10 +188,32 @@ def lista(request):
         'categoria_seleccionada': categoria_seleccionada,
         'colores_seleccionados': colores_seleccionados,
         'precio_max_db': precio_max_db,
+        'atributos_rango': atributos_rango,
+        'facetas': facetas_para_categoria(
+            categoria_seleccionada.id if categoria_seleccionada else None,
+            {atributo_id: set(c.get('igual', [])) for atributo_id, c in filtros_atributos.items()}
+        ),
     }
     return render(request, 'productos/lista.html', context)
 
 
+def categorias_arbol(request):
+    """Árbol de categorías con conteo de productos activos (JSON, en caché)"""
+    return JsonResponse({'categorias': arbol_categorias()})
+
+
+def miniatura(request, token):
+    """Miniatura firmada ({% miniatura %}), generada la primera vez y servida desde disco."""
+    try:
+        archivo, tipo = obtener_miniatura(token)
+    except (signing.BadSignature, OSError):
+        raise Http404('Miniatura no encontrada')
+    response = FileResponse(archivo, content_type=tipo)
+    # La URL cambia si cambia el origen: el navegador y la CDN pueden guardarla sin revalidar
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+
 def detalle(request, producto_id):
     producto = get_object_or_404(
         Producto.objects.select_related('categoria').prefetch_related(
@@ -109,11 +224,22 @@ def detalle(request, producto_id):
         es_activo=True
     )
     
-    # Obtener productos relacionados de la misma categoría
-    productos_relacionados = Producto.objects.filter(
-        categoria=producto.categoria,
-        es_activo=True
-    ).exclude(id=producto.id).select_related('categoria')[:3]
+    # Registrar la vista sin cargar ni guardar el producto completo
+    Producto.objects.filter(id=producto.id).update(vistas=F('vistas') + 1)
+    
+    # Productos relacionados precalculados por similitud (ver productos.similitud)
+    productos_relacionados = [
+        r.relacionado for r in ProductoRelacionado.objects.filter(
+            producto=producto,
+            relacionado__es_activo=True
+        ).select_related('relacionado__categoria')[:3]
+    ]
+    if not productos_relacionados:
+        # Aún sin calcular: usar productos de la misma categoría
+        productos_relacionados = Producto.objects.filter(
+            categoria=producto.categoria,
+            es_activo=True
+        ).exclude(id=producto.id).select_related('categoria')[:3]
     
     # Número de WhatsApp (puedes configurar esto en settings.py)
     whatsapp_numero = '5355513196'  # Cambia este número
@@ -205,6 +331,7 @@ def admin_dashboard(request):
         'total_atributos': total_atributos,
         'productos_sin_stock': productos_sin_stock,
         'productos_recientes': productos_recientes,
+        'imagenes': estadisticas_imagenes(),
     }
     return render(request, 'admin_custom/dashboard.html', context)
 
@@ -243,6 +370,8 @@ def admin_productos_lista(request):
     context = {
         'page_obj': page_obj,
         'categorias': categorias,
+        'colores': Color.objects.order_by('orden', 'nombre'),
+        'acciones': ACCIONES,
         'query': query,
         'categoria_seleccionada': categoria_id,
         'estado_seleccionado': estado,
@@ -250,6 +379,30 @@ def admin_productos_lista(request):
     return render(request, 'admin_custom/productos_lista.html', context)
 
 
+@staff_member_required(login_url='/productos/admin-custom/login/')
+@require_POST
+def admin_productos_accion_masiva(request):
+    """Aplicar una acción a los productos seleccionados en la lista"""
+    siguiente = request.POST.get('siguiente', '')
+    if not url_has_allowed_host_and_scheme(siguiente, allowed_hosts={request.get_host()}):
+        siguiente = reverse('productos:admin_productos_lista')
+
+    accion = request.POST.get('accion', '')
+    try:
+        afectados = ejecutar_accion(
+            request.POST.getlist('ids'),
+            accion,
+            valor=request.POST.get('categoria') if accion == 'categoria' else request.POST.get('valor'),
+            modo=request.POST.get('modo'),
+            color_ids=request.POST.getlist('colores'),
+        )
+    except ValueError as e:
+        messages.error(request, str(e))
+    else:
+        messages.success(request, f'{ACCIONES[accion]}: {afectados} productos modificados')
+    return redirect(siguiente)
+
+
 @staff_member_required(login_url='/productos/admin-custom/login/')
 def admin_producto_crear(request):
     """Crear nuevo producto"""
@@ -287,15 +440,10 @@ def admin_producto_crear(request):
             if colores_ids:
                 producto.colores.set(colores_ids)
             
-            # Guardar imágenes de galería
-            for key in request.FILES:
-                if key.startswith('galeria_'):
-                    imagen_file = request.FILES[key]
-                    ImagenProducto.objects.create(
-                        producto=producto,
-                        imagen=imagen_file,
-                        orden=0  # El orden se puede ajustar después en editar
-                    )
+            # Guardar imágenes de galería (en paralelo, con presupuesto de tiempo)
+            _, errores_galeria = guardar_galeria(producto, [
+                request.FILES[key] for key in request.FILES if key.startswith('galeria_')
+            ])
             
             # Guardar atributos dinámicos
             atributos = AtributoDinamico.objects.all()
@@ -308,9 +456,14 @@ def admin_producto_crear(request):
                         valor=valor
                     )
             
+            _programar_recalculos(producto.id, [producto.categoria_id])
+            
+            mensaje = f'Producto "{nombre}" creado exitosamente'
+            if errores_galeria:
+                mensaje += f'. No se guardaron {len(errores_galeria)} imágenes de galería: {", ".join(errores_galeria)}'
             return JsonResponse({
                 'success': True,
-                'message': f'Producto "{nombre}" creado exitosamente',
+                'message': mensaje,
                 'redirect': reverse('productos:admin_producto_editar', kwargs={'producto_id': producto.id})
             })
             
@@ -343,6 +496,7 @@ def admin_producto_editar(request, producto_id):
     
     if request.method == 'POST':
         try:
+            categoria_anterior_id = producto.categoria_id
             producto.nombre = request.POST.get('nombre')
             producto.categoria_id = request.POST.get('categoria')
             producto.precio_venta = request.POST.get('precio')
@@ -373,6 +527,8 @@ def admin_producto_editar(request, producto_id):
                         valor=valor
                     )
             
+            _programar_recalculos(producto.id, [categoria_anterior_id, producto.categoria_id])
+            
             return JsonResponse({
                 'success': True,
                 'message': 'Producto actualizado exitosamente',
@@ -391,7 +547,7 @@ def admin_producto_editar(request, producto_id):
     # Obtener atributos: los que aplican a la categoría del producto + los generales (sin categoría)
     atributos_disponibles = AtributoDinamico.objects.filter(
         Q(categorias__isnull=True) | Q(categorias=producto.categoria)
-    ).distinct().order_by('orden', 'nombre')
+    ).distinct().order_by('orden', 'nombre').prefetch_related('categorias')
     
     valores_actuales = {v.atributo_id: v.valor for v in producto.valores_atributos.all()}
     
@@ -413,6 +569,7 @@ def admin_producto_toggle_estado(request, producto_id):
     producto = get_object_or_404(Producto, id=producto_id)
     producto.es_activo = not producto.es_activo
     producto.save()
+    _programar_recalculos(producto.id, [producto.categoria_id])
     
     return JsonResponse({
         'success': True,
@@ -427,7 +584,10 @@ def admin_producto_eliminar(request, producto_id):
     """Eliminar producto (AJAX)"""
     producto = get_object_or_404(Producto, id=producto_id)
     nombre = producto.nombre
+    producto_id = producto.id
+    categoria_id = producto.categoria_id
     producto.delete()
+    _programar_recalculos(producto_id, [categoria_id])
     
     return JsonResponse({
         'success': True,
@@ -479,37 +639,36 @@ def admin_imagen_eliminar(request, imagen_id):
     })
 
 
+def _respuesta_esquema_atributos(request, categoria_id):
+    """Respuesta JSON del esquema de atributos de una categoría, con ETag para revalidar."""
+    esquema = obtener_esquema(categoria_id)
+    if esquema is None:
+        return JsonResponse({'success': False, 'message': 'Categoría no encontrada'}, status=404)
+    
+    atributos_data, etag = esquema
+    # Admite listas de ETags, "*" y prefijos W/ como indica la RFC 9110
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = JsonResponse({
+            'success': True,
+            'atributos': atributos_data,
+        })
+    response['ETag'] = etag
+    # El navegador puede reutilizarla entre cargas del formulario, revalidando siempre
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
 # Nueva vista para obtener atributos por categoría (AJAX)
 @staff_member_required(login_url='/productos/admin-custom/login/')
 def admin_obtener_atributos(request):
     """Obtiene los atributos correspondientes según la categoría seleccionada (AJAX)"""
     categoria_id = request.GET.get('categoria_id')
     
-    if not categoria_id:
+    if not categoria_id or not categoria_id.isdigit():
         return JsonResponse({'atributos': []})
     
-    try:
-        categoria = Categoria.objects.get(id=categoria_id)
-        
-        # Obtener atributos que aplican a esta categoría + los generales (sin categoría)
-        atributos = AtributoDinamico.objects.filter(
-            Q(categorias__isnull=True) | Q(categorias=categoria)
-        ).distinct().order_by('orden', 'nombre')
-        
-        atributos_data = [{
-            'id': attr.id,
-            'nombre': attr.nombre,
-            'unidad_medida': attr.unidad_medida or '',
-            'categorias': ', '.join(c.nombre for c in attr.categorias.all()) or 'Todas'
-        } for attr in atributos]
-        
-        return JsonResponse({
-            'success': True,
-            'atributos': atributos_data,
-        })
-        
-    except Categoria.DoesNotExist:
-        return JsonResponse({'success': False, 'message': 'Categoría no encontrada'})
+    return _respuesta_esquema_atributos(request, int(categoria_id))
 
 
 # ===== VISTAS PARA CATEGORÍAS =====
@@ -558,7 +717,10 @@ def admin_categoria_editar(request, categoria_id):
     categoria.descripcion = request.POST.get('descripcion', '')
     padre_id = request.POST.get('padre', None)
     categoria.padre_id = padre_id if padre_id else None
-    categoria.save()
+    try:
+        categoria.save()
+    except ValueError as e:
+        return JsonResponse({'success': False, 'message': str(e)})
     
     return JsonResponse({
         'success': True,
@@ -633,12 +795,18 @@ def admin_atributo_editar(request, atributo_id):
     if request.method == 'POST':
         atributo.nombre = request.POST.get('nombre')
         categorias_ids = request.POST.getlist('categorias')
+        unidad_anterior = atributo.unidad_medida
         atributo.unidad_medida = request.POST.get('unidad_medida', '')
         atributo.descripcion = request.POST.get('descripcion', '')
         atributo.orden = request.POST.get('orden', 0)
         atributo.save()
         atributo.categorias.set(categorias_ids)
         
+        # Los valores numéricos dependen de la unidad de medida
+        if (unidad_anterior or '') != atributo.unidad_medida:
+            for _ in recalcular_valores_numericos(atributo.valores.all()):
+                pass
+        
         messages.success(request, 'Atributo actualizado exitosamente')
         return redirect('productos:admin_atributos_lista')
     
@@ -672,30 +840,7 @@ def admin_atributo_eliminar(request, atributo_id):
 @staff_member_required(login_url='/productos/admin-custom/login/')
 def admin_categoria_atributos(request, categoria_id):
     """Obtener atributos según la categoría (AJAX)"""
-    try:
-        categoria = get_object_or_404(Categoria, id=categoria_id)
-        
-        # Obtener atributos que aplican a esta categoría + los generales (sin categoría)
-        atributos = AtributoDinamico.objects.filter(
-            Q(categorias__isnull=True) | Q(categorias=categoria)
-        ).distinct().order_by('orden', 'nombre')
-        
-        atributos_data = [{
-            'id': attr.id,
-            'nombre': attr.nombre,
-            'unidad_medida': attr.unidad_medida or '',
-            'categorias': ', '.join(c.nombre for c in attr.categorias.all()) or 'Todas',
-        } for attr in atributos]
-        
-        return JsonResponse({
-            'success': True,
-            'atributos': atributos_data,
-        })
-    except Exception as e:
-        return JsonResponse({
-            'success': False,
-            'message': f'Error al obtener atributos: {str(e)}'
-        }, status=400)
+    return _respuesta_esquema_atributos(request, categoria_id)
 
 
 @staff_member_required(login_url='/productos/admin-custom/login/')
@@ -807,3 +952,85 @@ def admin_color_eliminar(request, color_id):
         'success': True,
         'message': f'Color "{nombre}" eliminado exitosamente'
     })
+
+
+# ===== IMPORTACIÓN MASIVA =====
+
+@staff_member_required(login_url='/productos/admin-custom/login/')
+def admin_productos_importar(request):
+    """Importar productos desde una hoja CSV/XLSX con un zip de imágenes opcional"""
+    context = {}
+    if request.method == 'POST':
+        hoja = request.FILES.get('hoja')
+        zip_imagenes = request.FILES.get('imagenes')
+        simular = request.POST.get('simular') == 'on'
+
+        if not hoja:
+            messages.error(request, 'Selecciona una hoja CSV o XLSX')
+            return redirect('productos:admin_productos_importar')
+
+        with tempfile.NamedTemporaryFile(suffix='.zip') as temporal:
+            try:
+                imagenes = None
+                if zip_imagenes:
+                    # Los procesos del pool leen el zip desde disco
+                    if hasattr(zip_imagenes, 'temporary_file_path'):
+                        ruta_zip = zip_imagenes.temporary_file_path()
+                    else:
+                        for trozo in zip_imagenes.chunks():
+                            temporal.write(trozo)
+                        temporal.flush()
+                        ruta_zip = temporal.name
+                    imagenes = OrigenImagenes(ruta_zip)
+                encabezados, filas = leer_hoja(hoja.file, hoja.name)
+                # Sin pool de procesos dentro del worker: las importaciones grandes, con
+                # "manage.py importar_productos"
+                resultado = Importacion(imagenes=imagenes, procesos=1, simular=simular).ejecutar(encabezados, filas)
+            except (OSError, ValueError) as e:
+                messages.error(request, f'No se pudo importar: {e}')
+                return redirect('productos:admin_productos_importar')
+
+        if resultado.simulacion:
+            messages.success(request, f'{resultado.validas} de {resultado.filas} filas válidas (simulación: no se importó nada)')
+        elif resultado.creados:
+            messages.success(request, f'{resultado.creados} productos importados')
+        context['resultado'] = resultado
+
+    return render(request, 'admin_custom/productos_importar.html', context)
+
+
+@staff_member_required(login_url='/productos/admin-custom/login/')
+def admin_productos_exportar(request):
+    """Exportar el catálogo (CSV o JSON Lines) en streaming, con los filtros de la lista"""
+    formato = request.GET.get('formato', 'csv')
+    if formato not in FORMATOS:
+        raise Http404('Formato no soportado')
+    try:
+        productos = filtrar_productos(request.GET.get('categoria') or None, request.GET.get('estado'))
+    except (Categoria.DoesNotExist, ValueError):
+        raise Http404('La categoría no existe')
+
+    content_type, extension = FORMATOS[formato]
+    response = StreamingHttpResponse(Exportacion(productos).lineas(formato), content_type=content_type)
+    nombre = f'productos-{timezone.localdate():%Y%m%d}.{extension}'
+    response['Content-Disposition'] = f'attachment; filename="{nombre}"'
+    response['Cache-Control'] = 'private, no-store'
+    return response
+
+
+# ===== PERFILES DE PETICIONES =====
+
+@staff_member_required(login_url='/productos/admin-custom/login/')
+def admin_perfiles(request):
+    """Perfiles de peticiones guardados con ?_perfil=guardar"""
+    context = {'perfiles': informes_recientes()}
+    return render(request, 'admin_custom/perfiles.html', context)
+
+
+@staff_member_required(login_url='/productos/admin-custom/login/')
+def admin_perfil(request, perfil_id):
+    """Informe de un perfil guardado (texto plano)"""
+    informe = obtener_informe(perfil_id)
+    if informe is None:
+        raise Http404('El perfil no existe o ha caducado')
+    return HttpResponse(informe, content_type='text/plain; charset=utf-8')